@@ -0,0 +1,309 @@
+"""Generiranje kartica iz mnogo PDF-ova bez GUI-ja (npr. preko noći).
+
+Upotreba:
+    python batch_generate.py [opcije] ULAZ [ULAZ ...]
+
+ULAZ je PDF ("knjiga.pdf"), PDF s rasponom stranica ("knjiga.pdf:10-80") ili
+mapa (svi PDF-ovi u njoj). Svaki raspon se dijeli na poslove od --pages-per-job
+stranica; svaki posao izvuče tekst (pdf_extract, s kešom stranica) i od AI-a
+traži --questions pitanja (quiz_ai, s kešom odgovora). Do --workers poslova
+radi istovremeno.
+
+Završeni poslovi se odmah bilježe u kontrolni log (--checkpoint), pa prekinuto
+pokretanje s istim argumentima nastavlja gdje je stalo. Pitanja se upisuju u
+špil data/<predmet>.jsonl u serijama (jedan upis i jedan fsync po seriji), a
+pitanja koja u špilu već postoje se preskaču.
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+import pdf_extract
+import quiz_ai
+import text_prep
+from card_store import CardStore, migrate_json_deck
+from gemini_client import existing_client_pool
+
+DATA_DIR = 'data'
+CHECKPOINT_PATH = os.path.join('cache', 'batch_checkpoint.jsonl')
+PAGES_PER_JOB = 20
+QUESTIONS_PER_JOB = 10
+WORKERS = 4
+FLUSH_CARDS = 200
+
+
+def subject_filename(subject):
+    """Naziv fajla špila za predmet, isto kao pri kreiranju predmeta u GUI-ju."""
+    return subject.lower().replace(' ', '_') + '.jsonl'
+
+
+def parse_input(spec):
+    """Rastavlja 'putanja.pdf[:od-do]' na (putanja, od, do); bez raspona do je None."""
+    path, sep, pages = spec.rpartition(':')
+    if not sep or not path or os.path.exists(spec):
+        return spec, 1, None
+    try:
+        start, end = (int(p) for p in pages.split('-', 1))
+    except ValueError:
+        raise ValueError(f"Neispravan raspon stranica u '{spec}' (očekuje se npr. knjiga.pdf:1-50).")
+    if start < 1 or end < start:
+        raise ValueError(f"Neispravan raspon stranica u '{spec}'.")
+    return path, start, end
+
+
+def expand_inputs(specs):
+    """Pretvara argumente u listu (putanja, od, do); mape se šire u sve PDF-ove u njima."""
+    ranges = []
+    for spec in specs:
+        if os.path.isdir(spec):
+            for name in sorted(os.listdir(spec)):
+                if name.lower().endswith('.pdf'):
+                    ranges.append((os.path.join(spec, name), 1, None))
+            continue
+        path, start, end = parse_input(spec)
+        if not os.path.isfile(path):
+            raise ValueError(f"Fajl ne postoji: {path}")
+        ranges.append((path, start, end))
+    return ranges
+
+
+def plan_jobs(ranges, subject, pages_per_job, questions, page_cache):
+    """Dijeli raspone na poslove; svaki posao ima stabilan ključ za kontrolni log.
+
+    Ključ sadrži hash sadržaja PDF-a, pa preimenovan fajl ne ponavlja posao,
+    a izmijenjen fajl se obrađuje ponovo.
+    """
+    jobs = []
+    for path, start, end in ranges:
+        file_hash = page_cache.file_hash(path)
+        count = page_cache.get_page_count(file_hash)
+        if count is None:
+            count = pdf_extract.page_count(path)
+            page_cache.put_page_count(file_hash, count)
+        end = count if end is None else min(end, count)
+        job_subject = subject or os.path.splitext(os.path.basename(path))[0]
+        for first in range(start, end + 1, pages_per_job):
+            last = min(first + pages_per_job - 1, end)
+            key = f"{file_hash}:{first}-{last}:{questions}:{quiz_ai.PROMPT_VERSION}:{subject_filename(job_subject)}"
+            jobs.append({"key": key, "path": path, "start": first, "end": last, "subject": job_subject})
+    return jobs
+
+
+class Checkpoint:
+    """Append-only log završenih poslova ({"key", "subject", "questions"}) i upisanih serija ({"flushed"})."""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = {}
+        self.flushed = set()
+        try:
+            with open(path, 'rb') as f:
+                for raw in f:
+                    if not raw.endswith(b'\n'):
+                        # Nedovršen zapis nakon pada; taj posao se ponavlja.
+                        break
+                    try:
+                        record = json.loads(raw)
+                    except ValueError:
+                        continue
+                    if 'flushed' in record:
+                        self.flushed.update(record['flushed'])
+                    else:
+                        self.done[record['key']] = record
+        except FileNotFoundError:
+            pass
+
+    def _append(self, record):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def pending(self):
+        """Završeni poslovi čija pitanja još nisu upisana u špil."""
+        return [record for key, record in self.done.items() if key not in self.flushed]
+
+    def mark_done(self, key, subject, questions):
+        record = {"key": key, "subject": subject, "questions": questions}
+        self._append(record)
+        self.done[key] = record
+        return record
+
+    def mark_flushed(self, keys):
+        self._append({"flushed": keys})
+        self.flushed.update(keys)
+
+
+def _normalize_title(title):
+    return ' '.join(title.lower().split())
+
+
+def deck_path(subject, data_dir=DATA_DIR):
+    """Putanja JSONL loga predmeta (stari .json se prvo migrira).
+
+    Baca ValueError ako je predmet binarni špil (.deck), koji je samo za čitanje.
+    """
+    path = os.path.join(data_dir, subject_filename(subject))
+    legacy_path = os.path.splitext(path)[0] + '.json'
+    if not os.path.exists(path) and os.path.exists(legacy_path):
+        migrate_json_deck(legacy_path)
+    if os.path.exists(os.path.splitext(path)[0] + '.deck') and not os.path.exists(path):
+        raise ValueError(f"Predmet '{subject}' je binarni špil (.deck) i ne može se mijenjati.")
+    return path
+
+
+def write_to_decks(records, data_dir=DATA_DIR, log=print):
+    """Upisuje pitanja iz završenih poslova u špilove; vraća (broj novih kartica, neupisani predmeti).
+
+    Za svaki predmet se radi jedan upis (CardStore.add_many); pitanja čiji
+    naslov u špilu već postoji se preskaču, pa ponovljen upis nakon pada ne
+    pravi duplikate. Predmet koji se ne može upisati se ispisuje i preskače,
+    a ostali predmeti se ipak upisuju.
+    """
+    by_subject = {}
+    for record in records:
+        by_subject.setdefault(record['subject'], []).extend(record['questions'])
+
+    os.makedirs(data_dir, exist_ok=True)
+    added = 0
+    failed = set()
+    for subject, questions in by_subject.items():
+        try:
+            store = CardStore(deck_path(subject, data_dir))
+            seen = {_normalize_title(card.naslov) for card in store.load()}
+            pairs = []
+            for question in questions:
+                title = question.get('pitanje', '').strip()
+                answer = question.get('odgovor', '').strip()
+                normalized = _normalize_title(title)
+                if not title or not answer or normalized in seen:
+                    continue
+                seen.add(normalized)
+                pairs.append((title, answer))
+            added += len(store.add_many(pairs))
+        except (OSError, ValueError) as e:
+            log(f"Predmet '{subject}' nije upisan: {e}")
+            failed.add(subject)
+    return added, failed
+
+
+def run_batch(jobs, questions, checkpoint, workers=WORKERS, fresh=False, flush_cards=FLUSH_CARDS,
+              page_cache=None, response_cache=None, log=print):
+    """Izvršava poslove koji nisu u kontrolnom logu; vraća (uspjelih, neuspjelih, novih kartica)."""
+    page_cache = page_cache or pdf_extract.PageTextCache()
+    response_cache = response_cache or quiz_ai.ResponseCache()
+    # Niti dijele procesore za ekstrakciju, da N poslova ne pokrene N punih ProcessPoolova.
+    extract_workers = max(1, (os.cpu_count() or 1) // workers)
+
+    def run_job(job):
+        pages = pdf_extract.extract_pages(job['path'], job['start'], job['end'],
+                                          max_workers=extract_workers, cache=page_cache)
+        prepared = text_prep.prepare_text(pages)
+        if not prepared.text.strip():
+            return [], prepared
+        return quiz_ai.generate_questions_chunked(prepared.text, questions, cache=response_cache,
+                                                  fresh=fresh), prepared
+
+    added = 0
+    pending = checkpoint.pending()
+
+    def flush():
+        nonlocal added, pending
+        if pending:
+            written, failed_subjects = write_to_decks(pending, log=log)
+            added += written
+            # Neupisani predmeti ostaju u kontrolnom logu i upisuju se pri sljedećem pokretanju.
+            checkpoint.mark_flushed([record['key'] for record in pending
+                                     if record['subject'] not in failed_subjects])
+            pending = []
+
+    todo = [job for job in jobs if job['key'] not in checkpoint.done]
+    skipped = len(jobs) - len(todo)
+    if skipped:
+        log(f"Preskačem {skipped} već završenih poslova (kontrolni log: {checkpoint.path}).")
+
+    # Predmeti u koje se ne može pisati se odbijaju prije poziva AI-u.
+    blocked = set()
+    for subject in sorted({job['subject'] for job in todo}):
+        try:
+            deck_path(subject)
+        except ValueError as e:
+            log(f"{e} Preskačem njegove poslove.")
+            blocked.add(subject)
+    failed = sum(job['subject'] in blocked for job in todo)
+    todo = [job for job in todo if job['subject'] not in blocked]
+
+    succeeded = tokens_saved = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch-job') as executor:
+        futures = {executor.submit(run_job, job): job for job in todo}
+        for done, future in enumerate(as_completed(futures), start=1):
+            job = futures[future]
+            label = f"[{done}/{len(todo)}] {os.path.basename(job['path'])} str. {job['start']}-{job['end']}"
+            try:
+                result, prepared = future.result()
+            except Exception as e:
+                failed += 1
+                log(f"{label}: greška ({e})")
+                continue
+            succeeded += 1
+            pending.append(checkpoint.mark_done(job['key'], job['subject'], result))
+            tokens_saved += prepared.tokens_saved
+            log(f"{label}: {len(result)} pitanja (ušteđeno ~{prepared.tokens_saved} tokena)")
+            if sum(len(record['questions']) for record in pending) >= flush_cards:
+                flush()
+    flush()
+    if tokens_saved:
+        log(f"Priprema teksta je ukupno uštedjela ~{tokens_saved} tokena.")
+    return succeeded, failed, added
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generira kartice iz više PDF-ova bez GUI-ja.")
+    parser.add_argument('inputs', nargs='+', metavar='ULAZ',
+                        help="PDF, PDF s rasponom (knjiga.pdf:1-50) ili mapa s PDF-ovima")
+    parser.add_argument('--subject', help="predmet za sve kartice (zadano: ime PDF-a)")
+    parser.add_argument('--questions', type=int, default=QUESTIONS_PER_JOB,
+                        help=f"broj pitanja po poslu (zadano {QUESTIONS_PER_JOB})")
+    parser.add_argument('--pages-per-job', type=int, default=PAGES_PER_JOB,
+                        help=f"broj stranica po poslu (zadano {PAGES_PER_JOB})")
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help=f"broj poslova koji rade istovremeno (zadano {WORKERS})")
+    parser.add_argument('--checkpoint', default=CHECKPOINT_PATH,
+                        help=f"kontrolni log za nastavak prekinutog rada (zadano {CHECKPOINT_PATH})")
+    parser.add_argument('--fresh', action='store_true', help="ne koristi keširane odgovore AI-a")
+    args = parser.parse_args(argv)
+
+    if args.questions < 1 or args.pages_per_job < 1 or args.workers < 1:
+        parser.error("--questions, --pages-per-job i --workers moraju biti pozitivni.")
+
+    load_dotenv()
+    if not os.getenv("GEMINI_API_KEY"):
+        print("GEMINI_API_KEY nije postavljen (.env ili varijabla okruženja).", file=sys.stderr)
+        return 1
+
+    page_cache = pdf_extract.PageTextCache()
+    try:
+        jobs = plan_jobs(expand_inputs(args.inputs), args.subject, args.pages_per_job,
+                         args.questions, page_cache)
+    except Exception as e:
+        print(f"Greška: {e}", file=sys.stderr)
+        return 2
+
+    print(f"Poslova: {len(jobs)}")
+    succeeded, failed, added = run_batch(jobs, args.questions, Checkpoint(args.checkpoint),
+                                         workers=args.workers, fresh=args.fresh,
+                                         page_cache=page_cache)
+    print(f"Gotovo: {succeeded} uspjelih, {failed} neuspjelih poslova, {added} novih kartica.")
+    pool = existing_client_pool()
+    if pool is not None:
+        print(pool.metrics.summary())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,388 @@
+"""Mjerenje brzine kritičnih putanja na sintetičkim podacima.
+
+Pravi sintetičke špilove (npr. 1k do 1M kartica) i PDF od nekoliko stotina
+stranica u privremenoj mapi, pa mjeri: učitavanje špila, dodavanje kartica,
+start_session i prolazak kroz cijelu sesiju, pretragu u bazi pitanja,
+ekstrakciju teksta iz PDF-a, odabir dijelova teksta (retrieval) i obradu AI odgovora (model je zamijenjen
+lažnim, bez mreže).
+
+Upotreba:
+    python benchmark.py --sizes 1000,100000 --output rezultati.json
+    python benchmark.py --baseline rezultati.json --threshold 0.2
+
+Uz --baseline se medijane porede s ranije spremljenim rezultatima; ako je
+neko mjerenje sporije od praga, program izlazi s kodom 1.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from card_store import CardStore
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_PAGES = 300
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.2
+GROUPS = ('deck', 'session', 'search', 'pdf', 'ai')
+WRITE_BATCH = 10000
+ADD_CARDS = 100
+SEARCH_QUERIES = ('mi', 'hondr', 'stanica energija', 'nepostojecarijec')
+
+
+def measure(fn, repeat, setup=None):
+    """Poziva fn repeat puta (setup prije svakog poziva, ne mjeri se); vraća listu trajanja."""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def _summary(times, per=1):
+    return {"median": statistics.median(times) / per, "min": min(times) / per, "runs": len(times)}
+
+
+# --- Sintetički podaci ---
+
+def make_words(rng, count=5000):
+    letters = 'abcdefghijklmnoprstuvz'
+    words = [''.join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(count)]
+    # Nekoliko stvarnih riječi da upiti iz SEARCH_QUERIES imaju pogotke.
+    return words + ['mitohondrij', 'stanica', 'energija', 'fotosinteza']
+
+
+def make_deck(path, size, seed=1):
+    """Pravi JSONL špil sa size kartica (upis u serijama preko CardStore.add_many)."""
+    rng = random.Random(seed)
+    words = make_words(rng)
+    store = CardStore(path)
+    store.load()
+    for first in range(0, size, WRITE_BATCH):
+        store.add_many((' '.join(rng.choices(words, k=6)), ' '.join(rng.choices(words, k=30)))
+                       for _ in range(min(WRITE_BATCH, size - first)))
+
+
+def ensure_decks(sizes):
+    """Pravi špilove koji još ne postoje (kada se grupa 'deck' preskoči)."""
+    for size in sizes:
+        path = os.path.join('data', f"bench_{size}.jsonl")
+        if not os.path.exists(path):
+            make_deck(path, size)
+
+
+def make_pdf(path, pages, seed=1):
+    """Pravi jednostavan PDF (Helvetica, po 40 redova teksta na stranici)."""
+    rng = random.Random(seed)
+    words = make_words(rng)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in range(pages):
+        lines = [f"Knjiga - stranica {page + 1}"] + [' '.join(rng.choices(words, k=10)) for _ in range(40)]
+        body = "BT /F1 10 Tf 50 770 Td " + " ".join(f"({line}) Tj 0 -18 Td" for line in lines) + " ET"
+        stream = body.encode('latin-1')
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {content_id} 0 R "
+                       f"/Resources << /Font << /F1 3 0 R >> >> >>".encode())
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + obj + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, 'wb') as f:
+        f.write(out)
+
+
+def fake_response(num_questions, seed=1):
+    rng = random.Random(seed)
+    words = make_words(rng, 500)
+    return json.dumps([{"pitanje": ' '.join(rng.choices(words, k=10)) + '?',
+                        "odgovor": ' '.join(rng.choices(words, k=20))}
+                       for _ in range(num_questions)], ensure_ascii=False, indent=2)
+
+
+# --- Grupe mjerenja ---
+
+def bench_deck(sizes, repeat):
+    from flashcards import FlashcardProgram
+    results = {}
+    for size in sizes:
+        filename = f"bench_{size}.jsonl"
+        path = os.path.join('data', filename)
+        started = time.perf_counter()
+        make_deck(path, size)
+        results[f"deck_write_bulk[{size}]"] = _summary([time.perf_counter() - started])
+
+        def drop_index():
+            if os.path.exists(path + '.idx'):
+                os.remove(path + '.idx')
+
+        results[f"deck_load_cold[{size}]"] = _summary(measure(lambda: FlashcardProgram(filename), repeat, drop_index))
+        results[f"deck_load_indexed[{size}]"] = _summary(measure(lambda: FlashcardProgram(filename), repeat))
+
+        program = FlashcardProgram(filename)
+        results[f"deck_add_card[{size}]"] = _summary(
+            measure(lambda: [program.add_card("Novo pitanje?", "Novi odgovor.") for _ in range(ADD_CARDS)], repeat),
+            per=ADD_CARDS)
+    return results
+
+
+def bench_session(sizes, repeat):
+    from flashcards import FlashcardProgram
+    results = {}
+    for size in sizes:
+        filename = f"bench_{size}.jsonl"
+        reviews = os.path.join('data', f"bench_{size}.reviews")
+
+        def fresh_program():
+            if os.path.exists(reviews):
+                os.remove(reviews)
+            holder[0] = FlashcardProgram(filename)
+
+        def iterate():
+            program = holder[0]
+            program.start_session()
+            correct = True
+            while program.get_next_card_in_session()[0] is not None:
+                program.get_current_answer()
+                program.record_answer(correct)
+                correct = not correct
+
+        holder = [None]
+        results[f"session_start[{size}]"] = _summary(measure(lambda: holder[0].start_session(), repeat, fresh_program))
+        results[f"session_full[{size}]"] = _summary(measure(iterate, repeat, fresh_program))
+    return results
+
+
+def bench_search(sizes, repeat):
+    from flashcards import FlashcardProgram
+    results = {}
+    for size in sizes:
+        filename = f"bench_{size}.jsonl"
+        holder = [None]
+
+        def fresh_program():
+            holder[0] = FlashcardProgram(filename)
+
+        results[f"search_build[{size}]"] = _summary(
+            measure(lambda: holder[0].get_search_index(), repeat, fresh_program))
+        index = holder[0].get_search_index()
+        for query in SEARCH_QUERIES:
+            results[f"search_query[{size}][{query}]"] = _summary(measure(lambda: index.search(query), repeat))
+    return results
+
+
+def bench_pdf(pages, repeat):
+    import pdf_extract
+    results = {}
+    path = os.path.abspath(f"bench_{pages}.pdf")
+    make_pdf(path, pages)
+    cache_path = os.path.abspath('page_cache.sqlite3')
+
+    def drop_cache():
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(cache_path + suffix):
+                os.remove(cache_path + suffix)
+
+    def extract(max_workers=None, cache=None):
+        return lambda: pdf_extract.extract_text(path, 1, pages, max_workers=max_workers, cache=cache)
+
+    results[f"pdf_extract_serial[{pages}]"] = _summary(measure(extract(max_workers=1), repeat))
+    results[f"pdf_extract_parallel[{pages}]"] = _summary(measure(extract(), repeat))
+
+    holder = [None]
+
+    def cold_cache():
+        drop_cache()
+        holder[0] = pdf_extract.PageTextCache(cache_path)
+
+    results[f"pdf_extract_cache_cold[{pages}]"] = _summary(
+        measure(lambda: extract(cache=holder[0])(), repeat, cold_cache))
+    warm = pdf_extract.PageTextCache(cache_path)
+    extract(cache=warm)()
+    results[f"pdf_extract_cache_warm[{pages}]"] = _summary(measure(extract(cache=warm), repeat))
+
+    import retrieval
+    if retrieval.available():
+        import text_prep
+        cleaned = text_prep.prepare_text(pdf_extract.extract_pages(path, 1, pages, cache=warm), budget_tokens=0).pages
+        budget = retrieval.context_budget(10)
+        results[f"pdf_retrieval_build[{pages}]"] = _summary(
+            measure(lambda: retrieval.select_passages(cleaned, budget), repeat))
+        index_cache = retrieval.IndexCache(os.path.abspath('retrieval.sqlite3'))
+        retrieval.select_passages(cleaned, budget, cache=index_cache, doc_key='bench')
+        results[f"pdf_retrieval_cached[{pages}]"] = _summary(
+            measure(lambda: retrieval.select_passages(cleaned, budget, cache=index_cache, doc_key='bench'), repeat))
+    return results
+
+
+class _StubChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubPool:
+    """Zamjena za gemini_client.GeminiClientPool koja odmah vraća gotov odgovor."""
+
+    def __init__(self, response_text, chunk_size=64):
+        self.response_text = response_text
+        self.chunk_size = chunk_size
+
+    def generate(self, model, contents, tokens=1):
+        return _StubChunk(self.response_text)
+
+    def generate_stream(self, model, contents, tokens=1):
+        text = self.response_text
+        for i in range(0, len(text), self.chunk_size):
+            yield _StubChunk(text[i:i + self.chunk_size])
+
+
+def bench_ai(repeat, num_questions=50):
+    import gemini_client
+    import quiz_ai
+    results = {}
+    response = fake_response(num_questions)
+
+    def parse_stream():
+        parser = quiz_ai.QuestionStreamParser()
+        for i in range(0, len(response), 64):
+            parser.feed(response[i:i + 64])
+
+    results[f"ai_parse[{num_questions}]"] = _summary(measure(lambda: quiz_ai.parse_questions(response), repeat))
+    results[f"ai_parse_stream[{num_questions}]"] = _summary(measure(parse_stream, repeat))
+
+    previous_pool = gemini_client._pool
+    gemini_client._pool = StubPool(response)
+    try:
+        text = fake_response(400, seed=2)
+        results[f"ai_generate_stub[{num_questions}]"] = _summary(
+            measure(lambda: quiz_ai.generate_questions_chunked(text, num_questions, max_tokens=2000), repeat))
+        results[f"ai_generate_stub_stream[{num_questions}]"] = _summary(
+            measure(lambda: quiz_ai.generate_questions_chunked(text, num_questions, max_tokens=2000,
+                                                               on_question=lambda q: None), repeat))
+    finally:
+        gemini_client._pool = previous_pool
+    return results
+
+
+# --- Poređenje i ispis ---
+
+def compare(results, baseline, threshold):
+    """Vraća listu (naziv, staro, novo, omjer) za mjerenja sporija od praga."""
+    regressions = []
+    for name, current in results.items():
+        old = baseline.get(name)
+        if old is None or old["median"] <= 0:
+            continue
+        ratio = current["median"] / old["median"]
+        if ratio > 1 + threshold:
+            regressions.append((name, old["median"], current["median"], ratio))
+    return regressions
+
+
+def _format_time(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:9.1f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:9.2f} ms"
+    return f"{seconds:9.3f} s "
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mjeri brzinu kritičnih putanja na sintetičkim podacima.")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="veličine špilova odvojene zarezom (zadano %(default)s)")
+    parser.add_argument('--pages', type=int, default=DEFAULT_PAGES, help="broj stranica sintetičkog PDF-a")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="broj ponavljanja svakog mjerenja")
+    parser.add_argument('--only', default=','.join(GROUPS), help="grupe mjerenja (zadano %(default)s)")
+    parser.add_argument('--output', help="spremi rezultate u JSON fajl (osnovica za kasnije poređenje)")
+    parser.add_argument('--baseline', help="JSON fajl s ranijim rezultatima za poređenje")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="dozvoljeno usporenje prije nego što se prijavi regresija (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    groups = [group for group in args.only.split(',') if group]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"nepoznate grupe: {', '.join(sorted(unknown))}")
+    pdf_available = importlib.util.find_spec("PyPDF2") is not None
+    ai_available = importlib.util.find_spec("google.genai") is not None
+
+    workdir = tempfile.mkdtemp(prefix='studijski-bench-')
+    previous_cwd = os.getcwd()
+    results = {}
+    try:
+        # FlashcardProgram radi s relativnom mapom 'data/', pa se mjeri u privremenoj mapi.
+        os.chdir(workdir)
+        os.makedirs('data')
+        for group in groups:
+            if group == 'pdf' and not pdf_available or group == 'ai' and not ai_available:
+                print(f"Preskačem grupu '{group}' (biblioteka nije instalirana).")
+                continue
+            print(f"Mjerim: {group}...", flush=True)
+            if group == 'deck':
+                results.update(bench_deck(sizes, args.repeat))
+            elif group == 'session':
+                ensure_decks(sizes)
+                results.update(bench_session(sizes, args.repeat))
+            elif group == 'search':
+                ensure_decks(sizes)
+                results.update(bench_search(sizes, args.repeat))
+            elif group == 'pdf':
+                results.update(bench_pdf(args.pages, args.repeat))
+            elif group == 'ai':
+                results.update(bench_ai(args.repeat))
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for name, result in results.items():
+        print(f"{name:45} {_format_time(result['median'])}  (min {_format_time(result['min']).strip()})")
+
+    if args.output:
+        report = {
+            "meta": {"python": platform.python_version(), "platform": platform.platform(),
+                     "cpus": os.cpu_count(), "created": time.strftime('%Y-%m-%dT%H:%M:%S'),
+                     "sizes": sizes, "pages": args.pages, "repeat": args.repeat},
+            "results": results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Rezultati spremljeni u {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegresije (sporije od {args.threshold:.0%}):")
+            for name, old, new, ratio in regressions:
+                print(f"  {name:43} {_format_time(old)} -> {_format_time(new)}  (x{ratio:.2f})")
+            return 1
+        print(f"\nNema regresija u odnosu na {args.baseline} (prag {args.threshold:.0%}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,516 @@
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager, nullcontext
+
+from tracing import traced
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path):
+    """Ekskluzivno zaključavanje između procesa (flock na POSIX-u, msvcrt na Windowsu)."""
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def atomic_write_bytes(path, data):
+    """Atomski zapisuje sadržaj: privremeni fajl u istoj mapi, fsync pa os.replace."""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=os.path.basename(path))
+    try:
+        # mkstemp pravi fajl s pravima 0600; zadrži prava postojećeg fajla.
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+        os.chmod(tmp_path, mode)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class StaleLogError(Exception):
+    """Log je prepisan izvana, pa učitane kartice pokazuju na pogrešne pozicije."""
+
+
+class Card:
+    """Jedna kartica: cjelobrojni id, naslov i puni odgovor.
+
+    Koristi __slots__ umjesto rječnika po kartici, što kod velikih špilova
+    štedi memoriju. Odgovor se učitava tek kada zatreba (vidi
+    CardStore.get_answer): do tada je puni_odgovor None, a offset i length
+    pokazuju na liniju loga u kojoj se nalazi. Podržava i pristup kao
+    rječnik (card['naslov'], card.get(...)) radi kompatibilnosti.
+    """
+
+    __slots__ = ('id', 'naslov', 'puni_odgovor', 'offset', 'length')
+    FIELDS = ('id', 'naslov', 'puni_odgovor')
+
+    def __init__(self, id, naslov='', puni_odgovor=None, offset=None, length=0):
+        self.id = id
+        self.naslov = naslov
+        self.puni_odgovor = puni_odgovor
+        self.offset = offset
+        self.length = length
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.FIELDS else default
+
+    def to_record(self):
+        return {"id": self.id, "naslov": self.naslov, "puni_odgovor": self.puni_odgovor or ''}
+
+    def __repr__(self):
+        return f"Card({self.id!r}, {self.naslov!r})"
+
+
+def _encode_records(records):
+    """Pretvara listu zapisa u JSONL bajtove (jedan zapis po liniji)."""
+    return ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records).encode('utf-8')
+
+
+class CardStore:
+    """Append-only JSONL log kartica jednog predmeta.
+
+    Svaka linija je jedan zapis s cjelobrojnim 'id'. Izmjena kartice dodaje
+    novu liniju s istim 'id', a brisanje liniju s "obrisano": true; važeći je
+    uvijek zadnji zapis. Kada log naraste preko dvostrukog broja živih kartica,
+    kompakcija ga atomski prepisuje.
+
+    Uz log stoji indeks ('<log>.idx') s naslovima i pozicijama odgovora u logu,
+    pa otvaranje predmeta čita samo naslove i dio loga dopisan nakon zadnjeg
+    indeksiranja. Odgovori se čitaju pojedinačno, po potrebi (get_answer).
+
+    Sva pisanja idu pod zaključavanjem ('<log>.lock'), a prije dodjele novih
+    id-ova se dočitavaju zapisi koje je u međuvremenu dopisala druga instanca
+    (drugi CardStore nad istim fajlom ili drugi proces). generation se povećava
+    kad god se kartice promijene izvana, pa korisnici mogu osvježiti svoje kopije.
+    """
+
+    COMPACT_MIN_LINES = 1000
+    COMPACT_RATIO = 2
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + '.idx'
+        self.lock_path = path + '.lock'
+        self.generation = 0
+        self._cards = {}
+        self._next_id = 1
+        self._line_count = 0
+        self._end = 0
+        self._signature = None
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+
+    def _stat_signature(self):
+        """(inode, veličina, mtime) loga ili None ako log ne postoji."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def is_current(self):
+        """True ako se log nije promijenio od zadnjeg učitavanja ili pisanja."""
+        return self._signature is not None and self._signature == self._stat_signature()
+
+    @traced('deck.load')
+    def load(self):
+        """Učitava naslove kartica (bez odgovora) i vraća listu živih kartica.
+
+        Ako se log nije promijenio od zadnjeg poziva, vraća već učitane kartice.
+        """
+        if self.is_current():
+            return list(self._cards.values())
+        self._reload()
+        if self._line_count > max(self.COMPACT_MIN_LINES, self.COMPACT_RATIO * len(self._cards)):
+            self.compact()
+        return list(self._cards.values())
+
+    def _reload(self):
+        """Ponovo gradi stanje iz indeksa i ostatka loga, bez kompakcije."""
+        signature = self._stat_signature()
+        cards, start, line_count, next_id = {}, 0, 0, 1
+        index = self._read_index()
+        if index is not None and signature is not None:
+            header, indexed_cards = index
+            # Kompakcija (os.replace) mijenja inode; kraći log znači da je prepisan.
+            if header.get('ino') == signature[0] and header.get('size', 0) <= signature[1]:
+                cards = indexed_cards
+                start = header['size']
+                line_count = header.get('lines', 0)
+                next_id = header.get('next_id', 1)
+
+        end, new_lines, next_id = self._scan(cards, start, next_id)
+        self._cards = cards
+        self._next_id = next_id
+        self._line_count = line_count + new_lines
+        self._end = end
+        self.generation += 1
+        if end != start or index is None:
+            self._write_index(end)
+        self._signature = self._stat_signature()
+
+    @contextmanager
+    def _locked(self, sync=True):
+        """Zaključava log za pisanje (nit i proces); može se ugnijezditi.
+
+        Uz sync=True se pri prvom zaključavanju dočitava ono što je u log
+        dopisano izvana, pa su _next_id i kartice ažurni prije pisanja.
+        """
+        with self._lock:
+            outer = not self._lock_depth
+            with file_lock(self.lock_path) if outer else nullcontext():
+                self._lock_depth += 1
+                try:
+                    if outer and sync:
+                        self._sync()
+                    yield
+                finally:
+                    self._lock_depth -= 1
+
+    def _sync(self):
+        """Dopunjuje stanje zapisima koje je u log upisao neko drugi."""
+        if self.is_current():
+            return
+        signature = self._stat_signature()
+        if (self._signature is not None and signature is not None
+                and signature[0] == self._signature[0] and signature[1] >= self._end):
+            # Isti fajl, samo dopisan: dovoljno je pročitati novi kraj.
+            end, new_lines, self._next_id = self._scan(self._cards, self._end, self._next_id)
+            self._line_count += new_lines
+            self._end = end
+            self.generation += 1
+            self._signature = self._stat_signature()
+        else:
+            self._reload()
+
+    def _scan(self, cards, start, next_id, truncate=True):
+        """Primjenjuje zapise loga od bajta start; vraća (kraj, broj zapisa, next_id).
+
+        Uz truncate=False nedovršen zapis na kraju se samo preskače.
+        """
+        offset = start
+        line_count = 0
+        torn_tail = False
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(start)
+                for raw in f:
+                    if not raw.endswith(b'\n'):
+                        # Nedovršen zapis nakon pada programa.
+                        torn_tail = True
+                        break
+                    line_start = offset
+                    offset += len(raw)
+                    if not raw.strip():
+                        continue
+                    try:
+                        record = json.loads(raw)
+                        card_id = int(record['id'])
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    line_count += 1
+                    next_id = max(next_id, card_id + 1)
+                    if record.get('obrisano'):
+                        cards.pop(card_id, None)
+                        continue
+                    card = cards.get(card_id)
+                    if card is None:
+                        card = cards[card_id] = Card(card_id)
+                    if 'naslov' in record:
+                        card.naslov = record['naslov']
+                    if 'puni_odgovor' in record:
+                        card.offset, card.length = line_start, len(raw)
+                        card.puni_odgovor = None
+        except FileNotFoundError:
+            pass
+
+        if torn_tail and truncate:
+            self._truncate_torn_tail(offset)
+        return offset, line_count, next_id
+
+    def _truncate_torn_tail(self, offset):
+        """Odsijeca nedovršen zapis, ali tek pod zaključavanjem, kad niko ne piše."""
+        with self._locked(sync=False):
+            with open(self.path, 'r+b') as f:
+                f.seek(offset)
+                # Ako je drugi pisac u međuvremenu završio zapis, on ostaje.
+                if not f.read().endswith(b'\n'):
+                    f.truncate(offset)
+
+    def _read_index(self):
+        """Čita indeks: (zaglavlje, {id: Card bez odgovora}) ili None."""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline())
+                cards = {}
+                for line in f:
+                    card_id, title, offset, length = json.loads(line)
+                    cards[card_id] = Card(card_id, title, None, offset, length)
+        except (FileNotFoundError, ValueError, TypeError):
+            return None
+        return header, cards
+
+    def _write_index(self, indexed_size):
+        """Atomski zapisuje indeks koji pokriva prvih indexed_size bajtova loga."""
+        signature = self._stat_signature()
+        if signature is None:
+            return
+        header = {"ino": signature[0], "size": indexed_size,
+                  "lines": self._line_count, "next_id": self._next_id}
+        lines = [json.dumps(header)]
+        lines.extend(json.dumps([c.id, c.naslov, c.offset, c.length], ensure_ascii=False)
+                     for c in self._cards.values())
+        atomic_write_bytes(self.index_path, ('\n'.join(lines) + '\n').encode('utf-8'))
+
+    def peek(self):
+        """Žive kartice (bez odgovora) iz indeksa i ostatka loga, bez ikakvog pisanja na disk.
+
+        Za čitanje iz pozadinskih niti dok GUI piše u isti log: ne odsijeca
+        nedovršen zapis, ne zapisuje indeks, ne pokreće kompakciju i ne mijenja
+        stanje ovog objekta.
+        """
+        signature = self._stat_signature()
+        if signature is None:
+            return []
+        cards, start = {}, 0
+        index = self._read_index()
+        if index is not None:
+            header, indexed_cards = index
+            if header.get('ino') == signature[0] and header.get('size', 0) <= signature[1]:
+                cards, start = indexed_cards, header['size']
+        self._scan(cards, start, 1, truncate=False)
+        return list(cards.values())
+
+    def count_live(self):
+        """Broj živih kartica (za katalog predmeta), bez ikakvog pisanja na disk."""
+        return len(self.peek())
+
+    def get_answer(self, card_id):
+        """Vraća puni odgovor kartice, čitajući samo njenu liniju loga.
+
+        Ako pozicija kartice više ne odgovara logu, baca StaleLogError (nakon
+        toga is_current() vraća False, pa sljedeći load() čita log ispočetka).
+        """
+        card = self._cards.get(card_id)
+        if card is None:
+            return None
+        if card.puni_odgovor is None:
+            if card.offset is None:
+                card.puni_odgovor = ''
+            else:
+                record = self._read_record(card.offset, card.length)
+                if record is None or record.get('id') != card_id:
+                    # Log je u međuvremenu prepisan (npr. kompakcija u drugoj instanci);
+                    # pozivalac mora ponovo učitati kartice jer su postojeći objekti zastarjeli.
+                    self._signature = None
+                    raise StaleLogError(self.path)
+                card.puni_odgovor = record.get('puni_odgovor', '')
+        return card.puni_odgovor
+
+    def _read_record(self, offset, length):
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                return json.loads(f.read(length))
+        except (OSError, ValueError):
+            return None
+
+    def iter_answers(self, cards=None):
+        """Generator (kartica, odgovor) redom loga; odgovori se čitaju jedan po jedan i ne pamte se.
+
+        cards su učitane kartice ili, npr., kartice iz peek(). Ako linija na
+        poziciji kartice pripada drugoj kartici (log je prepisan), baca StaleLogError.
+        """
+        cards = sorted(self._cards.values() if cards is None else cards,
+                       key=lambda c: (c.offset is None, c.offset or 0))
+        if not cards:
+            return
+        with open(self.path, 'rb') as f:
+            for card in cards:
+                answer = card.puni_odgovor
+                if answer is None and card.offset is not None:
+                    f.seek(card.offset)
+                    try:
+                        record = json.loads(f.read(card.length))
+                    except ValueError:
+                        record = None
+                    if not isinstance(record, dict) or record.get('id') != card.id:
+                        raise StaleLogError(self.path)
+                    answer = record.get('puni_odgovor', '')
+                yield card, answer or ''
+
+    @traced('deck.load_answers')
+    def load_answers(self):
+        """Jednim prolazom kroz log učitava odgovore svih kartica (npr. za pretragu)."""
+        missing = {card_id for card_id, card in self._cards.items() if card.puni_odgovor is None}
+        if not missing:
+            return
+        answers = {}
+        try:
+            with open(self.path, 'rb') as f:
+                for raw in f:
+                    try:
+                        record = json.loads(raw)
+                    except ValueError:
+                        continue
+                    if record.get('id') in missing and 'puni_odgovor' in record:
+                        answers[record['id']] = record['puni_odgovor']
+        except FileNotFoundError:
+            pass
+        for card_id in missing:
+            self._cards[card_id].puni_odgovor = answers.get(card_id, '')
+
+    def _append(self, record):
+        """Dodaje jedan zapis na kraj loga, čeka da bude na disku i vraća (offset, dužina)."""
+        return self._append_many([record])[0]
+
+    @traced('deck.append')
+    def _append_many(self, records):
+        """Dodaje više zapisa jednim upisom i jednim fsync-om; vraća (offset, dužina) za svaki."""
+        lines = [_encode_records([record]) for record in records]
+        with self._locked():
+            with open(self.path, 'ab') as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(b''.join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            positions = []
+            for line in lines:
+                positions.append((offset, len(line)))
+                offset += len(line)
+            self._line_count += len(lines)
+            self._end = offset
+            self._signature = self._stat_signature()
+        return positions
+
+    def add(self, title, answer):
+        """Dodaje novu karticu i vraća je (s dodijeljenim 'id')."""
+        return self.add_many([(title, answer)])[0]
+
+    def add_many(self, pairs):
+        """Dodaje više kartica (naslov, odgovor) u jednoj transakciji; vraća listu kartica."""
+        pairs = list(pairs)
+        if not pairs:
+            return []
+        with self._locked():
+            # Id-ovi se dodjeljuju tek pod zaključavanjem, nakon dočitavanja loga.
+            cards = [Card(self._next_id + i, title, answer) for i, (title, answer) in enumerate(pairs)]
+            positions = self._append_many([card.to_record() for card in cards])
+            self._next_id += len(cards)
+            for card, (offset, length) in zip(cards, positions):
+                card.offset, card.length = offset, length
+                self._cards[card.id] = card
+        return cards
+
+    def update(self, card_id, **fields):
+        """Mijenja polja postojeće kartice dodavanjem jednog zapisa u log."""
+        unknown = set(fields) - {'naslov', 'puni_odgovor'}
+        if unknown:
+            raise ValueError(f"Nepoznata polja kartice: {', '.join(sorted(unknown))}")
+        with self._locked():
+            if card_id not in self._cards:
+                raise KeyError(card_id)
+            offset, length = self._append({"id": card_id, **fields})
+            card = self._cards[card_id]
+            for field, value in fields.items():
+                setattr(card, field, value)
+            if 'puni_odgovor' in fields:
+                card.offset, card.length = offset, length
+        return card
+
+    def delete(self, card_id):
+        """Briše karticu dodavanjem zapisa o brisanju."""
+        with self._locked():
+            if card_id in self._cards:
+                self._append({"id": card_id, "obrisano": True})
+                del self._cards[card_id]
+
+    @traced('deck.compact')
+    def compact(self):
+        """Prepisuje log tako da sadrži samo po jedan zapis za svaku živu karticu."""
+        with self._locked():
+            self.load_answers()
+            chunks = [_encode_records([card.to_record()]) for card in self._cards.values()]
+            atomic_write_bytes(self.path, b''.join(chunks))
+            # Pozicije se mijenjaju tek kad je novi log na disku.
+            offset = 0
+            for card, data in zip(self._cards.values(), chunks):
+                card.offset, card.length = offset, len(data)
+                offset += len(data)
+            self._line_count = len(chunks)
+            self._end = offset
+            self._write_index(offset)
+            self._signature = self._stat_signature()
+
+
+def migrate_json_deck(json_path):
+    """Jednokratno prebacuje stari 'predmet.json' u 'predmet.jsonl' log.
+
+    Stari fajl se preimenuje u '.json.bak' kako se predmet ne bi pojavio dvaput.
+    Vraća putanju do novog loga ili None ako stari fajl nije čitljiv.
+    """
+    jsonl_path = os.path.splitext(json_path)[0] + '.jsonl'
+
+    if not os.path.exists(jsonl_path):
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return jsonl_path
+        except json.JSONDecodeError:
+            return None
+
+        records = [
+            {"id": i, "naslov": card.get('naslov', ''), "puni_odgovor": card.get('puni_odgovor', '')}
+            for i, card in enumerate(data, start=1)
+        ]
+        atomic_write_bytes(jsonl_path, _encode_records(records))
+
+    os.replace(json_path, json_path + '.bak')
+    return jsonl_path
+
+
+def migrate_json_decks(data_dir='data'):
+    """Migrira sve stare JSON fajlove predmeta u 'data/' mapi."""
+    try:
+        filenames = os.listdir(data_dir)
+    except FileNotFoundError:
+        return
+    for filename in filenames:
+        # Skriveni fajlovi (npr. manifest kataloga '.catalog.json') nisu predmeti.
+        if filename.endswith('.json') and not filename.startswith('.'):
+            migrate_json_deck(os.path.join(data_dir, filename))
@@ -0,0 +1,199 @@
+"""Binarni format špila ('.deck') za velike, dijeljene špilove koji se samo čitaju.
+
+Raspored fajla (little-endian):
+    zaglavlje:      MAGIC (8 bajtova), verzija (u32), broj kartica (u32)
+    tabela:         za svaku karticu id (u32), offset i dužina naslova (u64, u32),
+                    offset i dužina odgovora (u64, u32)
+    podaci:         UTF-8 tekstovi naslova i odgovora jedan za drugim
+
+Fajl se otvara preko mmap, a stringovi se dekodiraju tek kada se kartica prikaže.
+
+Pretvaranje iz komandne linije:
+    python deck_binary.py to-deck data/biologija.json data/biologija.deck
+    python deck_binary.py to-json data/biologija.deck biologija.json
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+
+from card_store import Card, CardStore, atomic_write_bytes
+
+MAGIC = b'STDECK\x00\x01'
+VERSION = 1
+HEADER = struct.Struct('<8sII')
+ENTRY = struct.Struct('<IQIQI')
+
+
+class MappedCard(Card):
+    """Kartica čiji se naslov i odgovor čitaju direktno iz mmap-a pri svakom pristupu."""
+
+    __slots__ = ('_deck', '_index')
+
+    def __init__(self, deck, index, card_id):
+        self._deck = deck
+        self._index = index
+        self.id = card_id
+        self.offset = None
+        self.length = 0
+
+    @property
+    def naslov(self):
+        return self._deck.title(self._index)
+
+    @property
+    def puni_odgovor(self):
+        return self._deck.answer(self._index)
+
+
+class BinaryDeck:
+    """Špil otvoren preko mmap; tekst se dekodira tek na zahtjev."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"Prazan ili neispravan fajl špila: {path}")
+        magic, version, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Nepoznat format špila: {path}")
+        self.count = count
+        self._view = memoryview(self._map)
+
+    def __len__(self):
+        return self.count
+
+    def _entry(self, index):
+        return ENTRY.unpack_from(self._map, HEADER.size + index * ENTRY.size)
+
+    def card_id(self, index):
+        return self._entry(index)[0]
+
+    def title(self, index):
+        _, offset, length, _, _ = self._entry(index)
+        return str(self._view[offset:offset + length], 'utf-8')
+
+    def answer(self, index):
+        _, _, _, offset, length = self._entry(index)
+        return str(self._view[offset:offset + length], 'utf-8')
+
+    def close(self):
+        if getattr(self, '_view', None) is not None:
+            self._view.release()
+            self._view = None
+        self._map.close()
+        self._file.close()
+
+
+class BinaryDeckStore:
+    """Adapter koji binarni špil nudi kroz isti interfejs kao CardStore (samo čitanje)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.deck = None
+        self.generation = 0
+        self._cards = {}
+        self._signature = None
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def is_current(self):
+        return self._signature is not None and self._signature == self._stat_signature()
+
+    def load(self):
+        """Mapira fajl i vraća kartice; čita se samo tabela id-ova, ne tekst."""
+        if self.is_current():
+            return list(self._cards.values())
+        if self.deck is not None:
+            self.deck.close()
+            self.deck = None
+        self._cards = {}
+        if self._stat_signature() is not None:
+            self.deck = BinaryDeck(self.path)
+            for index in range(len(self.deck)):
+                card = MappedCard(self.deck, index, self.deck.card_id(index))
+                self._cards[card.id] = card
+        self.generation += 1
+        self._signature = self._stat_signature()
+        return list(self._cards.values())
+
+    def get_answer(self, card_id):
+        card = self._cards.get(card_id)
+        return card.puni_odgovor if card is not None else None
+
+    def load_answers(self):
+        """Odgovori se ionako čitaju direktno iz mmap-a."""
+
+    def iter_answers(self, cards=None):
+        for card in self._cards.values() if cards is None else cards:
+            yield card, card.puni_odgovor
+
+    def _read_only(self, *args, **kwargs):
+        raise ValueError("Binarni špil (.deck) je samo za čitanje. Pretvorite ga u JSON da biste ga mijenjali.")
+
+    add = add_many = update = delete = compact = _read_only
+
+
+def write_deck(path, cards):
+    """Atomski zapisuje špil; cards su (id, naslov, odgovor) trojke."""
+    cards = list(cards)
+    table = bytearray()
+    blobs = bytearray()
+    data_start = HEADER.size + ENTRY.size * len(cards)
+    for card_id, title, answer in cards:
+        title_bytes = title.encode('utf-8')
+        answer_bytes = answer.encode('utf-8')
+        title_offset = data_start + len(blobs)
+        blobs += title_bytes
+        answer_offset = data_start + len(blobs)
+        blobs += answer_bytes
+        table += ENTRY.pack(card_id, title_offset, len(title_bytes), answer_offset, len(answer_bytes))
+    atomic_write_bytes(path, HEADER.pack(MAGIC, VERSION, len(cards)) + bytes(table) + bytes(blobs))
+
+
+def read_json_cards(path):
+    """Čita kartice iz JSON liste (stari format) ili JSONL loga kao (id, naslov, odgovor)."""
+    if path.endswith('.jsonl'):
+        store = CardStore(path)
+        cards = store.load()
+        store.load_answers()
+        return [(card.id, card.naslov, card.puni_odgovor) for card in cards]
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return [(i, card.get('naslov', ''), card.get('puni_odgovor', '')) for i, card in enumerate(data, start=1)]
+
+
+def json_to_deck(json_path, deck_path):
+    """Pretvara JSON (ili JSONL) špil u binarni; vraća broj kartica."""
+    cards = read_json_cards(json_path)
+    write_deck(deck_path, cards)
+    return len(cards)
+
+
+def deck_to_json(deck_path, json_path):
+    """Pretvara binarni špil u JSON listu u starom formatu; vraća broj kartica."""
+    deck = BinaryDeck(deck_path)
+    try:
+        data = [{"naslov": deck.title(i), "puni_odgovor": deck.answer(i)} for i in range(len(deck))]
+    finally:
+        deck.close()
+    atomic_write_bytes(json_path, json.dumps(data, indent=4, ensure_ascii=False).encode('utf-8'))
+    return len(data)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ('to-deck', 'to-json'):
+        print("Upotreba: python deck_binary.py to-deck|to-json ULAZ IZLAZ")
+        sys.exit(2)
+    convert = json_to_deck if sys.argv[1] == 'to-deck' else deck_to_json
+    print(f"Pretvoreno kartica: {convert(sys.argv[2], sys.argv[3])}")
@@ -0,0 +1,208 @@
+"""Masovni uvoz i izvoz kartica (CSV, JSONL, Anki TSV) bez učitavanja cijelih fajlova.
+
+Uvoz čita ulazni fajl zapis po zapis, preskače kartice koje već postoje
+(isti normalizirani naslov i odgovor) i upisuje nove u serijama preko
+CardStore.add_many (jedan upis i jedan fsync po seriji). Izvoz čita špil iz
+'data/' karticu po karticu i piše direktno u izlazni fajl.
+
+Iz komandne linije:
+    python deck_io.py import data/biologija.jsonl kartice.csv
+    python deck_io.py export data/biologija.jsonl biologija.tsv
+"""
+import csv
+import hashlib
+import html
+import json
+import os
+import re
+import sys
+
+from card_store import CardStore
+from deck_binary import BinaryDeckStore
+
+IMPORT_BATCH = 5000
+FORMATS = ('csv', 'jsonl', 'tsv')
+_EXTENSIONS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.tsv': 'tsv', '.txt': 'tsv'}
+
+# Nazivi kolona / ključeva koji se prepoznaju kao naslov i odgovor.
+TITLE_KEYS = ('naslov', 'pitanje', 'question', 'front', 'title')
+ANSWER_KEYS = ('puni_odgovor', 'odgovor', 'answer', 'back')
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_BR_RE = re.compile(r'<br\s*/?>|</div>|</p>', re.IGNORECASE)
+_SPACES_RE = re.compile(r'\s+')
+
+
+def detect_format(path):
+    fmt = _EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Nepoznat format fajla '{path}' (podržano: .csv, .jsonl, .tsv/.txt).")
+    return fmt
+
+
+def card_hash(title, answer):
+    """Hash kartice bez razlike u velikim slovima i razmacima (za prepoznavanje duplikata)."""
+    normalized = _SPACES_RE.sub(' ', title.lower()).strip() + '\x1f' + _SPACES_RE.sub(' ', answer.lower()).strip()
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
+
+
+def _pick(mapping, keys):
+    for key in keys:
+        value = mapping.get(key)
+        if value:
+            return str(value)
+    return ''
+
+
+def _strip_html(text):
+    if '<' not in text and '&' not in text:
+        return text
+    return html.unescape(_TAG_RE.sub('', _BR_RE.sub('\n', text))).strip()
+
+
+def _iter_csv(f, delimiter):
+    reader = csv.reader(f, delimiter=delimiter)
+    first = next(reader, None)
+    if first is None:
+        return
+    header = [cell.strip().lower() for cell in first]
+    title_col = next((header.index(k) for k in TITLE_KEYS if k in header), None)
+    answer_col = next((header.index(k) for k in ANSWER_KEYS if k in header), None)
+    if title_col is None or answer_col is None:
+        # Bez zaglavlja: prve dvije kolone, a prvi red je već kartica.
+        title_col, answer_col = 0, 1
+        if len(first) > 1:
+            yield first[0], first[1]
+    for row in reader:
+        if len(row) > max(title_col, answer_col):
+            yield row[title_col], row[answer_col]
+
+
+def iter_records(path, fmt=None):
+    """Generator (naslov, odgovor) iz CSV, JSONL ili Anki TSV fajla."""
+    fmt = fmt or detect_format(path)
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        if fmt == 'jsonl':
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict):
+                    yield _pick(record, TITLE_KEYS), _pick(record, ANSWER_KEYS)
+        elif fmt == 'csv':
+            # Excel s regionalnim postavkama često koristi ';'; razdjelnik se bira po prvom redu.
+            first_line = f.readline()
+            f.seek(0)
+            delimiter = max(',;\t', key=first_line.count)
+            yield from _iter_csv(f, delimiter)
+        else:
+            # Anki izvoz: redovi '#separator:tab', '#html:true' itd. su zaglavlje.
+            lines = (line for line in f if not line.startswith('#'))
+            for row in csv.reader(lines, delimiter='\t'):
+                if len(row) >= 2:
+                    yield _strip_html(row[0]), _strip_html(row[1])
+
+
+def open_store(deck_path):
+    """Otvara špil iz 'data/' (JSONL ili binarni) i učitava naslove."""
+    store = BinaryDeckStore(deck_path) if deck_path.endswith('.deck') else CardStore(deck_path)
+    store.load()
+    return store
+
+
+def import_cards(deck_path, source_path, fmt=None, batch_size=IMPORT_BATCH, on_progress=None, store=None):
+    """Uvozi kartice iz source_path u špil; vraća rječnik s brojem pročitanih, dodanih i preskočenih.
+
+    on_progress(pročitano, dodano) se poziva nakon svake serije. Ako je špil
+    već otvoren (npr. FlashcardProgram.store), treba ga proslijediti kao store,
+    da id-ove novih kartica dodjeljuje isti objekat.
+    """
+    if deck_path.endswith('.deck'):
+        raise ValueError("Binarni špil (.deck) je samo za čitanje; uvezite u JSONL predmet.")
+    if store is None:
+        store = open_store(deck_path)
+    else:
+        store.load()
+    seen = {card_hash(card.naslov, answer) for card, answer in store.iter_answers()}
+
+    stats = {"read": 0, "added": 0, "duplicates": 0, "invalid": 0}
+    batch = []
+
+    def flush():
+        store.add_many(batch)
+        stats["added"] += len(batch)
+        batch.clear()
+        if on_progress:
+            on_progress(stats["read"], stats["added"])
+
+    for title, answer in iter_records(source_path, fmt):
+        stats["read"] += 1
+        title, answer = title.strip(), answer.strip()
+        if not title:
+            stats["invalid"] += 1
+            continue
+        key = card_hash(title, answer)
+        if key in seen:
+            stats["duplicates"] += 1
+            continue
+        seen.add(key)
+        batch.append((title, answer))
+        if len(batch) >= batch_size:
+            flush()
+    if batch or on_progress:
+        flush()
+    return stats
+
+
+def export_cards(deck_path, target_path, fmt=None, on_progress=None, progress_every=IMPORT_BATCH):
+    """Izvozi špil u CSV, JSONL ili Anki TSV; vraća broj izvezenih kartica.
+
+    Piše se u privremeni fajl koji na kraju zamjenjuje odredište.
+    """
+    fmt = fmt or detect_format(target_path)
+    store = open_store(deck_path)
+    tmp_path = target_path + '.tmp'
+    count = 0
+    try:
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            if fmt == 'jsonl':
+                write = lambda title, answer: f.write(
+                    json.dumps({"naslov": title, "puni_odgovor": answer}, ensure_ascii=False) + '\n')
+            else:
+                if fmt == 'tsv':
+                    f.write('#separator:tab\n#html:false\n')
+                writer = csv.writer(f, delimiter='\t' if fmt == 'tsv' else ',')
+                if fmt == 'csv':
+                    writer.writerow(('naslov', 'puni_odgovor'))
+                write = lambda title, answer: writer.writerow((title, answer))
+            for card, answer in store.iter_answers():
+                write(card.naslov, answer)
+                count += 1
+                if on_progress and count % progress_every == 0:
+                    on_progress(count)
+        os.replace(tmp_path, target_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        if isinstance(store, BinaryDeckStore) and store.deck is not None:
+            store.deck.close()
+    return count
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ('import', 'export'):
+        print("Upotreba: python deck_io.py import ŠPIL ULAZ   |   python deck_io.py export ŠPIL IZLAZ")
+        sys.exit(2)
+    if sys.argv[1] == 'import':
+        result = import_cards(sys.argv[2], sys.argv[3],
+                              on_progress=lambda read, added: print(f"Pročitano {read}, dodano {added}..."))
+        print(f"Uvezeno: {result['added']} novih, {result['duplicates']} duplikata, "
+              f"{result['invalid']} neispravnih (od {result['read']} zapisa).")
+    else:
+        print(f"Izvezeno kartica: {export_cards(sys.argv[2], sys.argv[3])}")
@@ -0,0 +1,123 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+class DiskCache:
+    """Trajni key/value keš (sqlite3) s ograničenjem veličine i LRU izbacivanjem.
+
+    Vrijednosti su stringovi. Svako čitanje osvježava 'last_used', a kada zbir
+    veličina pređe max_bytes, najdavnije korišteni unosi se brišu dok keš ne
+    padne na 90% ograničenja. Ako je zadan ttl (sekunde), stariji unosi se
+    smatraju promašajem i brišu se. Siguran je za korištenje iz više niti.
+    """
+
+    def __init__(self, path, max_bytes, ttl=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " size INTEGER NOT NULL, last_used REAL NOT NULL,"
+            " created REAL NOT NULL DEFAULT 0)"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(entries)")]
+        if 'created' not in columns:
+            self._conn.execute("ALTER TABLE entries ADD COLUMN created REAL NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used)")
+        self._conn.commit()
+
+    def get(self, key):
+        """Vraća vrijednost za ključ ili None."""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        """Vraća rječnik {ključ: vrijednost} za ključeve koji postoje u kešu."""
+        keys = list(keys)
+        found = {}
+        now = time.time()
+        with self._lock:
+            # sqlite ima ograničen broj parametara po upitu.
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, value, created FROM entries WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update((key, value) for key, value, _ in rows)
+                if self.ttl is not None:
+                    expired = [(key,) for key, _, created in rows if created < now - self.ttl]
+                    for (key,) in expired:
+                        del found[key]
+                    self._conn.executemany("DELETE FROM entries WHERE key = ?", expired)
+            if found:
+                self._conn.executemany(
+                    "UPDATE entries SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+            self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put(self, key, value):
+        """Sprema jednu vrijednost."""
+        self.put_many([(key, value)])
+
+    def put_many(self, items):
+        """Sprema više vrijednosti u jednoj transakciji, pa po potrebi izbacuje stare."""
+        now = time.time()
+        rows = [(key, value, len(value.encode('utf-8')), now, now) for key, value in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_used, created) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Briše najdavnije korištene unose dok ukupna veličina ne padne ispod 90% ograničenja."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            if total <= target:
+                break
+            doomed.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+
+    def clear(self):
+        """Briše sve unose."""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def stats(self):
+        """Vraća broj unosa, ukupnu veličinu i brojače pogodaka/promašaja."""
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {"entries": count, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,354 @@
+"""Pronalaženje skoro istih kartica u svim predmetima (MinHash + LSH).
+
+Svaka kartica se pretvara u skup riječi i parova riječi (naslov i odgovor,
+bez razlike u velikim slovima, dijakriticima i interpunkciji) i sažima u MinHash
+potpis od NUM_HASHES brojeva. Potpisi se dijele u BANDS traka; kartice koje
+se poklapaju u barem jednoj traci su kandidati, pa se porede samo oni umjesto
+svih parova. Sličnost se procjenjuje kao udio jednakih vrijednosti potpisa
+(procjena Jaccardove sličnosti tih skupova). NumPy, ako je instaliran, samo
+ubrzava računanje potpisa.
+
+Iz komandne linije:
+    python duplicates.py [--threshold 0.8]
+"""
+import array
+import base64
+import functools
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import unicodedata
+from collections import defaultdict
+
+import tracing
+from card_store import CardStore, StaleLogError
+from disk_cache import DiskCache
+from deck_binary import BinaryDeckStore
+from subject_catalog import SUBJECT_EXTENSIONS
+
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+# Od ove procijenjene sličnosti kartice se smatraju duplikatima.
+THRESHOLD = 0.6
+# Dugi odgovori ne mijenjaju mnogo sličnost, a usporavaju potpis.
+MAX_WORDS = 300
+
+SIGNATURE_CACHE_PATH = os.path.join('cache', 'duplicates.sqlite3')
+SIGNATURE_CACHE_MAX_MB = int(os.getenv("DUPLICATES_CACHE_MAX_MB", "100"))
+# Mijenja se kada se promijene shingles() ili signature().
+SIGNATURE_VERSION = 1
+
+_WORD_RE = re.compile(r'\w+')
+_FOLD = str.maketrans('čćžšđ', 'cczsd')
+
+
+def normalize(text):
+    """Mala slova bez dijakritika ('Šta' i 'sta' su ista riječ)."""
+    text = text.lower()
+    if text.isascii():
+        return text
+    text = text.translate(_FOLD)
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def shingles(title, answer):
+    """Skup riječi i parova susjednih riječi kartice (naslov i odgovor odvojeno)."""
+    grams = set()
+    for prefix, text in (('n:', title), ('o:', answer)):
+        words = _WORD_RE.findall(normalize(text))[:MAX_WORDS]
+        grams.update(prefix + word for word in words)
+        grams.update(f'{prefix}{a} {b}' for a, b in zip(words, words[1:]))
+    return grams or {''}
+
+
+@functools.lru_cache(maxsize=None)
+def _numpy():
+    """NumPy ili None; uvozi se pri prvom potpisu, da ne usporava pokretanje programa."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def signature(title, answer):
+    """MinHash potpis kartice: NUM_HASHES minimuma 32-bitnih hasheva po n-gramu.
+
+    Jedan shake_128 poziv po n-gramu daje svih NUM_HASHES hasheva odjednom.
+    """
+    digests = b''.join([hashlib.shake_128(gram.encode('utf-8')).digest(NUM_HASHES * 4)
+                        for gram in shingles(title, answer)])
+    numpy = _numpy()
+    if numpy is not None:
+        return tuple(numpy.frombuffer(digests, dtype=numpy.uint32).reshape(-1, NUM_HASHES).min(0).tolist())
+    values = array.array('I', digests)
+    return tuple(min(values[i::NUM_HASHES]) for i in range(NUM_HASHES))
+
+
+def similarity(sig_a, sig_b):
+    """Procjena Jaccardove sličnosti iz dva potpisa (0..1)."""
+    return sum(a == b for a, b in zip(sig_a, sig_b)) / NUM_HASHES
+
+
+def _bands(sig):
+    return [(band, sig[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+
+def _read_deck(path):
+    """(store, kartice) bez ikakvog pisanja u špil.
+
+    JSONL log se čita preko CardStore.peek(), jer isti log u GUI niti može biti
+    otvoren za pisanje; load() bi mogao odsjeći zapis, pisati indeks ili kompaktirati.
+    """
+    if path.endswith('.deck'):
+        store = BinaryDeckStore(path)
+        return store, store.load()
+    store = CardStore(path)
+    return store, store.peek()
+
+
+def _encode_deck(cards):
+    """Potpisi jednog špila kao string za keš: naslovi i pozicije u JSON-u, potpisi kao base64 niz."""
+    sigs = array.array('I')
+    for _, sig, _ in cards.values():
+        sigs.extend(sig)
+    return json.dumps({"ids": list(cards), "titles": [title for title, _, _ in cards.values()],
+                       "pos": [pos for _, _, pos in cards.values()],
+                       "sigs": base64.b64encode(sigs.tobytes()).decode('ascii')}, ensure_ascii=False)
+
+
+def _decode_deck(value):
+    data = json.loads(value)
+    sigs = array.array('I', base64.b64decode(data['sigs']))
+    if len(sigs) != NUM_HASHES * len(data['ids']):
+        raise ValueError("Neispravan unos u kešu potpisa")
+    return {card_id: (title, tuple(sigs[i * NUM_HASHES:(i + 1) * NUM_HASHES]), tuple(pos) if pos else None)
+            for i, (card_id, title, pos) in enumerate(zip(data['ids'], data['titles'], data['pos']))}
+
+
+class DuplicateIndex:
+    """LSH indeks potpisa svih kartica u 'data/' mapi.
+
+    refresh() ponovo čita samo špilove čija se veličina ili mtime promijenila.
+    Potpisi se čuvaju u kešu ('cache/duplicates.sqlite3') po nazivu špila,
+    veličini i mtime-u, pa se pri pokretanju ne računaju ponovo; kad se špil
+    promijeni, ponovo se potpisuju samo kartice čija se linija loga promijenila.
+    Potpisi se računaju izvan zaključavanja, pa query() iz GUI niti ne čeka
+    na osvježavanje koje radi u pozadini.
+    """
+
+    def __init__(self, data_dir='data', cache_path=SIGNATURE_CACHE_PATH):
+        self.data_dir = data_dir
+        self.cache_path = cache_path
+        self._cache = None
+        self._decks = {}  # fajl -> (stat, {id kartice: (naslov, potpis, pozicija u logu)})
+        self._buckets = defaultdict(set)  # (traka, vrijednosti) -> {(fajl, id)}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def __len__(self):
+        return sum(len(cards) for _, cards in self._decks.values())
+
+    @property
+    def ready(self):
+        """True nakon prvog završenog refresh(); prije toga indeks nije potpun."""
+        return self._ready.is_set()
+
+    def _deck_files(self):
+        try:
+            entries = list(os.scandir(self.data_dir))
+        except FileNotFoundError:
+            return {}
+        files = {}
+        for entry in entries:
+            if entry.name.endswith(SUBJECT_EXTENSIONS) and not entry.name.startswith('.') and entry.is_file():
+                st = entry.stat()
+                files[entry.name] = (st.st_size, st.st_mtime_ns, st.st_ino)
+        return files
+
+    def _cache_key(self, name, stat):
+        return f"{name}:{stat[0]}:{stat[1]}:{SIGNATURE_VERSION}"
+
+    def _cached(self, name, stat):
+        """Potpisi špila iz keša ako je zapisan za istu veličinu i mtime; inače None."""
+        if self.cache_path is None:
+            return None
+        if self._cache is None:
+            self._cache = DiskCache(self.cache_path, SIGNATURE_CACHE_MAX_MB * 1024 * 1024)
+        value = self._cache.get(self._cache_key(name, stat))
+        if value is None:
+            return None
+        try:
+            return _decode_deck(value)
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def _sign_deck(self, name, previous):
+        """Čita špil i potpisuje kartice; vraća (stat nakon čitanja, kartice).
+
+        Kartica čija je linija loga ista kao pri prethodnom čitanju (isti inode,
+        pozicija i naslov) zadržava stari potpis.
+        """
+        path = os.path.join(self.data_dir, name)
+        # Stat se uzima prije čitanja: ako se špil promijeni usred čitanja, sljedeći refresh ga čita ponovo.
+        st = os.stat(path)
+        stat = (st.st_size, st.st_mtime_ns, st.st_ino)
+        store, deck_cards = _read_deck(path)
+        reuse = previous[1] if previous is not None and previous[0][2] == stat[2] else {}
+        cards = {}
+        pending = []
+        for card in deck_cards:
+            pos = (card.offset, card.length) if getattr(card, 'offset', None) is not None else None
+            old = reuse.get(card.id)
+            if pos is not None and old is not None and old[2] == pos and old[0] == card.naslov:
+                cards[card.id] = old
+            else:
+                pending.append(card)
+        for card, answer in store.iter_answers(pending):
+            pos = (card.offset, card.length) if getattr(card, 'offset', None) is not None else None
+            cards[card.id] = (card.naslov, signature(card.naslov, answer), pos)
+        return stat, cards
+
+    @tracing.traced('duplicates.refresh')
+    def refresh(self):
+        """Usklađuje indeks s mapom; vraća broj ponovo pročitanih špilova."""
+        with self._refresh_lock:
+            files = self._deck_files()
+            stale = [name for name, stat in files.items()
+                     if name not in self._decks or self._decks[name][0] != stat]
+            removed = [name for name in self._decks if name not in files]
+            for name in stale:
+                stat = files[name]
+                cards = self._cached(name, stat)
+                if cards is None:
+                    try:
+                        stat, cards = self._sign_deck(name, self._decks.get(name))
+                    except StaleLogError:
+                        # Log je prepisan dok se čitao; stari potpisi ostaju do sljedećeg refresh().
+                        continue
+                    except (OSError, ValueError):
+                        cards = {}
+                    else:
+                        if self._cache is not None:
+                            self._cache.put(self._cache_key(name, stat), _encode_deck(cards))
+                with self._lock:
+                    self._drop(name)
+                    self._decks[name] = (stat, cards)
+                    for card_id, (_, sig, _) in cards.items():
+                        for key in _bands(sig):
+                            self._buckets[key].add((name, card_id))
+            with self._lock:
+                for name in removed:
+                    self._drop(name)
+            self._ready.set()
+            return len(stale)
+
+    def _drop(self, name):
+        entry = self._decks.pop(name, None)
+        if entry is None:
+            return
+        for card_id, (_, sig, _) in entry[1].items():
+            for key in _bands(sig):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard((name, card_id))
+                    if not bucket:
+                        del self._buckets[key]
+
+    def _candidates(self, sig):
+        found = set()
+        for key in _bands(sig):
+            found.update(self._buckets.get(key, ()))
+        return found
+
+    def query(self, title, answer, threshold=THRESHOLD, limit=5):
+        """Kartice slične novoj kartici: lista (fajl, id, naslov, sličnost), najsličnije prve.
+
+        Vraća None dok prvi refresh() nije završen (prazna lista tada ne bi
+        značila da duplikata nema).
+        """
+        if not self.ready:
+            return None
+        sig = signature(title, answer)
+        matches = []
+        with self._lock:
+            for name, card_id in self._candidates(sig):
+                other_title, other_sig, _ = self._decks[name][1][card_id]
+                score = similarity(sig, other_sig)
+                if score >= threshold:
+                    matches.append((name, card_id, other_title, score))
+        matches.sort(key=lambda match: -match[3])
+        return matches[:limit]
+
+    def find_duplicates(self, threshold=THRESHOLD):
+        """Grupe skoro istih kartica u svim predmetima.
+
+        Vraća listu grupa, najveće prve; grupa je lista (fajl, id, naslov,
+        sličnost s prvom karticom u grupi).
+        """
+        with self._lock:
+            parent = {}
+
+            def find(ref):
+                root = parent.setdefault(ref, ref)
+                while parent[root] != root:
+                    root = parent[root]
+                parent[ref] = root
+                return root
+
+            signatures = {(name, card_id): sig
+                          for name, (_, cards) in self._decks.items()
+                          for card_id, (_, sig, _) in cards.items()}
+            checked = set()
+            for bucket in self._buckets.values():
+                if len(bucket) < 2:
+                    continue
+                members = sorted(bucket)
+                for i, a in enumerate(members):
+                    for b in members[i + 1:]:
+                        if (a, b) in checked:
+                            continue
+                        checked.add((a, b))
+                        if similarity(signatures[a], signatures[b]) >= threshold:
+                            root_a, root_b = find(a), find(b)
+                            if root_a != root_b:
+                                parent[root_b] = root_a
+
+            groups = defaultdict(list)
+            for ref in parent:
+                groups[find(ref)].append(ref)
+            result = []
+            for members in groups.values():
+                members.sort()
+                first = signatures[members[0]]
+                result.append([(name, card_id, self._decks[name][1][card_id][0],
+                                similarity(first, signatures[(name, card_id)]))
+                               for name, card_id in members])
+        result.sort(key=lambda group: (-len(group), group[0][2].lower()))
+        return result
+
+
+if __name__ == "__main__":
+    threshold = THRESHOLD
+    if len(sys.argv) == 3 and sys.argv[1] == '--threshold':
+        threshold = float(sys.argv[2])
+    elif len(sys.argv) != 1:
+        print("Upotreba: python duplicates.py [--threshold 0.8]")
+        sys.exit(2)
+    index = DuplicateIndex('data')
+    index.refresh()
+    groups = index.find_duplicates(threshold)
+    for group in groups:
+        print(f"--- {len(group)} kartice")
+        for name, card_id, title, score in group:
+            print(f"  [{os.path.splitext(name)[0]} #{card_id}] {title}  ({score:.0%})")
+    extra = sum(len(group) - 1 for group in groups)
+    print(f"Pregledano {len(index)} kartica; {len(groups)} grupa duplikata, {extra} suvišnih kartica.")
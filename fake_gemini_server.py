@@ -0,0 +1,106 @@
+"""Lažni Gemini HTTP server za testiranje bez mreže.
+
+Odgovara na generateContent i streamGenerateContent (SSE) kao Gemini API i
+vraća izmišljena pitanja u formatu koji traži PROMPT_TEMPLATE. Može
+namjerno kasniti i vraćati greške, pa se ponavljanje i ograničenje brzine u
+gemini_client mogu provjeriti lokalno.
+
+Upotreba:
+    python fake_gemini_server.py --port 8765 --latency 0.2 --error-rate 0.3
+    GEMINI_BASE_URL=http://127.0.0.1:8765 python main.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_NUM_RE = re.compile(r'Generiraj tačno (\d+) pitanja')
+
+
+def fake_questions(prompt):
+    match = _NUM_RE.search(prompt)
+    count = int(match.group(1)) if match else 5
+    return [{"pitanje": f"Testno pitanje {i} ({random.randrange(10 ** 6)})?", "odgovor": f"Testni odgovor {i}."}
+            for i in range(1, count + 1)]
+
+
+def _candidate(text):
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}]}
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        request = json.loads(self.rfile.read(length) or b'{}')
+        with server.stats_lock:
+            server.stats['requests'] += 1
+
+        time.sleep(server.latency)
+        if random.random() < server.error_rate:
+            status = random.choice((429, 503))
+            with server.stats_lock:
+                server.stats[f'http_{status}'] = server.stats.get(f'http_{status}', 0) + 1
+            self._send_json(status, {"error": {"code": status, "message": "Lažna greška za test.",
+                                               "status": "RESOURCE_EXHAUSTED" if status == 429 else "UNAVAILABLE"}})
+            return
+
+        prompt = ''.join(part.get('text', '') for content in request.get('contents', [])
+                         for part in content.get('parts', []))
+        text = json.dumps(fake_questions(prompt), ensure_ascii=False, indent=2)
+
+        if ':streamGenerateContent' not in self.path:
+            self._send_json(200, _candidate(text))
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        step = max(1, len(text) // 5)
+        for i in range(0, len(text), step):
+            event = json.dumps(_candidate(text[i:i + step]), ensure_ascii=False)
+            self.wfile.write(f"data: {event}\r\n\r\n".encode('utf-8'))
+            self.wfile.flush()
+        self.close_connection = True
+
+
+def make_server(host='127.0.0.1', port=0, latency=0.0, error_rate=0.0):
+    """Pravi (ali ne pokreće) server; port=0 bira slobodan port (server.server_address)."""
+    server = ThreadingHTTPServer((host, port), FakeGeminiHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.error_rate = error_rate
+    server.stats = {'requests': 0}
+    server.stats_lock = threading.Lock()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lažni Gemini server za lokalne testove.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="kašnjenje odgovora u sekundama")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="udio zahtjeva koji vraćaju 429/503")
+    args = parser.parse_args()
+    server = make_server(port=args.port, latency=args.latency, error_rate=args.error_rate)
+    print(f"Lažni Gemini server radi na http://127.0.0.1:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -1,39 +1,129 @@
-import json
-import random
+import math
 import os
 
+from card_store import CardStore, StaleLogError, migrate_json_deck
+from deck_binary import BinaryDeckStore
+from search_index import SearchIndex
+from scheduler import Scheduler, GRADE_CORRECT, GRADE_INCORRECT
+import tracing
+
+SESSION_SIZE = int(os.getenv("SESSION_SIZE", "50"))
+# Koliko puta get_answer ponovo učitava kartice ako drugi proces upravo prepisuje log.
+STALE_RETRIES = 3
+
 class FlashcardProgram:
-    
-    @staticmethod
-    def get_available_subjects():
-        """Skenira 'data/' mapu i vraća listu dostupnih predmeta."""
-        subject_files = []
-        data_dir = 'data'
-        try:
-            for filename in os.listdir(data_dir):
-                if filename.endswith('.json'):
-                    subject_name = os.path.splitext(filename)[0].capitalize()
-                    subject_files.append((subject_name, filename))
-            return subject_files
-        except FileNotFoundError:
-            return []
 
     def __init__(self, filename):
         self.filename = os.path.join('data', filename)
-        self.cards = self._load_cards()
+        if self.filename.endswith('.json'):
+            self.filename = migrate_json_deck(self.filename) or self.filename + 'l'
+        if self.filename.endswith('.deck'):
+            self.store = BinaryDeckStore(self.filename)
+        else:
+            self.store = CardStore(self.filename)
+        self.scheduler = Scheduler(os.path.splitext(self.filename)[0] + '.reviews')
+        self.search_index = None
+        self._generation = None
         self.session_cards = []
         self.total_in_session = 0
         self.current_session_index = 0
-        self.incorrect_cards_list = []
+        self.incorrect_card_ids = []
+        self._incorrect_set = set()
         self.current_card = None
+        self.cards = self._load_cards()
 
     def _load_cards(self):
-        """Učitava kartice iz JSON fajla."""
-        try:
-            with open(self.filename, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
+        """Učitava naslove kartica iz loga predmeta (odgovori se čitaju po potrebi).
+
+        Ako se fajl nije promijenio od zadnjeg učitavanja, vraća postojeće kartice.
+        """
+        if self.store.is_current() and self.store.generation == self._generation:
+            return self.cards
+        self.cards = self.store.load()
+        self._generation = self.store.generation
+        self.cards_by_id = {card.id: card for card in self.cards}
+        self.search_index = None
+        self.scheduler.load(self.cards_by_id)
+        self._drop_missing_from_session()
+        return self.cards
+
+    def _drop_missing_from_session(self):
+        """Izbacuje iz sesije id-ove kartica koje su u međuvremenu obrisane."""
+        remaining = [card_id for card_id in self.session_cards if card_id in self.cards_by_id]
+        self.total_in_session -= len(self.session_cards) - len(remaining)
+        self.session_cards = remaining
+        self.incorrect_card_ids = [card_id for card_id in self.incorrect_card_ids if card_id in self.cards_by_id]
+        self._incorrect_set &= self.cards_by_id.keys()
+        if self.current_card is not None and self.current_card.id not in self.cards_by_id:
+            self.current_card = None
+
+    def reload(self):
+        """Ponovo gradi popis kartica nakon izmjena mimo add_card (npr. masovni uvoz kroz self.store)."""
+        self._generation = None
+        return self._load_cards()
+
+    def add_card(self, title, answer):
+        """Dodaje novu karticu na kraj loga bez prepisivanja cijelog fajla."""
+        generation = self.store.generation
+        card = self.store.add(title, answer)
+        if self.store.generation != generation:
+            # Store je prije upisa dočitao kartice koje je dodao neko drugi.
+            self._load_cards()
+            return card
+        self.cards.append(card)
+        self.cards_by_id[card.id] = card
+        self.scheduler.add_card(card.id)
+        if self.search_index is not None:
+            self.search_index.add(card)
+        return card
+
+    def get_search_index(self):
+        """Vraća indeks za pretragu; gradi se pri prvom pozivu i dopunjuje novim karticama."""
+        if self.search_index is None:
+            self.set_search_index(*self.build_search_index())
+        return self.search_index
+
+    def build_search_index(self):
+        """Gradi novi indeks za pretragu (čita sve odgovore, pa se u GUI-ju poziva iz pozadinskog posla).
+
+        Vraća (indeks, generacija kartica); indeks se ne postavlja ovdje, to radi
+        set_search_index() u UI niti.
+        """
+        generation = self._generation
+        cards = list(self.cards)
+        self.store.load_answers()
+        with tracing.span('search.build', cards=len(cards)):
+            return SearchIndex(cards), generation
+
+    def set_search_index(self, index, generation):
+        """Postavlja indeks izgrađen u pozadini i dodaje mu kartice dodane u međuvremenu.
+
+        Indeks izgrađen prije ponovnog učitavanja kartica (npr. nakon brisanja) se
+        odbacuje; tada se vraća None i indeks treba graditi ponovo.
+        """
+        if generation != self._generation:
+            return self.search_index
+        if self.search_index is None:
+            for card in self.cards[len(index):]:
+                index.add(card)
+            self.search_index = index
+        return self.search_index
+
+    def get_answer(self, card_id):
+        """Vraća puni odgovor kartice; čita se s diska tek pri prvom prikazu.
+
+        Ako je log u međuvremenu prepisan, kartice (i raspored, indeks pretrage)
+        se ponovo učitavaju prije čitanja odgovora. Ako se log prepisuje i dalje,
+        nakon STALE_RETRIES pokušaja vraća None.
+        """
+        for _ in range(STALE_RETRIES):
+            try:
+                return self.store.get_answer(card_id)
+            except StaleLogError:
+                self._load_cards()
+                if self.current_card is not None:
+                    self.current_card = self.cards_by_id.get(self.current_card.id, self.current_card)
+        return None
 
     def get_subject_name(self):
         """Vraća naziv predmeta na osnovu imena fajla."""
@@ -41,47 +131,76 @@ class FlashcardProgram:
         return os.path.splitext(base_name)[0].capitalize()
 
 
-    def start_session(self):
-        """Pokreće novu sesiju učenja."""
+    def start_session(self, limit=SESSION_SIZE, practice=False):
+        """Pokreće novu sesiju od najviše limit kartica kojima je istekao rok.
+
+        Najhitnije kartice dolaze prve; nove (neocijenjene) kartice su odmah na redu.
+        Uz practice=True sesija uzima kartice najbliže roku i kada im rok još nije istekao.
+        """
+        self.session_cards = []
+        self.total_in_session = 0
         if not self.cards:
             return
 
-        self.session_cards = self.cards.copy()
-        random.shuffle(self.session_cards)
+        due_ids = self.scheduler.due_cards(limit, now=math.inf if practice else None)
+        # Sesija čuva samo id-ove; get_next_card_in_session uzima s kraja liste.
+        self.session_cards = due_ids[::-1]
         
         self.total_in_session = len(self.session_cards)
         self.current_session_index = 0
-        self.incorrect_cards_list = []
+        self.incorrect_card_ids = []
+        self._incorrect_set = set()
         self.current_card = None
 
     def get_next_card_in_session(self):
-        """Vraća sljedeću karticu u izmiješanoj sesiji."""
+        """Vraća sljedeću karticu sesije i tekst napretka.
+
+        Kartice dolaze redom kojim ih je start_session uzeo iz SM-2 rasporeda:
+        najranije istekao rok prvi, nove kartice odmah; samo kartice s istim
+        rokom su međusobno izmiješane.
+        """
         if not self.session_cards:
             self.current_card = None
             return None, "Sesija završena!"
 
         self.current_session_index += 1
-        self.current_card = self.session_cards.pop()
+        self.current_card = self.cards_by_id[self.session_cards.pop()]
         
         progress_text = f"Pitanje: {self.current_session_index} / {self.total_in_session}"
         
-        return self.current_card.get('naslov', 'Nema naslova'), progress_text
+        return self.current_card.naslov or 'Nema naslova', progress_text
 
     def get_current_answer(self):
         """Vraća puni odgovor za trenutno izabranu karticu."""
         if self.current_card:
-            return self.current_card.get('puni_odgovor', 'Nema odgovora')
+            return self.get_answer(self.current_card.id) or 'Nema odgovora'
         return "Nema odgovora."
 
+    def record_answer(self, was_correct):
+        """Bilježi odgovor na trenutnu karticu u raspored ponavljanja."""
+        if not self.current_card:
+            return
+        self.scheduler.review(self.current_card.id, GRADE_CORRECT if was_correct else GRADE_INCORRECT)
+        if not was_correct:
+            self.mark_current_incorrect()
+
+    def next_due_time(self):
+        """Vraća vrijeme (timestamp) kada je sljedeća kartica na redu ili None."""
+        return self.scheduler.next_due()
+
     def mark_current_incorrect(self):
         """Ne znam odgovor."""
-        if self.current_card and self.current_card not in self.incorrect_cards_list:
-            self.incorrect_cards_list.append(self.current_card)
+        if self.current_card and self.current_card.id not in self._incorrect_set:
+            self._incorrect_set.add(self.current_card.id)
+            self.incorrect_card_ids.append(self.current_card.id)
 
     def get_incorrect_summary(self):
         """Vraća listu naslova od pitanja na koja niste znali odgovor."""
-        if not self.incorrect_cards_list:
+        if not self.incorrect_card_ids:
             return "Sva pitanja ste znali! Čestitamo!"
         
-        titles = [card.get('naslov', 'Nepoznato') for card in self.incorrect_cards_list]
+        titles = [self.cards_by_id[card_id].naslov or 'Nepoznato'
+                  for card_id in self.incorrect_card_ids if card_id in self.cards_by_id]
+        if not titles:
+            return "Sva pitanja ste znali! Čestitamo!"
         return "Pitanja koja niste znali:\n- " + "\n- ".join(titles)
\ No newline at end of file
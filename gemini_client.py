@@ -0,0 +1,262 @@
+"""Zajednički Gemini klijent s ograničenjem brzine, ponavljanjem i metrikama.
+
+Jedan dugovječni genai.Client se dijeli između svih zahtjeva (ponovo koristi
+HTTP konekcije). Svaki zahtjev prvo uzima mjesto u semaforu (najviše
+GEMINI_MAX_CONCURRENT istovremenih zahtjeva), pa žeton iz kante zahtjeva
+(GEMINI_RPM) i kante tokena (GEMINI_TPM). Kanta zahtjeva odjednom pušta do
+GEMINI_BURST zahtjeva (zadano koliko i GEMINI_MAX_CONCURRENT, najviše
+GEMINI_RPM), pa paralelni komadi kviza kreću zajedno umjesto da se uz
+zadanih 10 RPM razmaknu po ~6 s; nakon toga zahtjevi idu brzinom RPM-a. Privremene greške (429, 5xx, prekid
+konekcije) se ponavljaju s eksponencijalnim čekanjem i slučajnim odstupanjem.
+
+Za testiranje bez mreže GEMINI_BASE_URL može pokazivati na lokalni lažni
+server (vidi fake_gemini_server.py).
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+from google import genai
+from google.genai import types
+from google.genai.errors import APIError
+
+REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_RPM", "10"))
+TOKENS_PER_MINUTE = float(os.getenv("GEMINI_TPM", "250000"))
+MAX_CONCURRENT = int(os.getenv("GEMINI_MAX_CONCURRENT", "4"))
+BURST = int(os.getenv("GEMINI_BURST", str(MAX_CONCURRENT)))
+MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "5"))
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+BASE_URL = os.getenv("GEMINI_BASE_URL")
+
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+# Koliko zadnjih trajanja se čuva za percentile.
+LATENCY_WINDOW = 1000
+
+
+class TokenBucket:
+    """Kanta žetona: `rate` žetona u sekundi, najviše `capacity` odjednom."""
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1):
+        """Čeka dok ne bude dovoljno žetona i uzima ih; vraća koliko se čekalo (s).
+
+        Zahtjev veći od kapaciteta čeka dok se kanta ne napuni do vrha, pa
+        uzima sve (inače ne bi nikada prošao).
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+
+class Metrics:
+    """Brojači zahtjeva, grešaka i ponavljanja, te trajanja uspješnih zahtjeva."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.errors = {}
+        self.throttled_seconds = 0.0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def record_success(self, latency):
+        with self._lock:
+            self.requests += 1
+            self.successes += 1
+            self._latencies.append(latency)
+
+    def record_error(self, kind, will_retry):
+        with self._lock:
+            self.requests += 1
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+            if will_retry:
+                self.retries += 1
+            else:
+                self.failures += 1
+
+    def record_throttle(self, seconds):
+        with self._lock:
+            self.throttled_seconds += seconds
+
+    def snapshot(self):
+        """Vraća rječnik s trenutnim vrijednostima (latencije u sekundama)."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            snapshot = {
+                "requests": self.requests,
+                "successes": self.successes,
+                "failures": self.failures,
+                "retries": self.retries,
+                "errors": dict(self.errors),
+                "throttled_seconds": round(self.throttled_seconds, 3),
+            }
+        if latencies:
+            snapshot["latency_avg"] = sum(latencies) / len(latencies)
+            snapshot["latency_p50"] = latencies[len(latencies) // 2]
+            snapshot["latency_p95"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return snapshot
+
+    def summary(self):
+        """Metrike u jednoj-dvije linije teksta (ispis u batch_generate i prozor dijagnostike)."""
+        snapshot = self.snapshot()
+        message = (f"Gemini zahtjevi: {snapshot['requests']} (uspješnih {snapshot['successes']}, "
+                   f"neuspjelih {snapshot['failures']}, ponovljenih {snapshot['retries']}); "
+                   f"čekanje na ograničenja {snapshot['throttled_seconds']:.1f} s")
+        if "latency_avg" in snapshot:
+            message += (f"\nTrajanje zahtjeva: prosjek {snapshot['latency_avg']:.1f} s, "
+                        f"p50 {snapshot['latency_p50']:.1f} s, p95 {snapshot['latency_p95']:.1f} s")
+        if snapshot["errors"]:
+            message += "; greške: " + ", ".join(f"{kind} x{count}" for kind, count in sorted(snapshot["errors"].items()))
+        return message
+
+
+def _error_kind(error):
+    """Vraća (naziv greške za metrike, da li se zahtjev smije ponoviti)."""
+    if isinstance(error, APIError):
+        return f"http_{error.code}", error.code in RETRY_STATUS
+    if isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError)):
+        return type(error).__name__, True
+    return type(error).__name__, False
+
+
+class GeminiClientPool:
+    """Dijeljeni klijent s ograničenjem brzine i ponavljanjem privremenih grešaka."""
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                 max_concurrent=MAX_CONCURRENT, max_retries=MAX_RETRIES, base_url=BASE_URL,
+                 backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX, burst=BURST):
+        self.base_url = base_url
+        # Nalet od burst zahtjeva (ne više od minutne kvote), pa ravnomjerno po RPM-u.
+        self.request_bucket = TokenBucket(requests_per_minute / 60,
+                                          max(1.0, min(float(burst), requests_per_minute)))
+        # Kanta tokena može primiti cijelu minutnu kvotu, pa veliki upit ne čeka bespotrebno.
+        self.token_bucket = TokenBucket(tokens_per_minute / 60, tokens_per_minute)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.metrics = Metrics()
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """genai.Client se pravi jednom, pri prvom zahtjevu."""
+        with self._client_lock:
+            if self._client is None:
+                if self.base_url:
+                    self._client = genai.Client(api_key=os.getenv("GEMINI_API_KEY") or "lokalni-test",
+                                                http_options=types.HttpOptions(base_url=self.base_url))
+                else:
+                    self._client = genai.Client()
+            return self._client
+
+    def _backoff(self, attempt):
+        """Puni jitter: slučajno između 0 i base * 2^attempt (ograničeno s backoff_max)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _throttle(self, tokens):
+        waited = self.request_bucket.acquire(1) + self.token_bucket.acquire(tokens)
+        if waited:
+            self.metrics.record_throttle(waited)
+
+    def _handle_error(self, error, attempt):
+        """Bilježi grešku; vraća normalno ako treba ponoviti (nakon čekanja), inače je baca."""
+        kind, retryable = _error_kind(error)
+        will_retry = retryable and attempt < self.max_retries
+        self.metrics.record_error(kind, will_retry)
+        if not will_retry:
+            raise error
+        time.sleep(self._backoff(attempt))
+
+    def generate(self, model, contents, tokens=1):
+        """generate_content s ograničenjem brzine i ponavljanjem; vraća odgovor modela.
+
+        tokens je procjena veličine upita za kantu tokena.
+        """
+        attempt = 0
+        while True:
+            self._throttle(tokens)
+            with self._slots:
+                started = time.perf_counter()
+                try:
+                    response = self.client.models.generate_content(model=model, contents=contents)
+                except Exception as e:
+                    error = e
+                else:
+                    self.metrics.record_success(time.perf_counter() - started)
+                    return response
+            self._handle_error(error, attempt)
+            attempt += 1
+
+    def generate_stream(self, model, contents, tokens=1):
+        """Generator komada odgovora (generate_content_stream) s istim ograničenjima.
+
+        Ponavlja se samo greška prije prvog komada; kada je dio odgovora već
+        predan pozivaocu, ponovni zahtjev bi dao duplikate, pa se greška baca.
+        """
+        attempt = 0
+        while True:
+            self._throttle(tokens)
+            received = False
+            with self._slots:
+                started = time.perf_counter()
+                try:
+                    for chunk in self.client.models.generate_content_stream(model=model, contents=contents):
+                        received = True
+                        yield chunk
+                except Exception as e:
+                    if received:
+                        self.metrics.record_error(_error_kind(e)[0], False)
+                        raise
+                    error = e
+                else:
+                    self.metrics.record_success(time.perf_counter() - started)
+                    return
+            self._handle_error(error, attempt)
+            attempt += 1
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_client_pool():
+    """Vraća zajednički GeminiClientPool (pravi ga pri prvom pozivu)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = GeminiClientPool()
+        return _pool
+
+
+def existing_client_pool():
+    """Vraća zajednički pool ako je već napravljen, inače None (npr. za prikaz metrika)."""
+    return _pool
@@ -0,0 +1,247 @@
+"""Lokalno ocjenjivanje upisanih odgovora u kvizu, bez poziva AI-u.
+
+Odgovor korisnika se poredi s odgovorom AI-a na tri načina:
+- preklapanje riječi (bez veznika i sličnih riječi), s naglaskom na to koliko
+  riječi iz tačnog odgovora je korisnik naveo;
+- sličnost znakovnih trigrama, pa i drugi padež ili tipfeler ("ćelije" /
+  "ćelija") donose bodove;
+- kosinusna sličnost TF-IDF vektora (uz NumPy), gdje su rijetke riječi kviza
+  vrijednije od čestih.
+grade_all() ocjenjuje cijeli kviz jednim prolazom (matrice za sve odgovore
+odjednom). Ocjene se dopisuju u '<predmet>.grades' log pored špila, pa se
+kasnije mogu naći pitanja na koja se najslabije odgovara.
+"""
+import functools
+import json
+import math
+import os
+import re
+import time
+from collections import Counter
+
+# Težine mjera u konačnoj ocjeni (0..1); bez NumPy-a TF-IDF se izostavlja.
+WEIGHTS = {"overlap": 0.4, "chars": 0.3, "tfidf": 0.3}
+CORRECT = 0.6
+PARTIAL = 0.35
+GRAM = 3
+# Koliko ključnih riječi tačnog odgovora koje nedostaju se prikazuje korisniku.
+MISSING_TERMS = 5
+
+_TOKEN_RE = re.compile(r'\w+')
+_FOLD = str.maketrans('čćžšđ', 'cczsd')
+STOPWORDS = frozenset("""
+a ako ali bi bila bile bili bilo bio biti bude budu cemu da do duz ga gdje i ih ili iz je jer jesu jos
+ju k kad kada kako kao koja koje kojeg kojega kojem kojemu koji kojih kojim kojima kojoj koju kome
+kroz li me medu mogu moze mu na nad nakon ne nego neki nekih neko ni nije niti njega njegov njen
+njihov o od odnosno oko on ona one oni ono ova ove ovi ovo ovaj ovog pa po pod pored prema pri prije
+s sa se si sta sto su sve svi svih svoj svoje ta taj tako takoder te ti tih to tog toga tokom
+tu u uz va vec za zbog zato the of and or to in is are an as by for on with
+""".split())
+
+
+@functools.lru_cache(maxsize=None)
+def _numpy():
+    """NumPy modul ili None; uvozi se pri prvom ocjenjivanju, ne pri pokretanju programa."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _words(text):
+    """Parovi (riječ malim slovima bez dijakritika, riječ kako je napisana), bez čestih riječi."""
+    pairs = []
+    for word in _TOKEN_RE.findall(text):
+        folded = word.lower().translate(_FOLD)
+        if folded not in STOPWORDS and not (len(folded) == 1 and not folded.isdigit()):
+            pairs.append((folded, word))
+    return pairs
+
+
+def tokenize(text):
+    """Riječi bez dijakritika i bez čestih riječi koje ne nose sadržaj."""
+    return [folded for folded, _ in _words(text)]
+
+
+def stem(word):
+    """Grubo skraćivanje nastavka, da se padeži iste riječi poklope ('ćelija' / 'ćeliji')."""
+    return word if len(word) <= 3 else word[:max(3, min(len(word) - 2, 6))]
+
+
+def _char_grams(text):
+    text = ' '.join(_TOKEN_RE.findall(text.lower().translate(_FOLD)))
+    if len(text) < GRAM:
+        return Counter([text]) if text else Counter()
+    return Counter(text[i:i + GRAM] for i in range(len(text) - GRAM + 1))
+
+
+def token_overlap(user_tokens, reference_tokens):
+    """F2 mjera preklapanja riječi (odziv je važniji od preciznosti)."""
+    user, reference = set(user_tokens), set(reference_tokens)
+    common = len(user & reference)
+    if not common:
+        return 0.0
+    precision = common / len(user)
+    recall = common / len(reference)
+    return 5 * precision * recall / (4 * precision + recall)
+
+
+def char_similarity(user_grams, reference_grams):
+    """Dice koeficijent nad trigramima (s ponavljanjima)."""
+    total = sum(user_grams.values()) + sum(reference_grams.values())
+    if not total:
+        return 0.0
+    return 2 * sum((user_grams & reference_grams).values()) / total
+
+
+def verdict(score):
+    if score >= CORRECT:
+        return "Tačno"
+    if score >= PARTIAL:
+        return "Djelimično tačno"
+    return "Netačno"
+
+
+class Grade:
+    """Ocjena jednog odgovora: ukupna ocjena, pojedinačne mjere i ključne riječi koje nedostaju."""
+
+    def __init__(self, score, overlap, chars, tfidf, missing):
+        self.score = score
+        self.overlap = overlap
+        self.chars = chars
+        self.tfidf = tfidf
+        self.missing = missing
+
+    @property
+    def verdict(self):
+        return verdict(self.score)
+
+    def summary(self):
+        message = f"{self.verdict} ({self.score:.0%})"
+        if self.missing:
+            message += "\nNedostaje: " + ", ".join(self.missing)
+        return message
+
+
+class Grader:
+    """Ocjenjuje odgovore za jedan kviz; IDF se računa iz svih tačnih odgovora i pitanja kviza."""
+
+    def __init__(self, questions):
+        self.questions = questions
+        # Riječi tačnih odgovora kako su napisane, da se u "Nedostaje" prikažu s dijakriticima.
+        self._reference_words = [_words(q.get('odgovor', '')) for q in questions]
+        self._references = [[stem(folded) for folded, _ in words] for words in self._reference_words]
+        self._reference_grams = [_char_grams(q.get('odgovor', '')) for q in questions]
+        documents = [set(tokens) | {stem(word) for word in tokenize(q.get('pitanje', ''))}
+                     for tokens, q in zip(self._references, questions)]
+        df = Counter(word for document in documents for word in document)
+        n = len(documents)
+        self.vocab = {word: i for i, word in enumerate(df)}
+        self.idf = {word: math.log((1 + n) / (1 + count)) + 1 for word, count in df.items()}
+        self._numpy = _numpy()
+        if self._numpy is not None:
+            self._idf_vector = self._numpy.array([self.idf[word] for word in self.vocab])
+
+    def _vectors(self, token_lists):
+        """TF-IDF matrica (redovi normirani na dužinu 1) za liste riječi."""
+        numpy = self._numpy
+        matrix = numpy.zeros((len(token_lists), len(self.vocab)))
+        for row, tokens in enumerate(token_lists):
+            for word, count in Counter(tokens).items():
+                column = self.vocab.get(word)
+                if column is not None:
+                    matrix[row, column] = count
+        matrix *= self._idf_vector
+        norms = numpy.linalg.norm(matrix, axis=1, keepdims=True)
+        return numpy.divide(matrix, norms, out=numpy.zeros_like(matrix), where=norms > 0)
+
+    def _missing(self, index, user_tokens):
+        """Riječi tačnog odgovora koje korisnik nije naveo, najrjeđe (najvažnije) prve."""
+        user = set(user_tokens)
+        missing = {}
+        for (_, word), word_stem in zip(self._reference_words[index], self._references[index]):
+            if word_stem not in user:
+                missing.setdefault(word_stem, word)
+        ranked = sorted(missing, key=lambda word_stem: (-self.idf.get(word_stem, 0), word_stem))
+        return [missing[word_stem] for word_stem in ranked[:MISSING_TERMS]]
+
+    def grade_all(self, answers):
+        """Ocjenjuje odgovore (lista, redom pitanja; None/prazno = bez odgovora) i vraća listu Grade."""
+        indices = list(range(min(len(answers), len(self.questions))))
+        user_tokens = [[stem(word) for word in tokenize(answers[i] or '')] for i in indices]
+        cosines = [None] * len(indices)
+        if self._numpy is not None and indices:
+            users = self._vectors(user_tokens)
+            references = self._vectors([self._references[i] for i in indices])
+            cosines = self._numpy.einsum('ij,ij->i', users, references).tolist()
+
+        weights = WEIGHTS if self._numpy is not None else {"overlap": 0.55, "chars": 0.45, "tfidf": 0.0}
+        grades = []
+        for i, tokens, cosine in zip(indices, user_tokens, cosines):
+            if not (answers[i] or '').strip():
+                grades.append(Grade(0.0, 0.0, 0.0, None if cosine is None else 0.0, self._missing(i, [])))
+                continue
+            overlap = token_overlap(tokens, self._references[i])
+            chars = char_similarity(_char_grams(answers[i]), self._reference_grams[i])
+            score = weights["overlap"] * overlap + weights["chars"] * chars + weights["tfidf"] * (cosine or 0.0)
+            grades.append(Grade(min(1.0, score), overlap, chars, cosine, self._missing(i, tokens)))
+        return grades
+
+    def grade(self, index, answer):
+        """Ocjenjuje jedan odgovor (za pitanje s datim indeksom)."""
+        answers = [None] * len(self.questions)
+        answers[index] = answer
+        return self.grade_all(answers)[index]
+
+
+def grades_path(deck_path):
+    """Log ocjena kvizova za špil ('data/biologija.jsonl' -> 'data/biologija.grades')."""
+    return os.path.splitext(deck_path)[0] + '.grades'
+
+
+class GradeLog:
+    """Dopisivi log ocjena (jedan JSON zapis po odgovoru) i pregled najslabijih pitanja."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def append(self, quiz_id, questions, answers, grades):
+        """Upisuje ocjene jednog kviza jednim upisom i jednim fsync-om."""
+        now = round(time.time(), 3)
+        lines = []
+        for question, answer, grade in zip(questions, answers, grades):
+            record = {"kviz": quiz_id, "vrijeme": now, "pitanje": question.get('pitanje', ''),
+                      "odgovor": question.get('odgovor', ''), "korisnik": answer or '',
+                      "ocjena": round(grade.score, 3)}
+            lines.append(json.dumps(record, ensure_ascii=False) + '\n')
+        if not lines:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(''.join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def records(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            return
+
+    def weak_questions(self, limit=20, max_score=CORRECT):
+        """Pitanja s najnižom prosječnom ocjenom: lista (pitanje, odgovor, prosjek, broj pokušaja)."""
+        totals = {}
+        for record in self.records():
+            key = ' '.join(tokenize(record.get('pitanje', ''))) or record.get('pitanje', '')
+            entry = totals.setdefault(key, [record.get('pitanje', ''), record.get('odgovor', ''), 0.0, 0])
+            entry[2] += record.get('ocjena', 0.0)
+            entry[3] += 1
+        weak = [(question, answer, total / count, count)
+                for question, answer, total, count in totals.values() if total / count < max_score]
+        weak.sort(key=lambda item: (item[2], -item[3]))
+        return weak[:limit]
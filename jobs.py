@@ -0,0 +1,119 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobCancelled(Exception):
+    """Baca se unutar posla kada je korisnik zatražio prekid."""
+
+
+class Job:
+    """Jedan pozadinski posao: prijava napretka i kooperativni prekid."""
+
+    def __init__(self, events):
+        self._events = events
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """Traži prekid; posao ga primijeti pri sljedećoj provjeri."""
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        """Prekida posao (JobCancelled) ako je prekid zatražen."""
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    def report(self, message, fraction=None):
+        """Šalje poruku o napretku UI niti (fraction je između 0 i 1 ili None)."""
+        self._events.put((self, 'progress', (message, fraction)))
+
+    def emit(self, item):
+        """Šalje djelimični rezultat UI niti (npr. jedno gotovo pitanje)."""
+        self._events.put((self, 'item', item))
+
+
+class JobRunner:
+    """Pokreće poslove u thread poolu i vraća rezultate Tk niti preko reda.
+
+    Tkinter nije thread-safe, pa pozadinske niti nikad ne diraju widgete:
+    sve povratne funkcije (on_progress, on_item, on_done, on_error, on_cancel) pozivaju
+    se iz glavne niti, unutar `after()` petlje koja prazni red događaja.
+    """
+
+    POLL_MS = 100
+
+    def __init__(self, widget, max_workers=2):
+        self.widget = widget
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._events = queue.Queue()
+        self._callbacks = {}
+        self._polling = False
+
+    def submit(self, fn, *args, on_done=None, on_error=None, on_progress=None, on_cancel=None,
+               on_item=None):
+        """Pokreće fn(job, *args) u pozadini i vraća Job objekt."""
+        job = Job(self._events)
+        self._callbacks[job] = (on_done, on_error, on_progress, on_cancel, on_item)
+
+        def run():
+            try:
+                result = fn(job, *args)
+            except JobCancelled:
+                self._events.put((job, 'cancelled', None))
+            except Exception as e:
+                self._events.put((job, 'error', e))
+            else:
+                self._events.put((job, 'done', result))
+
+        self._executor.submit(run)
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.POLL_MS, self._poll)
+        return job
+
+    def _poll(self):
+        """Prazni red događaja i poziva povratne funkcije u UI niti."""
+        while True:
+            try:
+                job, kind, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+
+            callbacks = self._callbacks.get(job)
+            if callbacks is None:
+                continue
+            on_done, on_error, on_progress, on_cancel, on_item = callbacks
+
+            if kind == 'progress':
+                if on_progress and not job.cancelled:
+                    on_progress(*payload)
+                continue
+            if kind == 'item':
+                if on_item and not job.cancelled:
+                    on_item(payload)
+                continue
+
+            del self._callbacks[job]
+            if kind == 'cancelled' or job.cancelled:
+                if on_cancel:
+                    on_cancel()
+            elif kind == 'error':
+                if on_error:
+                    on_error(payload)
+            elif on_done:
+                on_done(payload)
+
+        if self._callbacks:
+            self.widget.after(self.POLL_MS, self._poll)
+        else:
+            self._polling = False
+
+    def shutdown(self):
+        """Otkazuje poslove koji još nisu počeli i gasi pool bez čekanja."""
+        for job in list(self._callbacks):
+            job.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
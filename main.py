@@ -1,22 +1,57 @@
+import time
+_STARTED_AT = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox, simpledialog, scrolledtext, filedialog
 from flashcards import FlashcardProgram
-import json
+from jobs import JobRunner, JobCancelled
+from subject_catalog import SubjectCatalog
+from card_store import CardStore
+import deck_io
+import grading
+from duplicates import DuplicateIndex
+from virtual_list import VirtualList
+import retrieval
+import text_prep
+import tracing
+import importlib.util
 import os
-from PyPDF2 import PdfReader
+import sys
+import threading
+
+_IMPORTS_DONE_AT = time.perf_counter()
+
+# PDF i Gemini biblioteke su teške za uvoz, pa se samo provjerava da postoje;
+# stvarni uvoz radi load_quiz_stack() tek kada korisnik otvori kviz.
+AI_ENABLED = (importlib.util.find_spec("google") is not None
+              and importlib.util.find_spec("google.genai") is not None
+              and importlib.util.find_spec("PyPDF2") is not None
+              and importlib.util.find_spec("dotenv") is not None)
+QUIZ_INSTALL_HINT = "pip install google-genai pypdf2 python-dotenv"
 
-from dotenv import load_dotenv
+pdf_extract = None
+quiz_ai = None
+APIError = None
+_quiz_stack_lock = threading.Lock()
 
-# Uvoz za Gemini API
-try:
-    from google import genai
-    from google.genai.errors import APIError
+# Koliko često se provjerava da li se 'data/' mapa promijenila dok je meni predmeta otvoren.
+CATALOG_POLL_MS = 2000
 
-    load_dotenv() 
-    AI_ENABLED = True
-except ImportError:
-    AI_ENABLED = False
+
+def load_quiz_stack():
+    """Uvozi PDF i Gemini module (i učitava .env) pri prvom korištenju kviza."""
+    global pdf_extract, quiz_ai, APIError
+    with _quiz_stack_lock:
+        if quiz_ai is not None:
+            return
+        from dotenv import load_dotenv
+        import pdf_extract as _pdf_extract
+        import quiz_ai as _quiz_ai
+        from google.genai.errors import APIError as _APIError
+
+        load_dotenv()
+        pdf_extract, APIError, quiz_ai = _pdf_extract, _APIError, _quiz_ai
 
 
 class StudijskiProgram(tk.Tk):
@@ -27,6 +62,20 @@ class StudijskiProgram(tk.Tk):
         
         self.current_subject_file = None
         self.flashcards = None
+        # Osvježava otvoren prozor baze pitanja nakon izmjena špila mimo njega (brisanje, uvoz).
+        self.refresh_question_database = None
+        self.jobs = JobRunner(self)
+        self.page_cache = None
+        self.response_cache = None
+        self.retrieval_cache = None
+        self.quiz_endless = False
+        self.quiz_source = None
+        self.quiz_prefetch_job = None
+        self.catalog = SubjectCatalog('data')
+        self.subject_list = None
+        self._catalog_poll_id = None
+        self._catalog_job = None
+        self.duplicates = DuplicateIndex('data')
 
         if not os.path.exists('data'):
             os.makedirs('data')
@@ -76,27 +125,91 @@ class StudijskiProgram(tk.Tk):
                  text="Izaberite Predmet:", 
                  font=("Arial", 20, "bold"), 
                  bg=self.default_bg,
-                 fg=self.text_color).pack(pady=30)
-        
-        subjects = FlashcardProgram.get_available_subjects()
-        
-        if not subjects:
-            tk.Label(self, text="Nema dostupnih fajlova u 'data/' mapi.", fg="red", bg=self.default_bg).pack(pady=10)
-            return
-
-        for subject_name, filename in subjects:
-            btn = tk.Button(self, 
-                            text=f"» {subject_name} «", 
-                            command=lambda f=filename: self.load_subject(f), 
-                            width=30,
-                            **self.menu_button_style)
-            btn.pack(pady=8)
+                 fg=self.text_color).pack(pady=(30, 10))
+
+        self.subject_empty_label = tk.Label(self, text="", fg="red", bg=self.default_bg)
+        self.subject_empty_label.pack()
+
+        # Stotine predmeta: lista crta samo vidljive redove (vidi VirtualList).
+        self.subject_list = VirtualList(self, get_label=self._subject_label, font=("Arial", 13))
+        self.subject_list.pack(fill="both", expand=True, padx=40)
+        self.subject_list.listbox.bind("<Double-Button-1>", lambda e: self._open_selected_subject())
+        self.subject_list.listbox.bind("<Return>", lambda e: self._open_selected_subject())
+
+        tk.Button(self, text="» Otvori Predmet «",
+                  command=self._open_selected_subject,
+                  width=30,
+                  **{**self.menu_button_style, 'pady': 8}).pack(pady=(10, 0))
+
+        # Prvo se prikazuje zadnji manifest; brojanje kartica ide u pozadini.
+        self.catalog.load()
+        self._update_subject_list(keep_position=False)
+        self._refresh_subject_catalog()
+        if self._catalog_poll_id is not None:
+            self.after_cancel(self._catalog_poll_id)
+        self._catalog_poll_id = self.after(CATALOG_POLL_MS, self._poll_subject_catalog)
             
         tk.Button(self, text="Dodaj Novi Predmet/Fajl", 
                  command=self.add_new_subject, 
                  bg="lightgrey", fg=self.text_color, 
-                 relief='flat', padx=10, pady=5).pack(pady=20)
+                 relief='flat', padx=10, pady=5).pack(pady=(20, 5))
+
+        tk.Button(self, text="Pronađi duplikate u svim predmetima",
+                 command=self.show_duplicates_report,
+                 bg=self.default_bg, fg=self.text_color,
+                 relief='flat', padx=10, pady=2).pack()
+
+        tk.Button(self, text="Dijagnostika performansi",
+                 command=self.show_diagnostics_window,
+                 bg=self.default_bg, fg=self.text_color,
+                 relief='flat', padx=10, pady=2).pack()
+
+
+    def _subject_label(self, filename):
+        """Tekst reda u meniju: naziv, broj kartica, veličina i zadnja izmjena."""
+        entry = self.catalog.get(filename)
+        if entry is None:
+            return filename
+        modified = time.strftime('%d.%m.%Y. %H:%M', time.localtime(entry['mtime_ns'] / 1e9))
+        label = f"{entry['name']}  ·  {entry['cards']} kartica  ·  {entry['size'] / 1024:.0f} KB  ·  {modified}"
+        if filename.endswith('.deck'):
+            label += "  (samo čitanje)"
+        return label
+
+    def _update_subject_list(self, keep_position=True):
+        filenames = [filename for _, filename in self.catalog.subjects()]
+        self.subject_empty_label.config(text="" if filenames else "Nema dostupnih fajlova u 'data/' mapi.")
+        self.subject_list.set_items(filenames, keep_position=keep_position)
+
+    def _poll_subject_catalog(self):
+        """Periodično provjerava 'data/' mapu i osvježava samo ako se nešto promijenilo."""
+        self._catalog_poll_id = None
+        if self.subject_list is None or not self.subject_list.winfo_exists():
+            return
+        self._refresh_subject_catalog()
+        self._catalog_poll_id = self.after(CATALOG_POLL_MS, self._poll_subject_catalog)
+
+    def _refresh_subject_catalog(self):
+        """Osvježava katalog u pozadinskom poslu i ažurira listu ako se nešto promijenilo."""
+        if self._catalog_job is not None:
+            return
+
+        def done(changed):
+            self._catalog_job = None
+            if changed and self.subject_list is not None and self.subject_list.winfo_exists():
+                self._update_subject_list()
 
+        def failed(error):
+            self._catalog_job = None
+
+        self._catalog_job = self.jobs.submit(lambda job: self.catalog.refresh(), on_done=done, on_error=failed)
+
+    def _open_selected_subject(self):
+        filename = self.subject_list.selected_id
+        if filename is None or self.catalog.get(filename) is None:
+            messagebox.showinfo("Predmet", "Izaberite predmet s liste.")
+            return
+        self.load_subject(filename)
 
     def load_subject(self, filename):
         """Učitava izabrani predmet i prelazi na glavni meni predmeta."""
@@ -137,11 +250,26 @@ class StudijskiProgram(tk.Tk):
                   text="4. POKRENI KVIZ/TESTIRANJE ZNANJA (AI)", 
                   command=self.show_quiz_setup_window, 
                 **main_option_style).pack(pady=8)
+
+        io_frame = tk.Frame(self, bg=self.default_bg)
+        io_frame.pack(pady=(10, 0))
+        tk.Button(io_frame, text="Uvezi kartice (CSV / JSONL / Anki)",
+                  command=self.import_cards_dialog,
+                  bg="lightgrey", fg=self.text_color,
+                  relief='flat', padx=10, pady=5).pack(side="left", padx=5)
+        tk.Button(io_frame, text="Izvezi predmet",
+                  command=self.export_cards_dialog,
+                  bg="lightgrey", fg=self.text_color,
+                  relief='flat', padx=10, pady=5).pack(side="left", padx=5)
+        tk.Button(io_frame, text="Slaba pitanja iz kvizova",
+                  command=self.show_weak_questions,
+                  bg="lightgrey", fg=self.text_color,
+                  relief='flat', padx=10, pady=5).pack(side="left", padx=5)
         
         tk.Button(self, text="<< Nazad na Odabir Predmeta", 
                   command=self.show_subject_selection_menu, 
                   bg="#F0AD4E", fg=self.text_color, 
-                  relief='flat', padx=10, pady=5).pack(pady=25)
+                  relief='flat', padx=10, pady=5).pack(pady=15)
 
 
     # --- FLASHCARDS LOGIKA I GUI ---
@@ -154,6 +282,8 @@ class StudijskiProgram(tk.Tk):
              return
         
         self.flashcards.start_session()
+        if not self.flashcards.total_in_session and not self.offer_practice():
+            return
         
         flash_window = tk.Toplevel(self, bg=self.default_bg)
         flash_window.title(f"Učenje - {self.flashcards.get_subject_name()}")
@@ -225,11 +355,25 @@ class StudijskiProgram(tk.Tk):
         self.feedback_frame.pack(pady=20)
 
     def handle_feedback(self, was_correct):
-        """Obrađuje feedback korisnika (znao / nije znao)."""
-        if not was_correct:
-            self.flashcards.mark_current_incorrect()
+        """Obrađuje feedback korisnika (znao / nije znao) i pomjera karticu u rasporedu."""
+        self.flashcards.record_answer(was_correct)
         self.next_card()
 
+    def offer_practice(self, parent=None):
+        """Javlja da nijedna kartica nije na redu i nudi vježbu s karticama najbližim roku.
+
+        Vraća True ako je vježba pokrenuta (sesija je spremna).
+        """
+        next_due = self.flashcards.next_due_time()
+        when = time.strftime("%d.%m.%Y. u %H:%M", time.localtime(next_due)) if next_due else "-"
+        if not messagebox.askyesno("Ponavljanje",
+                                   f"Trenutno nema kartica za ponavljanje.\nSljedeća kartica je na redu: {when}\n\n"
+                                   "Želite li ipak vježbati kartice kojima je rok najbliži?",
+                                   parent=parent or self):
+            return False
+        self.flashcards.start_session(practice=True)
+        return bool(self.flashcards.total_in_session)
+
     def end_session(self):
         """Prikazuje ekran za kraj sesije."""
         self.main_flashcard_frame.pack_forget()
@@ -243,6 +387,8 @@ class StudijskiProgram(tk.Tk):
     def restart_session(self, window):
         """Resetira GUI za početak nove sesije."""
         self.flashcards.start_session()
+        if not self.flashcards.total_in_session and not self.offer_practice(window):
+            return
         self.end_session_frame.pack_forget()
         self.main_flashcard_frame.pack(pady=20, padx=20, fill="both", expand=True)
         self.next_card()
@@ -251,7 +397,6 @@ class StudijskiProgram(tk.Tk):
     def show_question_database(self):
         """Kreira prozor koji prikazuje listu svih pitanja s mogućnošću pregleda."""
         
-        self.flashcards._load_cards()
         cards = self.flashcards.cards
         
         if not cards:
@@ -277,15 +422,11 @@ class StudijskiProgram(tk.Tk):
         search_entry = tk.Entry(left_frame, textvariable=search_var, width=40)
         search_entry.pack(pady=5, padx=5, fill=tk.X)
         
-        listbox_frame = tk.Frame(left_frame)
-        listbox_frame.pack(fill="both", expand=True)
-        
-        question_listbox = tk.Listbox(listbox_frame, font=("Arial", 10), selectmode=tk.SINGLE)
-        question_listbox.pack(side="left", fill="both", expand=True)
-        
-        scrollbar = tk.Scrollbar(listbox_frame, orient="vertical", command=question_listbox.yview)
-        scrollbar.pack(side="right", fill="y")
-        question_listbox.config(yscrollcommand=scrollbar.set)
+        question_list = VirtualList(left_frame,
+                                    get_label=lambda card_id: getattr(self.flashcards.cards_by_id.get(card_id), 'naslov', ''),
+                                    on_select=lambda card_id: show_answer(card_id),
+                                    font=("Arial", 10))
+        question_list.pack(fill="both", expand=True)
         
         right_frame = tk.Frame(main_frame)
         right_frame.pack(side="right", fill="both", expand=True)
@@ -298,33 +439,83 @@ class StudijskiProgram(tk.Tk):
         self.db_answer_text = scrolledtext.ScrolledText(right_frame, width=40, height=15, font=("Arial", 12), wrap=tk.WORD, state=tk.DISABLED)
         self.db_answer_text.pack(fill="both", expand=True)
 
-        self.question_map = {card['naslov']: card['puni_odgovor'] for card in cards}
+        # Indeks čita sve odgovore, pa se gradi u pozadini; do tada lista prikazuje sve naslove.
+        search_index = [self.flashcards.search_index]
+        search_status = tk.Label(left_frame, text="", font=("Arial", 9, "italic"), fg="grey")
+        search_status.pack()
+        pending_search = [None]
+        shown_card = [None]
 
         def update_list(search_term=""):
-            """Filtrira listu pitanja na osnovu pojma za pretragu."""
-            question_listbox.delete(0, tk.END)
-            search_term = search_term.lower()
-            
-            for title in self.question_map.keys():
-                if search_term in title.lower():
-                    question_listbox.insert(tk.END, title)
-
-        def show_answer(event):
-            """Prikazuje odgovor kada se klikne na pitanje u listi."""
-            selected_indices = question_listbox.curselection()
-            if selected_indices:
-                selected_title = question_listbox.get(selected_indices[0])
-                answer = self.question_map.get(selected_title, "Odgovor nije pronađen.")
-                
-                self.db_answer_title.config(text=selected_title)
-                
+            """Filtrira listu pitanja preko indeksa, rangirano po relevantnosti."""
+            pending_search[0] = None
+            if search_index[0] is None:
+                question_list.set_items([card.id for card in self.flashcards.cards])
+                return
+            with tracing.span('search.query', query=search_term):
+                question_list.set_items(search_index[0].search(search_term))
+
+        def index_built(built):
+            if not db_window.winfo_exists():
+                return
+            search_index[0] = self.flashcards.set_search_index(*built)
+            if search_index[0] is None:
+                # Kartice su ponovo učitane dok se indeks gradio.
+                build_index()
+                return
+            search_status.config(text="")
+            update_list(search_var.get())
+
+        def index_failed(error):
+            if db_window.winfo_exists():
+                search_status.config(text=f"Pretraga nije dostupna: {error}")
+
+        def build_index():
+            search_status.config(text="Priprema pretrage...")
+            self.jobs.submit(lambda job: self.flashcards.build_search_index(),
+                             on_done=index_built, on_error=index_failed)
+
+        if search_index[0] is None:
+            build_index()
+
+        def deck_changed():
+            """Poslije brisanja ili uvoza kartica lista i pretraga prate novo stanje špila."""
+            if not db_window.winfo_exists():
+                return
+            search_index[0] = self.flashcards.search_index
+            if search_index[0] is None:
+                build_index()
+            if shown_card[0] not in self.flashcards.cards_by_id:
+                shown_card[0] = None
+                self.db_answer_title.config(text="Izaberite pitanje s lijeve strane.")
                 self.db_answer_text.config(state=tk.NORMAL)
                 self.db_answer_text.delete("1.0", tk.END)
-                self.db_answer_text.insert(tk.END, answer)
                 self.db_answer_text.config(state=tk.DISABLED)
+            update_list(search_var.get())
+
+        self.refresh_question_database = deck_changed
+
+        def schedule_update(*args):
+            """Odgađa pretragu dok korisnik ne prestane tipkati (debounce)."""
+            if pending_search[0] is not None:
+                db_window.after_cancel(pending_search[0])
+            pending_search[0] = db_window.after(150, lambda: update_list(search_var.get()))
+
+        def show_answer(card_id):
+            """Prikazuje odgovor kada se klikne na pitanje u listi."""
+            card = self.flashcards.cards_by_id.get(card_id)
+            if card is None:
+                return
+            shown_card[0] = card_id
+            
+            self.db_answer_title.config(text=card.naslov)
+            
+            self.db_answer_text.config(state=tk.NORMAL)
+            self.db_answer_text.delete("1.0", tk.END)
+            self.db_answer_text.insert(tk.END, self.flashcards.get_answer(card_id) or "Odgovor nije pronađen.")
+            self.db_answer_text.config(state=tk.DISABLED)
 
-        search_var.trace_add("write", lambda name, index, mode: update_list(search_var.get()))
-        question_listbox.bind("<<ListboxSelect>>", show_answer)
+        search_var.trace_add("write", schedule_update)
         update_list()
 
     # --- DODAVANJE NOVE KARTICE ---
@@ -348,9 +539,12 @@ class StudijskiProgram(tk.Tk):
                              command=lambda: self.save_new_card(title_entry.get(), answer_text.get("1.0", tk.END), add_window), 
                              bg="green", fg="white", height=2, width=30)
         save_btn.pack(pady=20)
+
+        # Indeks za upozorenje o duplikatima se osvježava u pozadini dok korisnik piše.
+        self.jobs.submit(lambda job: self.duplicates.refresh(), on_error=lambda error: None)
         
     def save_new_card(self, title, answer, window):
-        """Logika za spašavanje nove kartice u JSON fajl."""
+        """Logika za spašavanje nove kartice na kraj loga predmeta."""
         title = title.strip()
         answer = answer.strip()
         
@@ -358,22 +552,24 @@ class StudijskiProgram(tk.Tk):
             messagebox.showerror("Greška", "Oba polja moraju biti popunjena!")
             return
 
-        new_card = { "naslov": title, "puni_odgovor": answer }
-        
-        try:
-            with open(self.flashcards.filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            data = []
+        similar = self.duplicates.query(title, answer)
+        if similar is None:
+            if not messagebox.askyesno("Provjera duplikata",
+                                       "Indeks za provjeru duplikata se još gradi u pozadini.\n\n"
+                                       "Spasiti karticu bez provjere?", parent=window):
+                return
+        elif similar:
+            lines = "\n".join(f"• [{os.path.splitext(name)[0].capitalize()}] {other_title} ({score:.0%})"
+                              for name, _, other_title, score in similar)
+            if not messagebox.askyesno("Mogući duplikat",
+                                       f"Slične kartice već postoje:\n\n{lines}\n\nSpasiti karticu svejedno?",
+                                       parent=window):
+                return
 
-        data.append(new_card)
-        
         try:
-            with open(self.flashcards.filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
+            self.flashcards.add_card(title, answer)
             
             messagebox.showinfo("Uspjeh", "Kartica je uspješno dodana i spašena!")
-            self.flashcards._load_cards()
             window.destroy()
             
         except Exception as e:
@@ -382,38 +578,191 @@ class StudijskiProgram(tk.Tk):
     # --- DODAVANJE NOVOG PREDMETA ---
 
     def add_new_subject(self):
-        """Funkcija za kreiranje novog JSON fajla za novi predmet."""
+        """Funkcija za kreiranje novog (praznog) loga za novi predmet."""
         new_subject = simpledialog.askstring("Novi Predmet", "Unesite naziv novog predmeta (npr. 'historija'):")
         
         if new_subject:
-            filename = new_subject.lower().replace(' ', '_') + '.json'
+            filename = new_subject.lower().replace(' ', '_') + '.jsonl'
             filepath = os.path.join('data', filename)
+            legacy_path = os.path.splitext(filepath)[0] + '.json'
             
-            if os.path.exists(filepath):
+            if os.path.exists(filepath) or os.path.exists(legacy_path):
                  messagebox.showerror("Greška", f"Predmet '{new_subject.capitalize()}' već postoji!")
                  return
 
             try:
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    json.dump([], f, indent=4, ensure_ascii=False)
+                open(filepath, 'x', encoding='utf-8').close()
                 
                 messagebox.showinfo("Uspjeh", f"Predmet '{new_subject.capitalize()}' je kreiran! Dodajte kartice.")
                 self.show_subject_selection_menu()
             except Exception as e:
                 messagebox.showerror("Greška", f"Nije moguće kreirati fajl: {e}")
 
+    # --- MASOVNI UVOZ I IZVOZ ---
+
+    def import_cards_dialog(self):
+        """Uvozi kartice iz CSV, JSONL ili Anki TSV fajla u pozadini, bez duplikata."""
+        source = filedialog.askopenfilename(
+            title="Uvoz kartica",
+            filetypes=[("Kartice", "*.csv *.jsonl *.ndjson *.tsv *.txt"), ("Svi fajlovi", "*.*")])
+        if not source:
+            return
+
+        def work(job):
+            return deck_io.import_cards(
+                self.flashcards.filename, source, store=self.flashcards.store,
+                on_progress=lambda read, added: job.report(f"Pročitano {read}, dodano {added} kartica..."))
+
+        def done(stats):
+            self._deck_changed()
+            messagebox.showinfo("Uvoz", f"Dodano {stats['added']} novih kartica.\n"
+                                        f"Preskočeno duplikata: {stats['duplicates']}, "
+                                        f"neispravnih redova: {stats['invalid']}.")
+
+        # Dok uvoz piše u otvoreni špil, prozor s napretkom blokira ostale izmjene.
+        self._run_deck_job("Uvoz kartica", work, done, modal=True)
+
+    def export_cards_dialog(self):
+        """Izvozi predmet u CSV, JSONL ili Anki TSV (format po ekstenziji fajla)."""
+        target = filedialog.asksaveasfilename(
+            title="Izvoz predmeta",
+            initialfile=self.flashcards.get_subject_name().lower() + ".csv",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSONL", "*.jsonl"), ("Anki (TSV)", "*.tsv")])
+        if not target:
+            return
+
+        def work(job):
+            return deck_io.export_cards(
+                self.flashcards.filename, target,
+                on_progress=lambda count: job.report(f"Izvezeno {count} kartica..."))
+
+        self._run_deck_job("Izvoz predmeta", work,
+                           lambda count: messagebox.showinfo("Izvoz", f"Izvezeno {count} kartica u {target}."))
+
+    def _run_deck_job(self, title, work, on_done, modal=False):
+        """Pokreće uvoz/izvoz u pozadini uz mali prozor s napretkom (uz modal=True ostatak programa čeka)."""
+        window = tk.Toplevel(self)
+        window.title(title)
+        window.geometry("360x120")
+        window.transient(self)
+        if modal:
+            window.protocol("WM_DELETE_WINDOW", lambda: None)
+            window.grab_set()
+        label = tk.Label(window, text="Pokretanje...", font=("Arial", 11), wraplength=320)
+        label.pack(pady=(20, 10))
+        bar = ttk.Progressbar(window, length=300, mode='indeterminate')
+        bar.pack()
+        bar.start(15)
+
+        def progress(message, fraction):
+            if window.winfo_exists():
+                label.config(text=message)
+
+        def finish(result):
+            window.destroy()
+            on_done(result)
+
+        def failed(error):
+            window.destroy()
+            messagebox.showerror("Greška", str(error))
+
+        self.jobs.submit(work, on_done=finish, on_error=failed, on_progress=progress)
+
+    def _deck_changed(self):
+        """Ponovo učitava kartice otvorenog predmeta i osvježava otvoren prozor baze pitanja."""
+        self.flashcards.reload()
+        if self.refresh_question_database is not None:
+            self.refresh_question_database()
+
+    # --- DUPLIKATI ---
+
+    def show_duplicates_report(self):
+        """Traži skoro iste kartice u svim predmetima (u pozadini) i prikazuje izvještaj."""
+        def work(job):
+            job.report("Računanje potpisa kartica...")
+            self.duplicates.refresh()
+            job.report(f"Poređenje {len(self.duplicates)} kartica...")
+            return self.duplicates.find_duplicates()
+
+        self._run_deck_job("Traženje duplikata", work, self._show_duplicate_groups)
+
+    def _show_duplicate_groups(self, groups):
+        """Prozor s grupama duplikata; označene kartice se mogu obrisati."""
+        if not groups:
+            messagebox.showinfo("Duplikati", f"Nema sličnih kartica (pregledano {len(self.duplicates)}).")
+            return
+
+        window = tk.Toplevel(self)
+        window.title("Duplikati kartica")
+        window.geometry("760x520")
+
+        extra = sum(len(group) - 1 for group in groups)
+        tk.Label(window, text=f"{len(groups)} grupa sličnih kartica, {extra} suvišnih. "
+                              "Označite kartice koje želite obrisati (Ctrl/Shift za više).",
+                 font=("Arial", 11), wraplength=720, justify=tk.LEFT).pack(anchor="w", padx=10, pady=10)
+
+        table = ttk.Treeview(window, columns=("subject", "score"), selectmode="extended")
+        table.heading("#0", text="Naslov")
+        table.column("#0", width=480)
+        table.heading("subject", text="Predmet")
+        table.column("subject", width=140)
+        table.heading("score", text="Sličnost")
+        table.column("score", width=80, anchor="e")
+        table.pack(fill="both", expand=True, padx=10)
+
+        rows = {}
+        for number, group in enumerate(groups, 1):
+            parent = table.insert("", tk.END, text=f"Grupa {number} ({len(group)} kartice)", open=True)
+            for name, card_id, title, score in group:
+                row = table.insert(parent, tk.END, text=title,
+                                   values=(os.path.splitext(name)[0].capitalize(), f"{score:.0%}"))
+                rows[row] = (name, card_id)
+
+        def delete_selected():
+            selected = [row for row in table.selection() if row in rows]
+            if not selected:
+                return
+            if not messagebox.askyesno("Brisanje", f"Obrisati {len(selected)} označenih kartica?", parent=window):
+                return
+            by_deck = {}
+            for row in selected:
+                name, card_id = rows[row]
+                by_deck.setdefault(name, []).append((row, card_id))
+            skipped = 0
+            for name, items in by_deck.items():
+                if name.endswith('.deck'):
+                    skipped += len(items)
+                    continue
+                if self.flashcards is not None and os.path.basename(self.flashcards.filename) == name:
+                    store = self.flashcards.store
+                else:
+                    store = CardStore(os.path.join('data', name))
+                    store.load()
+                for row, card_id in items:
+                    store.delete(card_id)
+                    table.delete(row)
+            if self.flashcards is not None:
+                self._deck_changed()
+            if skipped:
+                messagebox.showinfo("Brisanje", f"{skipped} kartica je u binarnim špilovima (.deck) "
+                                                "koji su samo za čitanje.", parent=window)
+
+        tk.Button(window, text="Obriši označene kartice", command=delete_selected,
+                  bg="lightcoral", relief='flat', padx=10, pady=5).pack(pady=10)
+
     # --- KVIZ LOGIKA I GUI (AI) ---
 
     def show_quiz_setup_window(self):
         """Kreira prozor za unos raspona stranica i broja pitanja."""
         
         if not AI_ENABLED:
-            messagebox.showerror("Greška", "Gemini AI biblioteka nije instalirana. Pokrenite: pip install google-genai")
+            messagebox.showerror("Greška", f"Biblioteke za AI kviz nisu instalirane. Pokrenite: {QUIZ_INSTALL_HINT}")
             return
 
         setup_window = tk.Toplevel(self)
         setup_window.title(f"Postavke kviza - {self.flashcards.get_subject_name()}")
-        setup_window.geometry("500x350")
+        setup_window.geometry("500x480")
         
         tk.Label(setup_window, text="Dokument za učenje:", font=("Arial", 12)).pack(pady=(10, 5))
         
@@ -443,9 +792,43 @@ class StudijskiProgram(tk.Tk):
         self.num_questions_entry.insert(0, "10")
         self.num_questions_entry.pack(side=tk.LEFT, padx=5)
 
-        tk.Button(setup_window, text="Generiraj i Pokreni Kviz", 
-                  command=lambda: self.run_quiz(setup_window), 
-                  bg="purple", fg="white", height=2, width=30).pack(pady=20)
+        self.fresh_questions_var = tk.BooleanVar(value=False)
+        frame_topic = tk.Frame(setup_window)
+        frame_topic.pack(pady=(0, 10))
+
+        tk.Label(frame_topic, text="Tema (opcionalno):").pack(side=tk.LEFT)
+        self.topic_entry = tk.Entry(frame_topic, width=30)
+        self.topic_entry.pack(side=tk.LEFT, padx=5)
+
+        tk.Checkbutton(setup_window, text="Uvijek generiraj nova pitanja (zanemari keš)",
+                       variable=self.fresh_questions_var).pack()
+
+        self.stream_questions_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(setup_window, text="Prikaži pitanja čim stignu (bez čekanja cijelog odgovora)",
+                       variable=self.stream_questions_var).pack()
+
+        self.endless_quiz_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(setup_window, text="Beskonačni kviz (nova pitanja se pripremaju u pozadini)",
+                       variable=self.endless_quiz_var).pack()
+
+        start_btn = tk.Button(setup_window, text="Generiraj i Pokreni Kviz", 
+                              command=lambda: self.run_quiz(setup_window), 
+                              bg="purple", fg="white", height=2, width=30, state=tk.DISABLED)
+        start_btn.pack(pady=20)
+
+        def stack_loaded(result=None):
+            if setup_window.winfo_exists():
+                start_btn.config(state=tk.NORMAL)
+
+        def stack_failed(error):
+            # Dugme ostaje aktivno: run_quiz ponovo pokušava uvoz (npr. nakon instalacije).
+            parent = setup_window if setup_window.winfo_exists() else self
+            messagebox.showerror("Greška", f"Uvoz biblioteka za kviz nije uspio ({error}). "
+                                           f"Pokrenite: {QUIZ_INSTALL_HINT}", parent=parent)
+            stack_loaded()
+
+        # Uvoz teških biblioteka počinje u pozadini dok korisnik bira PDF.
+        self.jobs.submit(lambda job: load_quiz_stack(), on_done=stack_loaded, on_error=stack_failed)
 
     
     def select_pdf(self, window):
@@ -460,9 +843,14 @@ class StudijskiProgram(tk.Tk):
 
 
     def run_quiz(self, setup_window):
-        """Glavna logika kviza: čita tekst, šalje AI-u i prikazuje pitanja."""
+        """Glavna logika kviza: provjerava unos i pokreće ekstrakciju i AI u pozadini."""
         
         doc_path = self.doc_path_var.get()
+        try:
+            load_quiz_stack()
+        except ImportError as e:
+            messagebox.showerror("Greška", f"Uvoz biblioteka za kviz nije uspio ({e}). Pokrenite: {QUIZ_INSTALL_HINT}")
+            return
         
         if not os.path.exists(doc_path) or doc_path == "Nije odabran PDF fajl":
             messagebox.showerror("Greška", "Molimo odaberite validan PDF dokument.")
@@ -472,6 +860,10 @@ class StudijskiProgram(tk.Tk):
             start_page = int(self.start_page_entry.get())
             end_page = int(self.end_page_entry.get())
             num_questions = int(self.num_questions_entry.get())
+            fresh = self.fresh_questions_var.get()
+            stream = self.stream_questions_var.get()
+            topic = self.topic_entry.get().strip()
+            endless = self.endless_quiz_var.get()
             
             if start_page < 1 or end_page < start_page or num_questions < 1:
                 raise ValueError("Neispravan unos brojeva stranica ili pitanja.")
@@ -484,107 +876,248 @@ class StudijskiProgram(tk.Tk):
             return
 
         setup_window.destroy()
-        
+        self.show_quiz_progress_window()
+
+        self.quiz_window = None
+        self.quiz_expected = num_questions
+        self.quiz_endless = endless
+        self.quiz_source = None
+        self.quiz_job = self.jobs.submit(
+            self._quiz_pipeline, doc_path, start_page, end_page, num_questions, fresh, stream, topic, endless,
+            on_done=self._on_quiz_ready,
+            on_error=self._on_quiz_failed,
+            on_progress=self._on_quiz_progress,
+            on_cancel=self._close_quiz_progress_window,
+            on_item=self._on_quiz_question_streamed,
+        )
+
+    @tracing.traced('quiz.pipeline')
+    def _quiz_pipeline(self, job, doc_path, start_page, end_page, num_questions, fresh=False, stream=False,
+                       topic='', endless=False):
+        """Pozadinski dio kviza: ekstrakcija i generiranje. Ne smije dirati widgete.
+
+        Uz endless=True vraća prvu seriju pitanja, a izvor sljedećih serija
+        (quiz_ai.EndlessQuestionSource) ostavlja u self.quiz_source.
+        """
+
+        def on_page(done, total):
+            job.check_cancelled()
+            job.report(f"Ekstrakcija teksta: stranica {done} / {total}", done / total)
+
+        job.report("Ekstrakcija teksta iz PDF-a...", 0.0)
         try:
-            full_text = self.extract_text_from_pdf(doc_path, start_page, end_page)
+            pages = self.extract_text_from_pdf(doc_path, start_page, end_page, on_page=on_page)
+        except JobCancelled:
+            raise
         except Exception as e:
-            messagebox.showerror("Greška", f"Ekstrakcija teksta nije uspjela: {e}")
-            return
+            raise Exception(f"Ekstrakcija teksta nije uspjela: {e}")
 
-        if not full_text.strip():
-            messagebox.showerror("Greška", "Nije moguće izvući tekst iz navedenog raspona stranica.")
-            return
+        # Zaglavlja, podnožja i višak razmaka samo troše tokene. Bez NumPy-a se preveliki
+        # tekst skraćuje proporcionalno, a inače se biraju najinformativniji dijelovi (retrieval).
+        with tracing.span('quiz.prepare_text', pages=len(pages)) as span:
+            # Beskonačni kviz troši cijeli tekst u serijama, pa se ne skraćuje.
+            budget = 0 if retrieval.available() or endless else text_prep.TOKEN_BUDGET
+            prepared = text_prep.prepare_text(pages, budget_tokens=budget)
+            span.set(tokens_before=prepared.tokens_before, tokens_after=prepared.tokens_after)
+        full_text = prepared.text
 
+        if not full_text.strip():
+            raise Exception("Nije moguće izvući tekst iz navedenog raspona stranica.")
+        job.report(prepared.summary())
+
+        context_budget = retrieval.context_budget(num_questions)
+        if retrieval.available():
+            job.check_cancelled()
+            if self.retrieval_cache is None:
+                self.retrieval_cache = retrieval.IndexCache()
+            doc_key = f"{self.page_cache.file_hash(doc_path)}:{start_page}-{end_page}"
+            with tracing.span('quiz.retrieve', topic=topic) as span:
+                selection = retrieval.select_passages(prepared.pages, context_budget,
+                                                      topic=topic, cache=self.retrieval_cache, doc_key=doc_key)
+                span.set(chunks=selection.chunks_total, selected=selection.chunks_selected,
+                         tokens_after=selection.tokens_after)
+            job.report(selection.summary())
+            if endless:
+                index = retrieval.get_index(prepared.pages, self.retrieval_cache, doc_key)
+                make_segments = lambda: retrieval.iter_passages(index, context_budget, topic)
+            else:
+                full_text = selection.text
+        elif endless:
+            make_segments = lambda: quiz_ai.split_into_chunks(full_text, context_budget)
+
+        job.check_cancelled()
         try:
-            questions = self.generate_questions_with_ai(full_text, num_questions)
-        except APIError as e:
-            messagebox.showerror("AI Greška", f"Gemini API nije uspio generirati pitanja. Provjerite ključ ili kvote. Greška: {e}")
-            return
+            if endless:
+                if self.response_cache is None:
+                    self.response_cache = quiz_ai.ResponseCache()
+                source = quiz_ai.EndlessQuestionSource(make_segments, num_questions,
+                                                       cache=self.response_cache, fresh=fresh)
+                questions = source.next_batch(on_question=job.emit if stream else None, on_stage=job.report,
+                                              check_cancelled=job.check_cancelled)
+                self.quiz_source = source
+            else:
+                questions = self.generate_questions_with_ai(full_text, num_questions, on_stage=job.report,
+                                                            fresh=fresh, on_question=job.emit if stream else None,
+                                                            check_cancelled=job.check_cancelled)
+        except (APIError, JobCancelled):
+            raise
         except Exception as e:
-            messagebox.showerror("Greška", f"Generiranje pitanja nije uspjelo: {e}")
+            raise Exception(f"Generiranje pitanja nije uspjelo: {e}")
+
+        job.check_cancelled()
+        return questions
+
+    def show_quiz_progress_window(self):
+        """Prikazuje prozor s napretkom pripreme kviza i dugmetom za prekid."""
+        self.quiz_progress_window = tk.Toplevel(self)
+        self.quiz_progress_window.title("Priprema kviza")
+        self.quiz_progress_window.geometry("420x160")
+        self.quiz_progress_window.protocol("WM_DELETE_WINDOW", self.cancel_quiz_job)
+
+        self.quiz_stage_label = tk.Label(self.quiz_progress_window, text="Pokretanje...", font=("Arial", 11), wraplength=380)
+        self.quiz_stage_label.pack(pady=(20, 10))
+
+        self.quiz_progressbar = ttk.Progressbar(self.quiz_progress_window, length=360, mode='determinate', maximum=1.0)
+        self.quiz_progressbar.pack(pady=5)
+
+        tk.Button(self.quiz_progress_window, text="Prekini", command=self.cancel_quiz_job,
+                  bg="lightgrey", relief='flat', padx=10, pady=5).pack(pady=10)
+
+    def _on_quiz_progress(self, message, fraction):
+        """Ažurira prozor napretka (poziva se u UI niti)."""
+        if not self.quiz_progress_window.winfo_exists():
+            return
+        self.quiz_stage_label.config(text=message)
+        if fraction is None:
+            if self.quiz_progressbar['mode'] != 'indeterminate':
+                self.quiz_progressbar.config(mode='indeterminate')
+                self.quiz_progressbar.start(15)
+        else:
+            if self.quiz_progressbar['mode'] != 'determinate':
+                self.quiz_progressbar.stop()
+                self.quiz_progressbar.config(mode='determinate')
+            self.quiz_progressbar['value'] = fraction
+
+    def cancel_quiz_job(self):
+        """Prekida pripremu kviza; rezultat koji eventualno stigne se odbacuje."""
+        self.quiz_job.cancel()
+        self._close_quiz_progress_window()
+
+    def _close_quiz_progress_window(self):
+        if self.quiz_progress_window.winfo_exists():
+            self.quiz_progress_window.destroy()
+
+    def _on_quiz_question_streamed(self, question):
+        """Prima jedno pitanje iz streama; prvo otvara prozor kviza."""
+        if self.quiz_window is None:
+            self._close_quiz_progress_window()
+            self.show_generated_quiz([question], streaming=True, expected=self.quiz_expected)
+            return
+        if not self.quiz_window.winfo_exists():
+            return
+        self.quiz_questions.append(question)
+        if self.quiz_waiting:
+            self.quiz_waiting = False
+            self.next_quiz_question()
+        else:
+            self._update_quiz_progress_label()
+
+    def _finish_quiz_stream(self):
+        """Označava da više pitanja neće stići i nastavlja kviz ako je čekao."""
+        self.quiz_streaming = False
+        if not self.quiz_window.winfo_exists():
             return
+        if self.quiz_waiting:
+            self.quiz_waiting = False
+            self.next_quiz_question()
+        else:
+            self._update_quiz_progress_label()
+            self._maybe_prefetch_questions()
 
+    def _on_quiz_ready(self, questions):
+        self._close_quiz_progress_window()
+        if self.quiz_window is not None:
+            self._finish_quiz_stream()
+            return
         if not questions:
             messagebox.showinfo("Kviz", "AI nije uspio generirati pitanja iz teksta.")
             return
-
         self.show_generated_quiz(questions)
 
+    def _on_quiz_failed(self, error):
+        self._close_quiz_progress_window()
+        if self.quiz_window is not None:
+            self._finish_quiz_stream()
+        if isinstance(error, APIError):
+            messagebox.showerror("AI Greška", f"Gemini API nije uspio generirati pitanja. Provjerite ključ ili kvote. Greška: {error}")
+        else:
+            messagebox.showerror("Greška", str(error))
 
-    def extract_text_from_pdf(self, doc_path, start_page, end_page):
-        """Ekstrahira tekst iz PDF-a u zadanom rasponu stranica."""
+
+    @tracing.traced('quiz.extract')
+    def extract_text_from_pdf(self, doc_path, start_page, end_page, on_page=None):
+        """Ekstrahira tekst iz PDF-a u zadanom rasponu stranica i vraća listu tekstova stranica.
+
+        Već viđene stranice dolaze iz keša na disku, a veliki rasponi se
+        obrađuju paralelno (vidi pdf_extract). on_page(obrađeno,
+        ukupno) se poziva nakon svake stranice; iznimka iz njega (npr.
+        JobCancelled) prekida ekstrakciju.
+        """
         
-        text = ""
+        if self.page_cache is None:
+            self.page_cache = pdf_extract.PageTextCache()
+
         try:
-            reader = PdfReader(doc_path)
-            for i in range(start_page - 1, end_page):
-                if i < len(reader.pages):
-                    page = reader.pages[i]
-                    text += page.extract_text()
+            pages = pdf_extract.extract_pages(doc_path, start_page, end_page, on_page=on_page, cache=self.page_cache)
+        except JobCancelled:
+            raise
         except Exception as e:
             raise Exception(f"Problem sa čitanjem PDF-a ili rasponom stranica. Provjerite PDF. ({e})")
             
-        return text
-
-
-    def generate_questions_with_ai(self, text, num_questions):
-        """Šalje tekst AI-u i traži pitanja i odgovore."""
-        
-        client = genai.Client()
-        
-        prompt = f"""
-        Ti si stručni asistent za učenje. Tvoja je zadaća generirati visokokvalitetna pitanja i odgovore na osnovu priloženog teksta.
-
-        1. **Broj Pitanja:** Generiraj tačno {num_questions} pitanja.
-        2. **Fokus:** Pitanja moraju biti fokusirana na **najvažnije koncepte, datume, formule, definicije ili ključne činjenice** iz teksta. Izbjegavaj irelevantne detalje.
-        3. **Odgovor:** Svaki odgovor mora biti **precizan, kratak i direktan**, a ne prepisani dio teksta.
-        4. **Format izlaza:** Obavezno vrati izlaz isključivo kao strogi JSON niz (lista objekata). Ne smiješ dodavati nikakav drugi tekst, objašnjenja ili markdown kod (poput ```json) prije ili poslije JSON-a.
-
-        Primjer željenog JSON formata:
-        [
-            {{
-                "pitanje": "Koja je primarna svrha Mitohondrija?",
-                "odgovor": "Proizvodnja energije (ATP) staničnim disanjem."
-            }},
-            {{
-                "pitanje": "Navedi datum potpisivanja Dejtonskog sporazuma.",
-                "odgovor": "14. decembar 1995. godine."
-            }}
-        ]
-
-        TEKST ZA ANALIZU:
-        ---
-        {text}
-        ---
+        return pages
+
+
+    @tracing.traced('quiz.generate')
+    def generate_questions_with_ai(self, text, num_questions, on_stage=None, fresh=False, on_question=None,
+                                   check_cancelled=None):
+        """Šalje tekst AI-u i traži pitanja i odgovore (vidi quiz_ai.generate_questions).
+
+        Veliki tekst se dijeli na komade koji se generiraju paralelno, a ponovljeni
+        upiti se služe iz lokalnog keša odgovora, osim kada je fresh=True.
+        Uz on_question pitanja se prosljeđuju jedno po jedno, čim stignu, a
+        check_cancelled() (npr. Job.check_cancelled) prekida preostale zahtjeve.
         """
-        
-        response = client.models.generate_content(
-            model='gemini-2.5-flash',
-            contents=prompt
-        )
-        
-        try:
-            json_text = response.text.strip().replace('```json', '').replace('```', '')
-            
-            if not json_text.startswith('[') and not json_text.endswith(']'):
-                raise ValueError("AI izlaz nije u očekivanom JSON formatu (nema zagrada).")
-                
-            return json.loads(json_text)
-        
-        except Exception as e:
-            print(f"AI izlaz nije validan JSON: {response.text[:200]}...")
-            raise Exception(f"AI nije uspio vratiti validan JSON uprkos uputama. ({e})")
+        if self.response_cache is None:
+            self.response_cache = quiz_ai.ResponseCache()
+        return quiz_ai.generate_questions_chunked(text, num_questions, on_stage=on_stage,
+                                                  cache=self.response_cache, fresh=fresh,
+                                                  on_question=on_question, check_cancelled=check_cancelled)
+
 
+    @tracing.traced('ui.show_quiz')
+    def show_generated_quiz(self, questions, streaming=False, expected=None):
+        """Prikazuje pitanja i odgovore generirane od AI-a u interaktivnom prozoru.
 
-    def show_generated_quiz(self, questions):
-        """Prikazuje pitanja i odgovore generirane od AI-a u interaktivnom prozoru."""
+        Uz streaming=True lista pitanja još raste (vidi _on_quiz_question_streamed),
+        a expected je broj pitanja koji se očekuje na kraju.
+        """
         
         quiz_window = tk.Toplevel(self)
-        quiz_window.title(f"Kviz - {self.flashcards.get_subject_name()} ({len(questions)} pitanja)")
+        quiz_window.title(f"Kviz - {self.flashcards.get_subject_name()} ({expected or len(questions)} pitanja)")
         quiz_window.geometry("750x550")
+        quiz_window.protocol("WM_DELETE_WINDOW", self.close_quiz_window)
         
+        self.quiz_window = quiz_window
         self.current_quiz_index = -1
         self.quiz_questions = questions
+        self.quiz_streaming = streaming
+        self.quiz_waiting = False
+        self.quiz_expected = expected or len(questions)
+        self.quiz_answers = {}
+        self.quiz_grades = {}
+        self.quiz_grader = None
+        self.quiz_id = int(time.time())
+        self.quiz_prefetch_job = None
         
         self.quiz_progress_label = tk.Label(quiz_window, text="", font=("Arial", 14, "italic"), fg="grey")
         self.quiz_progress_label.pack(anchor="ne", padx=10, pady=10)
@@ -606,13 +1139,30 @@ class StudijskiProgram(tk.Tk):
         self.quiz_next_btn = tk.Button(quiz_window, text="Sljedeće Pitanje >>", command=self.next_quiz_question, width=30, height=2, bg="lightgreen", state=tk.DISABLED)
         self.quiz_next_btn.pack(pady=20)
 
+        if self.quiz_endless:
+            tk.Button(quiz_window, text="Završi kviz", command=self.finish_quiz,
+                      relief='flat', padx=10, pady=5).pack()
+
         self.next_quiz_question()
 
+    def _get_quiz_grader(self):
+        """Grader za trenutna pitanja; pravi se ponovo kada stignu nova (streaming)."""
+        if self.quiz_grader is None or len(self.quiz_grader.questions) != len(self.quiz_questions):
+            self.quiz_grader = grading.Grader(list(self.quiz_questions))
+        return self.quiz_grader
+
     def reveal_quiz_answer(self):
-        """Prikazuje točan odgovor generiran od AI-a."""
+        """Ocjenjuje upisani odgovor lokalno i prikazuje točan odgovor generiran od AI-a."""
         if 0 <= self.current_quiz_index < len(self.quiz_questions):
-            answer = self.quiz_questions[self.current_quiz_index].get('odgovor', 'Nema odgovora')
-            self.quiz_ai_answer_label.config(text=f"Točan odgovor AI-a:\n{answer}")
+            index = self.current_quiz_index
+            answer = self.quiz_questions[index].get('odgovor', 'Nema odgovora')
+            user_answer = self.quiz_user_answer.get("1.0", tk.END).strip()
+            self.quiz_answers[index] = user_answer
+            grade = self._get_quiz_grader().grade(index, user_answer)
+            self.quiz_grades[index] = grade
+            colors = {"Tačno": "darkgreen", "Djelimično tačno": "darkorange", "Netačno": "firebrick"}
+            self.quiz_ai_answer_label.config(text=f"{grade.summary()}\n\nTočan odgovor AI-a:\n{answer}",
+                                             fg=colors[grade.verdict])
             self.quiz_show_answer_btn.config(state=tk.DISABLED)
             self.quiz_next_btn.config(state=tk.NORMAL)
 
@@ -623,18 +1173,298 @@ class StudijskiProgram(tk.Tk):
         if self.current_quiz_index < len(self.quiz_questions):
             q_data = self.quiz_questions[self.current_quiz_index]
             
-            self.quiz_progress_label.config(text=f"Pitanje: {self.current_quiz_index + 1} / {len(self.quiz_questions)}")
+            self._update_quiz_progress_label()
             self.quiz_question_label.config(text=q_data.get('pitanje', 'Nema pitanja.'))
             self.quiz_ai_answer_label.config(text="")
             self.quiz_user_answer.delete("1.0", tk.END)
             self.quiz_show_answer_btn.config(state=tk.NORMAL)
             self.quiz_next_btn.config(state=tk.DISABLED)
+            self._maybe_prefetch_questions()
+            
+        elif self.quiz_streaming or (self.quiz_source is not None and not self.quiz_source.exhausted):
+            # Korisnik je stigao do kraja pristiglih pitanja; čekamo sljedeće.
+            self.current_quiz_index -= 1
+            self.quiz_waiting = True
+            self.quiz_question_label.config(text="Čekam sljedeće pitanje...")
+            self.quiz_ai_answer_label.config(text="")
+            self.quiz_show_answer_btn.config(state=tk.DISABLED)
+            self.quiz_next_btn.config(state=tk.DISABLED)
+            self._maybe_prefetch_questions()
             
         else:
+            self.finish_quiz()
+
+    # --- BESKONAČNI KVIZ ---
+
+    def _maybe_prefetch_questions(self):
+        """Pokreće pripremu sljedeće serije kada ostane malo neodgovorenih pitanja.
+
+        Istovremeno radi najviše jedna priprema, a zahtjevi idu kroz zajednički
+        Gemini klijent, pa prefetch ne može preći ograničenja API-ja.
+        """
+        source = self.quiz_source
+        if source is None or source.exhausted or self.quiz_prefetch_job is not None or self.quiz_streaming:
+            return
+        remaining = len(self.quiz_questions) - self.current_quiz_index - 1
+        if remaining > source.low_water:
+            return
+        self.quiz_prefetch_job = self.jobs.submit(
+            self._prefetch_questions, source,
+            on_item=self._on_prefetched_question,
+            on_done=self._on_prefetch_done,
+            on_error=self._on_prefetch_failed,
+            on_cancel=lambda: None,
+        )
+
+    def _prefetch_questions(self, job, source):
+        """Pozadinski dio: sljedeća serija pitanja, prosljeđena jedno po jedno."""
+        def forward(question):
+            job.check_cancelled()
+            job.emit(question)
+
+        return source.next_batch(on_question=forward, check_cancelled=job.check_cancelled)
+
+    def _on_prefetched_question(self, question):
+        if self.quiz_window is None or not self.quiz_window.winfo_exists():
+            return
+        self.quiz_questions.append(question)
+        if self.quiz_waiting:
+            self.quiz_waiting = False
+            self.next_quiz_question()
+        else:
+            self._update_quiz_progress_label()
+
+    def _on_prefetch_done(self, batch):
+        self.quiz_prefetch_job = None
+        if self.quiz_window is None or not self.quiz_window.winfo_exists():
+            return
+        if self.quiz_waiting:
+            # Serija nije donijela nova pitanja; next_quiz_question čeka dalje ili završava kviz.
+            self.quiz_waiting = False
+            self.next_quiz_question()
+        else:
+            self._maybe_prefetch_questions()
+
+    def _on_prefetch_failed(self, error):
+        self.quiz_prefetch_job = None
+        if self.quiz_window is None or not self.quiz_window.winfo_exists():
+            return
+        if self.quiz_waiting:
+            # Korisnik nema šta raditi, pa se kviz završava umjesto beskonačnog čekanja.
+            self.quiz_waiting = False
+            messagebox.showerror("Greška", f"Nova pitanja nisu stigla: {error}")
+            self.finish_quiz()
+
+    def finish_quiz(self):
+        """Završava kviz: zaustavlja pripremu pitanja i prikazuje sažetak s ocjenama."""
+        if self.quiz_prefetch_job is not None:
+            self.quiz_prefetch_job.cancel()
+            self.quiz_prefetch_job = None
+        self.quiz_source = None
+        self.quiz_window.destroy()
+        self.show_quiz_summary(self._grade_finished_quiz())
+
+    def _update_quiz_progress_label(self):
+        if self.quiz_endless:
+            text = f"Pitanje: {self.current_quiz_index + 1} (beskonačni kviz, pripremljeno {len(self.quiz_questions)})"
+            self.quiz_progress_label.config(text=text)
+            return
+        total = self.quiz_expected if self.quiz_streaming else len(self.quiz_questions)
+        text = f"Pitanje: {self.current_quiz_index + 1} / {total}"
+        if self.quiz_streaming:
+            text += f" (stiglo {len(self.quiz_questions)})"
+        self.quiz_progress_label.config(text=text)
+
+    def close_quiz_window(self):
+        """Zatvara kviz i prekida generiranje ako pitanja još stižu; već dati odgovori se spremaju."""
+        if self.quiz_streaming:
+            self.quiz_job.cancel()
+            self.quiz_streaming = False
+        if self.quiz_prefetch_job is not None:
+            self.quiz_prefetch_job.cancel()
+            self.quiz_prefetch_job = None
+        self.quiz_source = None
+        self.quiz_window.destroy()
+        self._grade_finished_quiz()
+
+    def _grade_finished_quiz(self):
+        """Ocjenjuje sve odgovore kviza odjednom i dopisuje ih u log ocjena predmeta.
+
+        Vraća listu (pitanje, odgovor korisnika, Grade) za pitanja na koja je korisnik odgovorio.
+        """
+        indices = sorted(self.quiz_answers)
+        if not indices:
+            return []
+        answers = [self.quiz_answers.get(i) for i in range(len(self.quiz_questions))]
+        with tracing.span('quiz.grade', answers=len(indices)):
+            grades = self._get_quiz_grader().grade_all(answers)
+        results = [(self.quiz_questions[i], answers[i], grades[i]) for i in indices]
+        try:
+            grading.GradeLog(grading.grades_path(self.flashcards.filename)).append(
+                self.quiz_id, *zip(*results))
+        except OSError as e:
+            messagebox.showwarning("Ocjene kviza", f"Ocjene kviza nisu spremljene: {e}")
+        self.quiz_answers = {}
+        return results
+
+    def show_quiz_summary(self, results):
+        """Prozor sa sažetkom kviza: prosječna ocjena i ocjena svakog pitanja."""
+        if not results:
             messagebox.showinfo("Kviz Završen", "Kviz je uspješno završen!")
-            self.quiz_next_btn.master.destroy()
+            return
+
+        window = tk.Toplevel(self)
+        window.title("Rezultat kviza")
+        window.geometry("720x480")
+
+        average = sum(grade.score for _, _, grade in results) / len(results)
+        counts = {label: sum(grade.verdict == label for _, _, grade in results)
+                  for label in ("Tačno", "Djelimično tačno", "Netačno")}
+        tk.Label(window, text=f"Prosječna ocjena: {average:.0%}", font=("Arial", 18, "bold")).pack(pady=(15, 5))
+        tk.Label(window, text=", ".join(f"{label}: {count}" for label, count in counts.items()),
+                 font=("Arial", 12)).pack()
+
+        table = ttk.Treeview(window, columns=("score", "verdict"))
+        table.heading("#0", text="Pitanje")
+        table.column("#0", width=470)
+        table.heading("score", text="Ocjena")
+        table.column("score", width=70, anchor="e")
+        table.heading("verdict", text="")
+        table.column("verdict", width=130)
+        table.pack(fill="both", expand=True, padx=10, pady=10)
+        for question, _, grade in sorted(results, key=lambda item: item[2].score):
+            table.insert("", tk.END, text=question.get('pitanje', ''),
+                         values=(f"{grade.score:.0%}", grade.verdict))
+
+        tk.Button(window, text="Zatvori", command=window.destroy, relief='flat', padx=10, pady=5).pack(pady=(0, 10))
+
+    def show_weak_questions(self):
+        """Pitanja iz ranijih kvizova s najnižom prosječnom ocjenom za ovaj predmet."""
+        weak = grading.GradeLog(grading.grades_path(self.flashcards.filename)).weak_questions()
+        if not weak:
+            messagebox.showinfo("Slaba pitanja", "Nema slabo odgovorenih pitanja iz kvizova za ovaj predmet.")
+            return
+
+        window = tk.Toplevel(self)
+        window.title(f"Slaba pitanja - {self.flashcards.get_subject_name()}")
+        window.geometry("760x520")
+
+        table = ttk.Treeview(window, columns=("score", "attempts"), height=12)
+        table.heading("#0", text="Pitanje")
+        table.column("#0", width=540)
+        table.heading("score", text="Prosjek")
+        table.column("score", width=80, anchor="e")
+        table.heading("attempts", text="Pokušaja")
+        table.column("attempts", width=80, anchor="e")
+        table.pack(fill="both", expand=True, padx=10, pady=10)
+
+        answers = {}
+        for question, answer, score, attempts in weak:
+            row = table.insert("", tk.END, text=question, values=(f"{score:.0%}", attempts))
+            answers[row] = answer
+
+        answer_label = tk.Label(window, text="Izaberite pitanje za prikaz tačnog odgovora.", font=("Arial", 12),
+                                wraplength=720, justify=tk.LEFT, fg="blue")
+        answer_label.pack(fill=tk.X, padx=10, pady=(0, 15))
+        table.bind("<<TreeviewSelect>>",
+                   lambda e: answer_label.config(text=answers.get(next(iter(table.selection()), None), "")))
+
+
+    # --- DIJAGNOSTIKA ---
+
+    def show_diagnostics_window(self):
+        """Prozor s trajanjem zadnjih operacija i percentilima po vrsti operacije."""
+        if getattr(self, 'diagnostics_window', None) is not None and self.diagnostics_window.winfo_exists():
+            self.diagnostics_window.lift()
+            return
+
+        window = self.diagnostics_window = tk.Toplevel(self)
+        window.title("Dijagnostika performansi")
+        window.geometry("720x580")
+
+        status_frame = tk.Frame(window)
+        status_frame.pack(fill=tk.X, padx=10, pady=10)
+        status_label = tk.Label(status_frame, anchor="w", justify=tk.LEFT)
+        status_label.pack(side="left", fill=tk.X, expand=True)
+        toggle_button = tk.Button(status_frame, relief='flat', padx=10, pady=3)
+        toggle_button.pack(side="right")
+
+        tk.Label(window, text="Operacije (trajanje u ms):", font=("Arial", 11, "bold")).pack(anchor="w", padx=10)
+        columns = ("count", "avg", "p50", "p95", "max")
+        table = ttk.Treeview(window, columns=columns, height=10)
+        table.heading("#0", text="Operacija")
+        table.column("#0", width=220)
+        for column, heading in zip(columns, ("Broj", "Prosjek", "p50", "p95", "Max")):
+            table.heading(column, text=heading)
+            table.column(column, width=80, anchor="e")
+        table.pack(fill=tk.X, padx=10, pady=5)
+
+        tk.Label(window, text="Gemini API:", font=("Arial", 11, "bold")).pack(anchor="w", padx=10)
+        gemini_label = tk.Label(window, anchor="w", justify=tk.LEFT)
+        gemini_label.pack(fill=tk.X, padx=10, pady=(0, 5))
+
+        tk.Label(window, text="Zadnje operacije:", font=("Arial", 11, "bold")).pack(anchor="w", padx=10)
+        recent_list = tk.Listbox(window, font=("Courier", 9))
+        recent_list.pack(fill="both", expand=True, padx=10, pady=(5, 10))
+
+        def toggle():
+            if tracing.get_tracer() is None:
+                tracing.enable()
+            else:
+                tracing.disable()
+            refresh()
+
+        def refresh():
+            tracer = tracing.get_tracer()
+            if tracer is None:
+                status_label.config(text="Mjerenje je isključeno (ili pokrenite sa STUDY_TRACE=putanja).")
+                toggle_button.config(text="Uključi mjerenje", command=toggle)
+                stats, recent = {}, []
+            else:
+                target = f"trace fajl: {tracer.path}" if tracer.path else "samo u memoriji"
+                status_label.config(text=f"Mjerenje je uključeno ({target}).")
+                toggle_button.config(text="Isključi mjerenje", command=toggle)
+                stats, recent = tracer.stats(), tracer.recent_spans()
+
+            table.delete(*table.get_children())
+            for name in sorted(stats, key=lambda n: -stats[n]["p95"]):
+                values = stats[name]
+                table.insert("", tk.END, text=name, values=(
+                    values["count"], *(f"{values[key] * 1000:.1f}" for key in ("avg", "p50", "p95", "max"))))
+
+            # gemini_client se ne uvozi ovdje (teške biblioteke); bez njega nije bilo zahtjeva.
+            client_module = sys.modules.get('gemini_client')
+            pool = client_module.existing_client_pool() if client_module else None
+            gemini_label.config(text=pool.metrics.summary() if pool else "Još nije bilo zahtjeva prema Gemini API-ju.")
+
+            recent_list.delete(0, tk.END)
+            for name, duration, attrs in recent:
+                details = " ".join(f"{key}={value}" for key, value in attrs.items())
+                recent_list.insert(tk.END, f"{duration * 1000:9.1f} ms  {name:24} {details}")
+
+        def tick():
+            if window.winfo_exists():
+                refresh()
+                window.after(1000, tick)
+
+        tick()
+
+
+def report_startup_time(app):
+    """Ispisuje trajanje uvoza, izgradnje prozora i prvog iscrtavanja, pa zatvara program."""
+    painted_at = time.perf_counter()
+    heavy = [name for name in ('PyPDF2', 'google.genai', 'dotenv', 'numpy') if name in sys.modules]
+    print(f"Uvoz modula:        {(_IMPORTS_DONE_AT - _STARTED_AT) * 1000:8.1f} ms")
+    print(f"Izgradnja prozora:  {(app.created_at - _IMPORTS_DONE_AT) * 1000:8.1f} ms")
+    print(f"Prvo iscrtavanje:   {(painted_at - _STARTED_AT) * 1000:8.1f} ms (ukupno od pokretanja)")
+    print(f"Teške biblioteke učitane pri startu: {', '.join(heavy) or 'nijedna'}")
+    app.destroy()
 
 
 if __name__ == "__main__":
     app = StudijskiProgram()
+    app.created_at = time.perf_counter()
+    # --startup-timing (ili STARTUP_TIMING=1): mjerenje vremena pokretanja za praćenje regresija.
+    if "--startup-timing" in sys.argv or os.getenv("STARTUP_TIMING") == "1":
+        app.after_idle(lambda: app.after(0, report_startup_time, app))
     app.mainloop()
\ No newline at end of file
@@ -0,0 +1,169 @@
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import PyPDF2
+from PyPDF2 import PdfReader
+
+from disk_cache import DiskCache
+from tracing import traced
+
+# Ispod ovog broja stranica pokretanje procesa košta više nego što donese.
+PARALLEL_MIN_PAGES = 24
+# Najmanji komad posla po procesu, da svaki worker ne otvara PDF za par stranica.
+MIN_CHUNK_PAGES = 8
+
+# Mijenja se kada se promijeni način ekstrakcije, pa stari keširani tekst postaje nevažeći.
+EXTRACTOR_VERSION = f"pypdf2-{PyPDF2.__version__}-1"
+
+PAGE_CACHE_PATH = os.path.join('cache', 'page_text.sqlite3')
+PAGE_CACHE_MAX_MB = int(os.getenv("PAGE_CACHE_MAX_MB", "200"))
+
+
+class PageTextCache:
+    """Keš teksta stranica adresiran sadržajem: (hash fajla, stranica, verzija ekstraktora).
+
+    Isti PDF pod drugim imenom ili putanjom dijeli unose, a izmijenjeni fajl
+    automatski dobija nove ključeve.
+    """
+
+    def __init__(self, path=PAGE_CACHE_PATH, max_bytes=PAGE_CACHE_MAX_MB * 1024 * 1024):
+        self.store = DiskCache(path, max_bytes)
+        self._hashes = {}
+
+    def file_hash(self, doc_path):
+        """SHA-256 sadržaja fajla; pamti se dok se mtime i veličina ne promijene."""
+        st = os.stat(doc_path)
+        memo_key = (os.path.abspath(doc_path), st.st_mtime_ns, st.st_size)
+        digest = self._hashes.get(memo_key)
+        if digest is None:
+            h = hashlib.sha256()
+            with open(doc_path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    h.update(block)
+            digest = self._hashes[memo_key] = h.hexdigest()
+        return digest
+
+    @staticmethod
+    def _key(file_hash, page):
+        return f"{file_hash}:{page}:{EXTRACTOR_VERSION}"
+
+    def get_pages(self, file_hash, indices):
+        """Vraća {indeks_stranice: tekst} za keširane stranice."""
+        keys = {self._key(file_hash, i): i for i in indices}
+        return {keys[k]: text for k, text in self.store.get_many(keys).items()}
+
+    def put_pages(self, file_hash, pages):
+        """Sprema {indeks_stranice: tekst}."""
+        self.store.put_many((self._key(file_hash, i), text) for i, text in pages.items())
+
+    def get_page_count(self, file_hash):
+        value = self.store.get(self._key(file_hash, 'count'))
+        return int(value) if value is not None else None
+
+    def put_page_count(self, file_hash, count):
+        self.store.put(self._key(file_hash, 'count'), str(count))
+
+
+def _extract_pages(doc_path, indices):
+    """Worker: otvara vlastiti PdfReader i vraća tekstove stranica s datim indeksima."""
+    reader = PdfReader(doc_path)
+    pages = reader.pages
+    return [pages[i].extract_text() or "" for i in indices]
+
+
+def _split_indices(indices, workers):
+    """Dijeli listu indeksa na komade (više komada nego workera radi balansa)."""
+    chunk = max(MIN_CHUNK_PAGES, -(-len(indices) // (workers * 4)))
+    return [indices[i:i + chunk] for i in range(0, len(indices), chunk)]
+
+
+def page_count(doc_path):
+    """Vraća broj stranica u PDF-u."""
+    return len(PdfReader(doc_path).pages)
+
+
+def _cached_page_count(doc_path, cache):
+    """Broj stranica, iz keša ako je isti fajl već otvaran."""
+    file_hash = cache.file_hash(doc_path) if cache else None
+    count = cache.get_page_count(file_hash) if cache else None
+    if count is None:
+        count = page_count(doc_path)
+        if cache:
+            cache.put_page_count(file_hash, count)
+    return count
+
+
+def _iter_extracted(doc_path, indices, max_workers):
+    """Generator (indeks, tekst) za date indekse, po redu; veliki skupovi idu u ProcessPool."""
+    workers = max_workers or min(os.cpu_count() or 1, 8)
+    if workers < 2 or len(indices) < PARALLEL_MIN_PAGES:
+        if indices:
+            pages = PdfReader(doc_path).pages
+            for i in indices:
+                yield i, pages[i].extract_text() or ""
+        return
+
+    chunks = _split_indices(indices, workers)
+    # 'spawn' umjesto 'fork': roditelj ima Tk i pozadinske niti.
+    context = multiprocessing.get_context('spawn')
+    executor = ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=context)
+    try:
+        futures = [executor.submit(_extract_pages, doc_path, chunk) for chunk in chunks]
+        for chunk, future in zip(chunks, futures):
+            yield from zip(chunk, future.result())
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_page_texts(doc_path, start_page, end_page, max_workers=None, cache=None):
+    """Generator koji redom vraća (broj_stranice, tekst) za stranice start_page..end_page.
+
+    Stranice iz keša se vraćaju odmah; samo nedostajuće se ekstrahuju, a veliki
+    skupovi se dijele na komade koje paralelno obrađuje ProcessPoolExecutor.
+    Stranice se ipak vraćaju po redu. Stranice izvan dokumenta se preskaču.
+    Zatvaranje generatora otkazuje preostale komade.
+    """
+    file_hash = cache.file_hash(doc_path) if cache else None
+    count = _cached_page_count(doc_path, cache)
+
+    indices = list(range(start_page - 1, min(end_page, count)))
+    cached = cache.get_pages(file_hash, indices) if cache else {}
+    missing = [i for i in indices if i not in cached]
+
+    extracted = _iter_extracted(doc_path, missing, max_workers)
+    fresh = {}
+    try:
+        for i in indices:
+            text = cached.get(i)
+            if text is None:
+                _, text = next(extracted)
+                fresh[i] = text
+            yield i + 1, text
+    finally:
+        extracted.close()
+        if cache and fresh:
+            cache.put_pages(file_hash, fresh)
+
+
+@traced('pdf.extract_pages')
+def extract_pages(doc_path, start_page, end_page, on_page=None, max_workers=None, cache=None):
+    """Vraća listu tekstova stranica start_page..end_page.
+
+    on_page(obrađeno, ukupno) se poziva za svaku stranicu kako stiže; ukupno ne
+    uključuje stranice iza kraja dokumenta.
+    """
+    end_page = min(end_page, _cached_page_count(doc_path, cache))
+    total = max(0, end_page - start_page + 1)
+    pages = []
+    for page_number, text in iter_page_texts(doc_path, start_page, end_page, max_workers, cache):
+        pages.append(text)
+        if on_page:
+            on_page(page_number - start_page + 1, total)
+    return pages
+
+
+def extract_text(doc_path, start_page, end_page, on_page=None, max_workers=None, cache=None):
+    """Vraća tekst stranica start_page..end_page spojen u jedan string."""
+    return "\n".join(extract_pages(doc_path, start_page, end_page, on_page, max_workers, cache))
@@ -0,0 +1,437 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from disk_cache import DiskCache
+from gemini_client import get_client_pool
+import tracing
+from text_prep import CHARS_PER_TOKEN, estimate_tokens
+
+MODEL_NAME = 'gemini-2.5-flash'
+# Povećati pri svakoj izmjeni PROMPT_TEMPLATE, da stari keširani odgovori ne važe.
+PROMPT_VERSION = 1
+
+CHUNK_TOKENS = int(os.getenv("QUIZ_CHUNK_TOKENS", "8000"))
+MAX_CONCURRENT_REQUESTS = int(os.getenv("QUIZ_MAX_CONCURRENT_REQUESTS", "4"))
+# Pitanja čiji se skupovi riječi preklapaju barem ovoliko smatraju se duplikatima.
+DUPLICATE_JACCARD = 0.8
+# Beskonačni kviz: sljedeća serija se traži kada ostane ovoliko neodgovorenih pitanja.
+# 0 = pola serije: uz zadanih GEMINI_RPM serija stiže tek nakon desetina sekundi,
+# pa bi par preostalih pitanja korisnika ostavilo da čeka.
+ENDLESS_LOW_WATER = int(os.getenv("QUIZ_ENDLESS_LOW_WATER", "0"))
+# Koliko puta se isti tekst prolazi ispočetka (s novim pitanjima) prije kraja kviza.
+ENDLESS_MAX_ROUNDS = int(os.getenv("QUIZ_ENDLESS_MAX_ROUNDS", "3"))
+
+RESPONSE_CACHE_PATH = os.path.join('cache', 'ai_responses.sqlite3')
+RESPONSE_CACHE_MAX_MB = int(os.getenv("RESPONSE_CACHE_MAX_MB", "50"))
+RESPONSE_CACHE_TTL_HOURS = float(os.getenv("RESPONSE_CACHE_TTL_HOURS", "168"))
+
+PROMPT_TEMPLATE = """
+        Ti si stručni asistent za učenje. Tvoja je zadaća generirati visokokvalitetna pitanja i odgovore na osnovu priloženog teksta.
+
+        1. **Broj Pitanja:** Generiraj tačno {num_questions} pitanja.
+        2. **Fokus:** Pitanja moraju biti fokusirana na **najvažnije koncepte, datume, formule, definicije ili ključne činjenice** iz teksta. Izbjegavaj irelevantne detalje.
+        3. **Odgovor:** Svaki odgovor mora biti **precizan, kratak i direktan**, a ne prepisani dio teksta.
+        4. **Format izlaza:** Obavezno vrati izlaz isključivo kao strogi JSON niz (lista objekata). Ne smiješ dodavati nikakav drugi tekst, objašnjenja ili markdown kod (poput ```json) prije ili poslije JSON-a.
+
+        Primjer željenog JSON formata:
+        [
+            {{
+                "pitanje": "Koja je primarna svrha Mitohondrija?",
+                "odgovor": "Proizvodnja energije (ATP) staničnim disanjem."
+            }},
+            {{
+                "pitanje": "Navedi datum potpisivanja Dejtonskog sporazuma.",
+                "odgovor": "14. decembar 1995. godine."
+            }}
+        ]
+
+        TEKST ZA ANALIZU:
+        ---
+        {text}
+        ---
+        """
+
+
+class ResponseCache:
+    """Keš generiranih pitanja, ključ je otisak (tekst, broj pitanja, model, verzija prompta).
+
+    Tekst se prije hashiranja normalizira (razmaci), pa ista stranica izvučena
+    s drugačijim prelomima redova daje isti ključ. Unosi stariji od TTL-a se
+    ignoriraju, a ukupna veličina je ograničena (LRU).
+    """
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, max_bytes=RESPONSE_CACHE_MAX_MB * 1024 * 1024,
+                 ttl_hours=RESPONSE_CACHE_TTL_HOURS):
+        self.store = DiskCache(path, max_bytes, ttl=ttl_hours * 3600)
+
+    @staticmethod
+    def fingerprint(text, num_questions, model=MODEL_NAME):
+        normalized = re.sub(r'\s+', ' ', text).strip()
+        payload = json.dumps([PROMPT_VERSION, model, num_questions, normalized], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, text, num_questions, model=MODEL_NAME):
+        """Vraća keširanu listu pitanja ili None."""
+        value = self.store.get(self.fingerprint(text, num_questions, model))
+        return json.loads(value) if value is not None else None
+
+    def put(self, text, num_questions, questions, model=MODEL_NAME):
+        self.store.put(self.fingerprint(text, num_questions, model), json.dumps(questions, ensure_ascii=False))
+
+    @property
+    def hits(self):
+        return self.store.hits
+
+    @property
+    def misses(self):
+        return self.store.misses
+
+
+def build_prompt(text, num_questions):
+    return PROMPT_TEMPLATE.format(num_questions=num_questions, text=text)
+
+
+@tracing.traced('ai.parse')
+def parse_questions(response_text):
+    """Pretvara tekst odgovora modela u listu {"pitanje", "odgovor"} rječnika."""
+    try:
+        json_text = response_text.strip().replace('```json', '').replace('```', '')
+        
+        if not json_text.startswith('[') and not json_text.endswith(']'):
+            raise ValueError("AI izlaz nije u očekivanom JSON formatu (nema zagrada).")
+            
+        return json.loads(json_text)
+    
+    except Exception as e:
+        print(f"AI izlaz nije validan JSON: {response_text[:200]}...")
+        raise Exception(f"AI nije uspio vratiti validan JSON uprkos uputama. ({e})")
+
+
+class QuestionStreamParser:
+    """Inkrementalni parser JSON niza objekata koji stiže u komadima.
+
+    feed() prima sljedeći komad teksta i vraća objekte koji su u njemu
+    završeni. Tekst prije '[' (npr. ```json) se preskače.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+
+    def feed(self, text):
+        completed = []
+        for ch in text:
+            if not self._started:
+                if ch == '[':
+                    self._started = True
+                continue
+
+            if self._depth > 0:
+                self._buffer.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == '{':
+                if self._depth == 0:
+                    self._buffer = [ch]
+                self._depth += 1
+            elif ch == '}' and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        completed.append(json.loads(''.join(self._buffer)))
+                    except json.JSONDecodeError:
+                        pass
+                    self._buffer = []
+        return completed
+
+
+def generate_questions(text, num_questions, on_stage=None, cache=None, fresh=False, on_question=None,
+                       check_cancelled=None):
+    """Šalje tekst AI-u i traži pitanja i odgovore.
+
+    Ako je zadan cache, isti upit se služi iz keša, osim kada je fresh=True;
+    tada se pitanja uvijek traže iznova, a novi odgovor zamjenjuje stari u kešu.
+    on_stage(poruka) prima opis trenutne faze (zahtjev, obrada odgovora).
+    Ako je zadan on_question, odgovor se čita kao stream i on_question(pitanje)
+    se poziva za svako pitanje čim je njegov JSON objekt kompletan.
+    Zahtjevi idu kroz zajednički klijent (gemini_client), koji ograničava brzinu
+    i ponavlja privremene greške. check_cancelled() (npr. Job.check_cancelled)
+    se poziva prije zahtjeva i za svaki dio streama i treba baciti izuzetak za prekid.
+    """
+    if check_cancelled:
+        check_cancelled()
+    if cache is not None and not fresh:
+        questions = cache.get(text, num_questions)
+        if questions is not None:
+            if on_stage:
+                on_stage("Pitanja učitana iz keša.")
+            if on_question:
+                for question in questions:
+                    on_question(question)
+            return questions
+
+    pool = get_client_pool()
+    prompt = build_prompt(text, num_questions)
+    tokens = estimate_tokens(prompt)
+
+    if on_stage:
+        on_stage("Zahtjev poslan Gemini modelu, čekam odgovor...")
+
+    if on_question is None:
+        with tracing.span('ai.request', tokens=tokens, questions=num_questions):
+            response = pool.generate(MODEL_NAME, prompt, tokens=tokens)
+        if on_stage:
+            on_stage("Obrada odgovora...")
+        questions = parse_questions(response.text)
+    else:
+        parser = QuestionStreamParser()
+        parts = []
+        questions = []
+        with tracing.span('ai.request_stream', tokens=tokens, questions=num_questions):
+            for chunk in pool.generate_stream(MODEL_NAME, prompt, tokens=tokens):
+                if check_cancelled:
+                    check_cancelled()
+                parts.append(chunk.text or '')
+                for question in parser.feed(chunk.text or ''):
+                    questions.append(question)
+                    on_question(question)
+        if not questions:
+            # Parser nije prepoznao nijedan objekt; probaj cijeli odgovor odjednom.
+            questions = parse_questions(''.join(parts))
+            for question in questions:
+                on_question(question)
+
+    if cache is not None and questions:
+        cache.put(text, num_questions, questions)
+    return questions
+
+def split_into_chunks(text, max_tokens=CHUNK_TOKENS):
+    """Dijeli tekst na komade do max_tokens, po granicama redova gdje god je moguće."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks = []
+    current = []
+    current_len = 0
+
+    for line in text.splitlines(keepends=True):
+        while len(line) > max_chars:
+            # Predugačak red (npr. PDF bez prelomâ) se reže na posljednjem razmaku.
+            cut = line.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            line_part, line = line[:cut], line[cut:]
+            if current:
+                chunks.append(''.join(current))
+                current, current_len = [], 0
+            chunks.append(line_part)
+        if current_len + len(line) > max_chars and current:
+            chunks.append(''.join(current))
+            current, current_len = [], 0
+        current.append(line)
+        current_len += len(line)
+
+    if current:
+        chunks.append(''.join(current))
+    return [c for c in chunks if c.strip()]
+
+
+def allocate_questions(sizes, num_questions):
+    """Raspoređuje num_questions na komade proporcionalno veličini (najveći ostatak)."""
+    total = sum(sizes)
+    if total == 0:
+        return [0] * len(sizes)
+    quotas = [num_questions * size / total for size in sizes]
+    counts = [int(q) for q in quotas]
+    by_remainder = sorted(range(len(sizes)), key=lambda i: quotas[i] - counts[i], reverse=True)
+    for i in by_remainder[:num_questions - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+def _question_tokens(question):
+    return frozenset(re.findall(r'\w+', question.get('pitanje', '').lower()))
+
+
+class QuestionMerger:
+    """Skuplja pitanja bez (skoro) duplikata, najviše limit komada (None = bez ograničenja); thread-safe."""
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.questions = []
+        self._seen = []
+        self._lock = threading.Lock()
+
+    def add(self, question, on_accept=None):
+        """Dodaje pitanje i vraća True ako je prihvaćeno.
+
+        on_accept(pitanje) se poziva prije upisa; ako baci izuzetak (npr. prekid
+        posla), pitanje se ne bilježi kao prihvaćeno.
+        """
+        tokens = _question_tokens(question)
+        if not tokens:
+            return False
+        with self._lock:
+            if self.limit is not None and len(self.questions) >= self.limit:
+                return False
+            if any(len(tokens & other) / len(tokens | other) >= DUPLICATE_JACCARD for other in self._seen):
+                return False
+            if on_accept:
+                on_accept(question)
+            self._seen.append(tokens)
+            self.questions.append(question)
+            return True
+
+
+def merge_questions(batches, num_questions):
+    """Spaja liste pitanja po redu, izbacuje (skoro) duplikate i reže na num_questions."""
+    merger = QuestionMerger(num_questions)
+    for batch in batches:
+        for question in batch:
+            merger.add(question)
+    return merger.questions
+
+
+@tracing.traced('ai.generate_chunked')
+def generate_questions_chunked(text, num_questions, on_stage=None, cache=None, fresh=False,
+                               on_question=None, max_tokens=CHUNK_TOKENS,
+                               max_concurrency=MAX_CONCURRENT_REQUESTS, check_cancelled=None):
+    """Map-reduce generiranje: tekst se dijeli na komade koji se šalju paralelno.
+
+    Pitanja se raspoređuju proporcionalno veličini komada, a rezultati spajaju
+    redom dokumenta bez duplikata. Ukupno vrijeme zavisi od najvećeg komada, a
+    ne od cijelog dokumenta. Neuspjeh jednog komada ne ruši kviz; greška se
+    baca samo ako nijedan komad nije uspio.
+
+    Uz on_question pitanja se prosljeđuju čim stignu iz bilo kojeg komada
+    (redom stizanja), a vraćena lista ima isti redoslijed. check_cancelled()
+    se provjerava prije svakog komada i nakon svakog završenog komada, pa
+    prekid zaustavlja i zahtjeve koji još čekaju na red; njegov izuzetak se
+    ne tretira kao neuspjeh komada nego prekida cijelo generiranje.
+    """
+    chunks = split_into_chunks(text, max_tokens)
+    streamed = QuestionMerger(num_questions) if on_question else None
+
+    def forward(question):
+        streamed.add(question, on_accept=on_question)
+
+    stream_callback = forward if on_question else None
+
+    if len(chunks) <= 1:
+        questions = generate_questions(text, num_questions, on_stage=on_stage, cache=cache,
+                                       fresh=fresh, on_question=stream_callback,
+                                       check_cancelled=check_cancelled)
+        return streamed.questions if streamed else questions
+
+    counts = allocate_questions([len(c) for c in chunks], num_questions)
+    work = [(i, chunk, n) for i, (chunk, n) in enumerate(zip(chunks, counts)) if n > 0]
+
+    if on_stage:
+        on_stage(f"Tekst podijeljen na {len(work)} dijelova, šaljem zahtjeve...")
+
+    results = {}
+    errors = []
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='quiz-chunk') as executor:
+        futures = {
+            executor.submit(generate_questions, chunk, n, cache=cache, fresh=fresh,
+                            on_question=stream_callback, check_cancelled=check_cancelled): i
+            for i, chunk, n in work
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                errors.append(e)
+            if check_cancelled:
+                # Komadi koji još nisu počeli odmah odustaju (provjera prije zahtjeva).
+                check_cancelled()
+            if on_stage:
+                on_stage(f"Generiranje pitanja: gotovo {done} / {len(work)} dijelova")
+
+    if not results:
+        raise errors[0]
+    if streamed:
+        return streamed.questions
+    return merge_questions([results[i] for i in sorted(results)], num_questions)
+
+
+class EndlessQuestionSource:
+    """Izvor pitanja za beskonačni kviz: svaka serija se generira iz sljedećeg dijela teksta.
+
+    make_segments() vraća dijelove teksta redom kojim se koriste (npr. retrieval
+    bira sljedeće najinformativnije komade koji još nisu korišteni). Kada se
+    dijelovi potroše, kreće se ispočetka s fresh=True (nova pitanja za isti
+    tekst), najviše max_rounds puta; nakon toga je izvor iscrpljen. Pitanja
+    koja su (skoro) ista kao već postavljena se preskaču. Istovremeno se
+    generira najviše jedna serija, a zahtjevi idu kroz zajednički klijent, pa
+    prefetch poštuje ograničenja Gemini API-ja.
+    """
+
+    def __init__(self, make_segments, batch_size, cache=None, fresh=False, max_rounds=ENDLESS_MAX_ROUNDS):
+        self.make_segments = make_segments
+        self.batch_size = batch_size
+        self.cache = cache
+        self.fresh = fresh
+        self.max_rounds = max_rounds
+        self.low_water = ENDLESS_LOW_WATER or max(1, batch_size // 2)
+        self.round = 0
+        self.batches = 0
+        self.exhausted = False
+        self._segments = iter(make_segments())
+        self._asked = QuestionMerger()
+        self._lock = threading.Lock()
+
+    def _next_segment(self):
+        while True:
+            segment = next(self._segments, None)
+            if segment is not None:
+                return segment
+            self.round += 1
+            if self.round >= self.max_rounds:
+                return None
+            self._segments = iter(self.make_segments())
+
+    @tracing.traced('ai.endless_batch')
+    def next_batch(self, on_question=None, on_stage=None, check_cancelled=None):
+        """Generira sljedeću seriju novih pitanja; prazna lista znači da je izvor iscrpljen.
+
+        Pitanje se bilježi kao postavljeno tek nakon što ga on_question preuzme.
+        check_cancelled() se provjerava prije svakog dijela teksta i zahtjeva.
+        """
+        with self._lock:
+            while not self.exhausted:
+                if check_cancelled:
+                    check_cancelled()
+                segment = self._next_segment()
+                if segment is None:
+                    self.exhausted = True
+                    break
+                accepted = []
+
+                def deliver(question):
+                    if on_question:
+                        on_question(question)
+                    accepted.append(question)
+
+                def forward(question):
+                    self._asked.add(question, on_accept=deliver)
+
+                generate_questions_chunked(segment, self.batch_size, on_stage=on_stage, cache=self.cache,
+                                           fresh=self.fresh or self.round > 0, on_question=forward,
+                                           check_cancelled=check_cancelled)
+                self.batches += 1
+                if accepted:
+                    return accepted
+            return []
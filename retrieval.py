@@ -0,0 +1,310 @@
+"""Lokalni odabir najkorisnijih dijelova PDF-a prije slanja AI-u (TF-IDF / BM25).
+
+Očišćene stranice se dijele na komade od ~CHUNK_TOKENS tokena i indeksiraju
+(rijetka matrica komad x termin u NumPy nizovima, BM25 težine). Odabir je
+pohlepan: u svakom koraku se uzima komad s najviše još nepokrivenih rijetkih
+termina po tokenu, pa se termini koje je već pokrio manje računaju. Tako
+tekst za prompt ostaje raznolik i pokriva cijeli raspon stranica, a filler
+(ponavljanja, sadržaj, prazni slajdovi) otpada prvi. Uz temu (npr.
+"fotosinteza") prednost dobijaju komadi koji je spominju.
+
+Indeks se kešira po dokumentu (hash fajla + raspon stranica) u
+'cache/retrieval.sqlite3'. Bez NumPy-a select_passages() nije dostupan, a
+kviz koristi samo skraćivanje iz text_prep.
+"""
+import base64
+import io
+import os
+import re
+
+from disk_cache import DiskCache
+from text_prep import CHARS_PER_TOKEN, TOKEN_BUDGET, estimate_tokens
+
+# NumPy se uvozi tek u available(): main.py uvozi ovaj modul pri pokretanju.
+numpy = None
+_numpy_missing = False
+
+# Mijenja se kada se promijeni dijeljenje na komade ili tokenizacija.
+RETRIEVAL_VERSION = 1
+CHUNK_TOKENS = 300
+# Koliko teksta po traženom pitanju se šalje AI-u (uz donju granicu za male kvizove).
+TOKENS_PER_QUESTION = int(os.getenv("QUIZ_TOKENS_PER_QUESTION", "1200"))
+MIN_CONTEXT_TOKENS = 4000
+
+INDEX_CACHE_PATH = os.path.join('cache', 'retrieval.sqlite3')
+INDEX_CACHE_MAX_MB = int(os.getenv("RETRIEVAL_CACHE_MAX_MB", "50"))
+
+# BM25 parametri.
+K1 = 1.2
+B = 0.75
+# Termin koji je već pokriven odabranim komadom vrijedi još samo ovoliko.
+COVERED_WEIGHT = 0.3
+# Komadi bez teme zadržavaju ovoliki dio vrijednosti (da tema ne isključi sve ostalo).
+TOPIC_FLOOR = 0.05
+
+_TOKEN_RE = re.compile(r'\w+')
+_FOLD = str.maketrans('čćžšđ', 'cczsd')
+
+
+def available():
+    """True ako je NumPy instaliran; pri prvom pozivu ga uvozi."""
+    global numpy, _numpy_missing
+    if numpy is None and not _numpy_missing:
+        try:
+            import numpy
+        except ImportError:
+            _numpy_missing = True
+    return numpy is not None
+
+
+def context_budget(num_questions):
+    """Budžet tokena za tekst kviza s datim brojem pitanja."""
+    return min(TOKEN_BUDGET, max(MIN_CONTEXT_TOKENS, num_questions * TOKENS_PER_QUESTION))
+
+
+def tokenize(text):
+    """Termini za indeks: mala slova bez dijakritika, bez jednoslovnih riječi i brojeva."""
+    return [word for word in _TOKEN_RE.findall(text.lower().translate(_FOLD))
+            if len(word) > 1 and not word.isdigit()]
+
+
+def split_chunks(pages, chunk_tokens=CHUNK_TOKENS):
+    """Dijeli stranice na komade od najviše ~chunk_tokens tokena, po granicama redova.
+
+    Komad ne prelazi granicu stranice, a predugi red se siječe na razmaku.
+    """
+    max_chars = chunk_tokens * CHARS_PER_TOKEN
+    chunks = []
+    for page in pages:
+        current = []
+        size = 0
+        for line in page.splitlines():
+            while len(line) > max_chars:
+                cut = line.rfind(' ', 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                if current:
+                    chunks.append('\n'.join(current))
+                    current, size = [], 0
+                chunks.append(line[:cut])
+                line = line[cut:].lstrip()
+            if size + len(line) > max_chars and current:
+                chunks.append('\n'.join(current))
+                current, size = [], 0
+            current.append(line)
+            size += len(line) + 1
+        text = '\n'.join(current).strip()
+        if text:
+            chunks.append(text)
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+
+class ChunkIndex:
+    """BM25 indeks komada jednog dokumenta.
+
+    Matrica je u CSR obliku: za komad i, termini su term_ids[ptr[i]:ptr[i+1]],
+    a BM25 težine (idf * zasićeni tf) su weights[ptr[i]:ptr[i+1]].
+    """
+
+    def __init__(self, chunks, vocab, ptr, term_ids, weights, tokens):
+        self.chunks = chunks
+        self.vocab = vocab
+        self._term_lookup = None
+        self.ptr = ptr
+        self.term_ids = term_ids
+        self.weights = weights
+        self.tokens = tokens
+        self.chunk_ids = numpy.repeat(numpy.arange(len(chunks)), numpy.diff(ptr))
+
+    @classmethod
+    def build(cls, chunks):
+        vocab = {}
+        rows = []
+        lengths = []
+        for chunk in chunks:
+            counts = {}
+            words = tokenize(chunk)
+            for word in words:
+                term = vocab.setdefault(word, len(vocab))
+                counts[term] = counts.get(term, 0) + 1
+            rows.append(counts)
+            lengths.append(len(words))
+
+        n = len(chunks)
+        ptr = numpy.zeros(n + 1, dtype=numpy.int64)
+        ptr[1:] = numpy.cumsum([len(counts) for counts in rows])
+        term_ids = numpy.fromiter((t for counts in rows for t in counts), dtype=numpy.int32, count=int(ptr[-1]))
+        tf = numpy.fromiter((c for counts in rows for c in counts.values()), dtype=numpy.float64, count=int(ptr[-1]))
+
+        df = numpy.bincount(term_ids, minlength=len(vocab))
+        idf = numpy.log((n - df + 0.5) / (df + 0.5) + 1.0)
+        lengths = numpy.asarray(lengths, dtype=numpy.float64)
+        avg_length = lengths.mean() if n else 1.0
+        norm = numpy.repeat(K1 * (1 - B + B * lengths / max(avg_length, 1.0)), numpy.diff(ptr))
+        weights = idf[term_ids] * tf * (K1 + 1) / (tf + norm)
+
+        tokens = numpy.array([estimate_tokens(chunk) for chunk in chunks], dtype=numpy.int64)
+        terms = sorted(vocab, key=vocab.get)
+        return cls(chunks, terms, ptr, term_ids, weights, tokens)
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        numpy.savez_compressed(buffer, chunks=numpy.array(self.chunks, dtype=str),
+                               vocab=numpy.array(self.vocab, dtype=str), ptr=self.ptr,
+                               term_ids=self.term_ids, weights=self.weights, tokens=self.tokens)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        with numpy.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            return cls(arrays['chunks'].tolist(), arrays['vocab'].tolist(), arrays['ptr'],
+                       arrays['term_ids'], arrays['weights'], arrays['tokens'])
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def topic_scores(self, topic):
+        """BM25 rezultat svakog komada za upit; niz nula ako nijedan termin upita nije u dokumentu."""
+        if self._term_lookup is None:
+            self._term_lookup = {term: i for i, term in enumerate(self.vocab)}
+        query = {self._term_lookup[word] for word in tokenize(topic) if word in self._term_lookup}
+        scores = numpy.zeros(len(self.chunks))
+        if query:
+            mask = numpy.isin(self.term_ids, list(query))
+            scores = numpy.bincount(self.chunk_ids[mask], weights=self.weights[mask], minlength=len(self.chunks))
+        return scores
+
+    def select(self, budget_tokens, topic=None, exclude=()):
+        """Indeksi odabranih komada (redom dokumenta) i da li je tema pronađena.
+
+        Komadi iz exclude (npr. već iskorišteni u beskonačnom kvizu) se ne biraju.
+        """
+        n = len(self.chunks)
+        boost = numpy.ones(n)
+        topic_found = False
+        if topic:
+            scores = self.topic_scores(topic)
+            if scores.max(initial=0) > 0:
+                topic_found = True
+                boost = TOPIC_FLOOR + scores / scores.max()
+        elif not exclude and int(self.tokens.sum()) <= budget_tokens:
+            return list(range(n)), topic_found
+
+        term_factor = numpy.ones(len(self.vocab))
+        available = numpy.ones(n, dtype=bool)
+        if exclude:
+            available[list(exclude)] = False
+        selected = []
+        remaining = budget_tokens
+        while remaining > 0:
+            available &= self.tokens <= remaining
+            if not available.any():
+                break
+            gains = numpy.bincount(self.chunk_ids, weights=self.weights * term_factor[self.term_ids], minlength=n)
+            density = numpy.where(available, gains * boost / self.tokens, -1.0)
+            best = int(density.argmax())
+            if density[best] <= 0:
+                break
+            selected.append(best)
+            available[best] = False
+            remaining -= int(self.tokens[best])
+            term_factor[self.term_ids[self.ptr[best]:self.ptr[best + 1]]] *= COVERED_WEIGHT
+        return sorted(selected), topic_found
+
+
+class IndexCache:
+    """Keš indeksa po dokumentu; ključ uključuje verziju, pa izmjene ne čitaju stare indekse."""
+
+    def __init__(self, path=INDEX_CACHE_PATH, max_bytes=INDEX_CACHE_MAX_MB * 1024 * 1024):
+        self.store = DiskCache(path, max_bytes)
+
+    @staticmethod
+    def _key(doc_key):
+        return f"{doc_key}:{RETRIEVAL_VERSION}:{CHUNK_TOKENS}"
+
+    def get(self, doc_key):
+        value = self.store.get(self._key(doc_key))
+        if value is None:
+            return None
+        try:
+            return ChunkIndex.from_bytes(base64.b64decode(value))
+        except (ValueError, KeyError, OSError):
+            return None
+
+    def put(self, doc_key, index):
+        self.store.put(self._key(doc_key), base64.b64encode(index.to_bytes()).decode('ascii'))
+
+
+class Selection:
+    """Rezultat odabira: tekst za prompt i koliko je komada/tokena izostavljeno."""
+
+    def __init__(self, text, chunks_total, chunks_selected, tokens_before, topic=None, topic_found=False):
+        self.text = text
+        self.chunks_total = chunks_total
+        self.chunks_selected = chunks_selected
+        self.tokens_before = tokens_before
+        self.tokens_after = estimate_tokens(text) if text else 0
+        self.topic = topic
+        self.topic_found = topic_found
+
+    def summary(self):
+        share = 1 - self.tokens_after / self.tokens_before if self.tokens_before else 0
+        message = (f"Odabrano {self.chunks_selected} od {self.chunks_total} dijelova teksta "
+                   f"(~{self.tokens_after} tokena, {share:.0%} manje)")
+        if self.topic:
+            message += f", tema '{self.topic}'" + ("" if self.topic_found else " nije pronađena")
+        return message
+
+
+def get_index(pages, cache=None, doc_key=None):
+    """Vraća indeks komada za stranice; iz keša ako je dokument već indeksiran."""
+    if not available():
+        raise RuntimeError("Odabir dijelova teksta zahtijeva NumPy (pip install numpy).")
+    if cache is not None and doc_key:
+        index = cache.get(doc_key)
+        if index is not None:
+            return index
+    index = ChunkIndex.build(split_chunks(pages))
+    if cache is not None and doc_key:
+        cache.put(doc_key, index)
+    return index
+
+
+def _join(index, chosen):
+    """Spaja odabrane komade redom dokumenta; izostavljeni dijelovi su označeni s "[...]"."""
+    parts = []
+    previous = -1
+    for i in chosen:
+        if i != previous + 1:
+            parts.append('[...]')
+        parts.append(index.chunks[i])
+        previous = i
+    return '\n\n'.join(parts)
+
+
+def iter_passages(index, budget_tokens, topic=None):
+    """Generator uzastopnih odabira bez ponavljanja komada (za beskonačni kviz).
+
+    Prvi odabir je isti kao u select_passages, a svaki sljedeći bira najbolje
+    od preostalih komada, dok se ne potroši cijeli dokument.
+    """
+    used = set()
+    while len(used) < len(index):
+        chosen, _ = index.select(budget_tokens, topic, exclude=used)
+        if not chosen:
+            return
+        used.update(chosen)
+        yield _join(index, chosen)
+
+
+def select_passages(pages, budget_tokens, topic=None, cache=None, doc_key=None):
+    """Bira najinformativnije komade očišćenih stranica do budžeta tokena.
+
+    doc_key (npr. hash PDF-a i raspon stranica) omogućava keširanje indeksa.
+    Tekst zadržava redoslijed dokumenta; izostavljeni dijelovi su označeni s "[...]".
+    """
+    topic = (topic or '').strip() or None
+    index = get_index(pages, cache, doc_key)
+    if not len(index):
+        return Selection('', 0, 0, 0, topic)
+    chosen, topic_found = index.select(budget_tokens, topic)
+    return Selection(_join(index, chosen), len(index), len(chosen), int(index.tokens.sum()), topic, topic_found)
@@ -0,0 +1,196 @@
+import heapq
+import json
+import os
+import random
+import time
+
+from card_store import atomic_write_bytes, file_lock
+from tracing import traced
+
+DAY = 24 * 3600
+# Kartica na koju korisnik nije znao odgovor vraća se nakon kratkog ponovnog učenja.
+RELEARN_DELAY = 10 * 60
+MIN_EASE = 1.3
+START_EASE = 2.5
+
+GRADE_CORRECT = 4
+GRADE_INCORRECT = 1
+
+# Log se kompaktira (jedan zapis stanja po kartici) kada ima više od ovoliko
+# linija i više od COMPACT_RATIO puta više linija nego ocijenjenih kartica.
+COMPACT_MIN_LINES = 1000
+COMPACT_RATIO = 2
+
+
+class CardState:
+    """SM-2 stanje jedne kartice."""
+
+    __slots__ = ('due', 'interval', 'ease', 'reps', 'lapses')
+    FIELDS = __slots__
+
+    def __init__(self):
+        self.due = 0.0
+        self.interval = 0.0
+        self.ease = START_EASE
+        self.reps = 0
+        self.lapses = 0
+
+    def apply(self, grade, reviewed_at):
+        """Primjenjuje ocjenu (0-5) po SM-2 algoritmu i računa novi rok."""
+        if grade < 3:
+            self.reps = 0
+            self.lapses += 1
+            self.interval = 0.0
+            self.due = reviewed_at + RELEARN_DELAY
+        else:
+            if self.reps == 0:
+                self.interval = 1.0
+            elif self.reps == 1:
+                self.interval = 6.0
+            else:
+                self.interval *= self.ease
+            self.reps += 1
+            self.due = reviewed_at + self.interval * DAY
+        self.ease = max(MIN_EASE, self.ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+
+
+class Scheduler:
+    """Raspored ponavljanja kartica s prioritetnim redom po roku.
+
+    Svaka ocjena se dopisuje u kompaktan log ('[id, vrijeme, ocjena]' po liniji),
+    a stanje se pri učitavanju rekonstruiše ponavljanjem loga. Kada log
+    naraste, load() ga atomski prepisuje u po jedan zapis stanja po kartici
+    ({"id": ..., "due": ..., ...}). Heap sadrži (rok, slučajan broj, id):
+    kartice s istim rokom (npr. sve nove) izlaze izmiješane, a ne redom id-ova.
+    Zastarjeli unosi (kartica je u međuvremenu ponovo ocijenjena) se preskaču
+    pri skidanju s heapa.
+    """
+
+    def __init__(self, log_path):
+        self.log_path = log_path
+        self.lock_path = log_path + '.lock'
+        self.states = {}
+        self._heap = []
+
+    def _replay(self, card_ids):
+        """Čita log i vraća (stanja, broj zapisa, kraj ispravnog dijela, da li je kraj nedovršen)."""
+        states = {card_id: CardState() for card_id in card_ids}
+        valid_end = 0
+        line_count = 0
+        torn_tail = False
+        try:
+            with open(self.log_path, 'rb') as f:
+                for raw in f:
+                    if not raw.endswith(b'\n'):
+                        # Nedovršen zapis nakon pada programa.
+                        torn_tail = True
+                        break
+                    valid_end += len(raw)
+                    try:
+                        record = json.loads(raw)
+                        if isinstance(record, dict):
+                            state = states.get(record['id'])
+                            if state is not None:
+                                for field in CardState.FIELDS:
+                                    setattr(state, field, record[field])
+                        else:
+                            card_id, reviewed_at, grade = record
+                            state = states.get(card_id)
+                            if state is not None:
+                                state.apply(grade, reviewed_at)
+                    except (ValueError, TypeError, KeyError):
+                        continue
+                    line_count += 1
+        except FileNotFoundError:
+            pass
+        return states, line_count, valid_end, torn_tail
+
+    @traced('scheduler.load')
+    def load(self, card_ids):
+        """Učitava log ocjena i gradi red za date kartice (nove su odmah na redu)."""
+        card_ids = list(card_ids)
+        states, line_count, valid_end, torn_tail = self._replay(card_ids)
+        if torn_tail:
+            with file_lock(self.lock_path):
+                states, line_count, valid_end, torn_tail = self._replay(card_ids)
+                if torn_tail:
+                    with open(self.log_path, 'r+b') as f:
+                        f.truncate(valid_end)
+
+        reviewed = sum(1 for state in states.values() if state.reps or state.lapses)
+        if line_count > max(COMPACT_MIN_LINES, COMPACT_RATIO * reviewed):
+            states = self.compact(card_ids)
+
+        self.states = states
+        self._heap = [(state.due, random.random(), card_id) for card_id, state in states.items()]
+        heapq.heapify(self._heap)
+
+    @traced('scheduler.compact')
+    def compact(self, card_ids):
+        """Prepisuje log u po jedan zapis stanja za svaku ocijenjenu karticu; vraća stanja.
+
+        Zapisi za kartice kojih više nema u špilu otpadaju.
+        """
+        with file_lock(self.lock_path):
+            # Čita se ponovo pod zaključavanjem, da se ne izgube ocjene druge instance.
+            states = self._replay(card_ids)[0]
+            lines = []
+            for card_id, state in states.items():
+                if state.reps or state.lapses:
+                    record = {"id": card_id}
+                    record.update((field, getattr(state, field)) for field in CardState.FIELDS)
+                    lines.append(json.dumps(record) + '\n')
+            atomic_write_bytes(self.log_path, ''.join(lines).encode('utf-8'))
+        return states
+
+    def add_card(self, card_id):
+        """Dodaje novu karticu u red (odmah je na redu)."""
+        state = self.states[card_id] = CardState()
+        heapq.heappush(self._heap, (state.due, random.random(), card_id))
+
+    def due_cards(self, limit, now=None):
+        """Vraća do limit id-ova kartica kojima je istekao rok, najhitnije prvo (O(k log n)).
+
+        Uz now=math.inf vraća limit kartica najbližih roku, i one kojima rok još
+        nije istekao (vježba izvan rasporeda).
+        """
+        now = time.time() if now is None else now
+        taken = []
+        while self._heap and len(taken) < limit:
+            due, _, card_id = self._heap[0]
+            state = self.states.get(card_id)
+            if state is None or state.due != due:
+                heapq.heappop(self._heap)
+                continue
+            if due > now:
+                break
+            taken.append(heapq.heappop(self._heap))
+        # Kartice ostaju u redu dok ne dobiju ocjenu.
+        for entry in taken:
+            heapq.heappush(self._heap, entry)
+        return [card_id for _, _, card_id in taken]
+
+    def next_due(self):
+        """Vraća vrijeme najranijeg roka ili None ako nema kartica."""
+        while self._heap:
+            due, _, card_id = self._heap[0]
+            state = self.states.get(card_id)
+            if state is not None and state.due == due:
+                return due
+            heapq.heappop(self._heap)
+        return None
+
+    @traced('scheduler.review')
+    def review(self, card_id, grade, now=None):
+        """Bilježi ocjenu kartice, dopisuje je u log i pomjera karticu u redu."""
+        reviewed_at = round(time.time() if now is None else now)
+        state = self.states.get(card_id)
+        if state is None:
+            state = self.states[card_id] = CardState()
+        state.apply(grade, reviewed_at)
+        heapq.heappush(self._heap, (state.due, random.random(), card_id))
+
+        with file_lock(self.lock_path), open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps([card_id, reviewed_at, grade]) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
@@ -0,0 +1,114 @@
+import re
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+_TOKEN_RE = re.compile(r'\w+')
+GRAM = 3
+# Termini kraći od GRAM traže se kao početak riječi (sortirani rječnik + bisect).
+MIN_TERM = 1
+
+# Težine pogodaka: cijela riječ u naslovu, dio riječi u naslovu, pa isto za odgovor.
+TITLE_WORD, TITLE_PART, ANSWER_WORD, ANSWER_PART = 3.0, 2.0, 1.0, 0.5
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _grams(word):
+    return {word[i:i + GRAM] for i in range(len(word) - GRAM + 1)}
+
+
+class SearchIndex:
+    """Indeks za pretragu kartica po naslovu i odgovoru.
+
+    Invertovani indeks (riječ -> id kartica) pokriva cijele riječi, a trigram
+    indeks nad rječnikom riječi omogućava pretragu po dijelu riječi bez
+    prolaska kroz sve kartice. Termini kraći od trigrama traže se binarnom
+    pretragom u sortiranom rječniku (riječi koje počinju terminom). Kartice (card_store.Card) se identificiraju po id-u, pa se
+    kartice s istim naslovom ne gube.
+    """
+
+    def __init__(self, cards=()):
+        self._order = []
+        self._title_postings = {}
+        self._answer_postings = {}
+        self._vocab_grams = defaultdict(set)
+        self._vocab = set()
+        self._sorted_vocab = None
+        for card in cards:
+            self.add(card)
+        # Sortirani rječnik za kratke termine; add() ga dalje održava s insort.
+        self._sorted_vocab = sorted(self._vocab)
+
+    def __len__(self):
+        return len(self._order)
+
+    def add(self, card):
+        """Dodaje karticu u indeks (inkrementalno, bez ponovne izgradnje)."""
+        card_id = card.id
+        self._order.append(card_id)
+        title_words = set(tokenize(card.naslov))
+        answer_words = set(tokenize(card.puni_odgovor))
+        for postings, words in ((self._title_postings, title_words), (self._answer_postings, answer_words)):
+            for word in words:
+                ids = postings.get(word)
+                if ids is None:
+                    postings[word] = [card_id]
+                else:
+                    ids.append(card_id)
+        new_words = (title_words | answer_words) - self._vocab
+        if new_words:
+            self._vocab |= new_words
+            vocab_grams = self._vocab_grams
+            for word in new_words:
+                for gram in _grams(word):
+                    vocab_grams[gram].add(word)
+                if self._sorted_vocab is not None:
+                    insort(self._sorted_vocab, word)
+
+    def _matching_words(self, term):
+        """Vraća riječi iz rječnika koje sadrže term (kratki termini: riječi koje njime počinju)."""
+        if len(term) < GRAM:
+            words = self._sorted_vocab
+            return words[bisect_left(words, term):bisect_left(words, term + '\U0010ffff')]
+        grams = sorted(_grams(term), key=lambda g: len(self._vocab_grams.get(g, ())))
+        candidates = self._vocab_grams.get(grams[0], set())
+        for gram in grams[1:]:
+            if not candidates:
+                break
+            candidates = candidates & self._vocab_grams.get(gram, set())
+        return [word for word in candidates if term in word]
+
+    def search(self, query, limit=None):
+        """Vraća id-ove kartica koje sadrže sve riječi upita, rangirane po relevantnosti.
+
+        Prazan upit vraća sve kartice redom kojim su dodane.
+        """
+        terms = [term for term in tokenize(query) if len(term) >= MIN_TERM]
+        if not terms:
+            return self._order[:limit] if limit else list(self._order)
+
+        scores = None
+        for term in terms:
+            term_scores = {}
+            for word in self._matching_words(term):
+                exact = word == term
+                title_weight = TITLE_WORD if exact else TITLE_PART
+                answer_weight = ANSWER_WORD if exact else ANSWER_PART
+                for card_id in self._title_postings.get(word, ()):
+                    if term_scores.get(card_id, 0) < title_weight:
+                        term_scores[card_id] = title_weight
+                for card_id in self._answer_postings.get(word, ()):
+                    if term_scores.get(card_id, 0) < answer_weight:
+                        term_scores[card_id] = answer_weight
+
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {cid: s + term_scores[cid] for cid, s in scores.items() if cid in term_scores}
+            if not scores:
+                return []
+
+        ranked = sorted(scores, key=lambda cid: (-scores[cid], cid))
+        return ranked[:limit] if limit else ranked
@@ -0,0 +1,119 @@
+"""Katalog predmeta u 'data/' mapi, keširan u malom manifestu.
+
+Manifest ('data/.catalog.json') za svaki špil čuva broj kartica, veličinu i
+vrijeme izmjene. refresh() pregleda mapu jednim os.scandir (bez otvaranja
+fajlova) i ponovo broji kartice samo za špilove čija se veličina ili mtime
+promijenila (JSONL se broji iz '.idx' indeksa i novog kraja loga, bez
+ikakvog pisanja). Manifest se zapisuje atomski i pod zaključavanjem fajla, pa više
+instanci programa može dijeliti istu 'data/' mapu.
+"""
+import json
+import os
+
+from card_store import CardStore, atomic_write_bytes, file_lock, migrate_json_decks
+from deck_binary import HEADER, MAGIC
+
+MANIFEST_NAME = '.catalog.json'
+LOCK_NAME = '.catalog.lock'
+MANIFEST_VERSION = 1
+# JSONL log je običan (izmjenjiv) predmet, a .deck binarni špil samo za čitanje.
+SUBJECT_EXTENSIONS = ('.jsonl', '.deck')
+
+
+def count_cards(path):
+    """Broj kartica u špilu; za .deck se čita samo zaglavlje."""
+    if path.endswith('.deck'):
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return 0
+        magic, _, count = HEADER.unpack(header)
+        return count if magic == MAGIC else 0
+    return CardStore(path).count_live()
+
+
+class SubjectCatalog:
+    """Keširani popis predmeta: {fajl: {name, cards, size, mtime_ns}}."""
+
+    def __init__(self, data_dir='data'):
+        self.data_dir = data_dir
+        self.manifest_path = os.path.join(data_dir, MANIFEST_NAME)
+        self.lock_path = os.path.join(data_dir, LOCK_NAME)
+        self.entries = {}
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        if manifest.get('version') != MANIFEST_VERSION:
+            return {}
+        return manifest.get('subjects', {})
+
+    def _scan(self):
+        """Vraća {fajl: (veličina, mtime_ns)} za špilove u mapi; stare .json prvo migrira."""
+        try:
+            found = list(os.scandir(self.data_dir))
+        except FileNotFoundError:
+            return {}
+        if any(entry.name.endswith('.json') and not entry.name.startswith('.') for entry in found):
+            migrate_json_decks(self.data_dir)
+            found = list(os.scandir(self.data_dir))
+        files = {}
+        for entry in found:
+            if entry.name.endswith(SUBJECT_EXTENSIONS) and entry.is_file():
+                st = entry.stat()
+                files[entry.name] = (st.st_size, st.st_mtime_ns)
+        return files
+
+    def load(self):
+        """Učitava zadnji zapisani manifest bez pregleda mape (za brzi prvi prikaz)."""
+        if not self.entries:
+            self.entries = self._read_manifest()
+        return self.entries
+
+    def refresh(self):
+        """Usklađuje katalog s mapom; vraća True ako se nešto promijenilo.
+
+        Čita fajlove koji su se promijenili, pa se u GUI-ju poziva iz pozadinskog posla.
+        """
+        files = self._scan()
+        self.load()
+
+        stale = [name for name, stat in files.items()
+                 if (self.entries.get(name, {}).get('size'), self.entries.get(name, {}).get('mtime_ns')) != stat]
+        removed = [name for name in self.entries if name not in files]
+        if not stale and not removed:
+            return False
+
+        os.makedirs(self.data_dir, exist_ok=True)
+        with file_lock(self.lock_path):
+            # Druga instanca je možda već prebrojala iste fajlove.
+            shared = self._read_manifest()
+            entries = {name: entry for name, entry in self.entries.items() if name in files}
+            for name in stale:
+                size, mtime_ns = files[name]
+                entry = shared.get(name)
+                if entry is None or (entry.get('size'), entry.get('mtime_ns')) != (size, mtime_ns):
+                    path = os.path.join(self.data_dir, name)
+                    try:
+                        cards = count_cards(path)
+                    except (OSError, ValueError):
+                        cards = 0
+                    entry = {"cards": cards, "size": size, "mtime_ns": mtime_ns}
+                entry["name"] = os.path.splitext(name)[0].capitalize()
+                entries[name] = entry
+            self.entries = entries
+            manifest = {"version": MANIFEST_VERSION, "subjects": entries}
+            atomic_write_bytes(self.manifest_path,
+                               json.dumps(manifest, ensure_ascii=False, indent=1).encode('utf-8'))
+        return True
+
+    def subjects(self):
+        """Lista (naziv, fajl) sortirana po nazivu."""
+        return sorted(((entry['name'], name) for name, entry in self.entries.items()),
+                      key=lambda item: item[0].lower())
+
+    def get(self, filename):
+        return self.entries.get(filename)
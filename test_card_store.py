@@ -0,0 +1,133 @@
+"""Testovi oporavka CardStore loga nakon pada programa (python -m pytest ili python -m unittest)."""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from card_store import CardStore, atomic_write_bytes, migrate_json_decks
+
+
+class CardStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'biologija.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def reopen(self):
+        store = CardStore(self.path)
+        store.load()
+        return store
+
+    def read_log(self):
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def test_torn_tail_is_truncated(self):
+        store = CardStore(self.path)
+        store.add_many([("Mitoza", "Dioba somatskih ćelija."), ("Mejoza", "Redukciona dioba.")])
+        complete = self.read_log()
+        with open(self.path, 'ab') as f:
+            f.write(b'{"id": 3, "naslov": "Nedovr')
+
+        store = CardStore(self.path)
+        self.assertEqual([card.naslov for card in store.load()], ["Mitoza", "Mejoza"])
+        self.assertEqual(self.read_log(), complete)
+
+        card = store.add("Ribosom", "Mjesto sinteze proteina.")
+        self.assertEqual(card.id, 3)
+        self.assertEqual(self.reopen().get_answer(3), "Mjesto sinteze proteina.")
+
+    def test_peek_does_not_write(self):
+        CardStore(self.path).add_many([("Mitoza", "a"), ("Mejoza", "b")])
+        with open(self.path, 'ab') as f:
+            f.write(b'{"id": 3, "naslov": "Nedovr')
+        before = self.read_log()
+
+        cards = CardStore(self.path).peek()
+        self.assertEqual([card.naslov for card in cards], ["Mitoza", "Mejoza"])
+        self.assertEqual(self.read_log(), before)
+        self.assertFalse(os.path.exists(self.path + '.idx'))
+        self.assertEqual([answer for _, answer in CardStore(self.path).iter_answers(cards)], ["a", "b"])
+
+    def test_compaction_keeps_live_cards(self):
+        store = CardStore(self.path)
+        first, second, third = store.add_many([("A", "a1"), ("B", "b1"), ("C", "c1")])
+        store.update(first.id, puni_odgovor="a2")
+        store.delete(second.id)
+        store.compact()
+
+        lines = self.read_log().decode('utf-8').splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [first.id, third.id])
+        self.assertEqual([name for name in os.listdir(self.dir) if name.startswith('.tmp-')], [])
+        reopened = CardStore(self.path)
+        self.assertEqual([card.naslov for card in reopened.load()], ["A", "C"])
+        self.assertEqual(reopened.get_answer(first.id), "a2")
+        self.assertEqual(reopened.get_answer(third.id), "c1")
+
+    def test_failed_compaction_leaves_log_intact(self):
+        store = CardStore(self.path)
+        card = store.add("A", "a1")
+        store.update(card.id, puni_odgovor="a2")
+        before = self.read_log()
+        offset = card.offset
+
+        with mock.patch('card_store.os.replace', side_effect=OSError("disk pun")):
+            with self.assertRaises(OSError):
+                store.compact()
+
+        self.assertEqual(self.read_log(), before)
+        self.assertEqual(card.offset, offset)
+        self.assertEqual(store.add("B", "b").id, card.id + 1)
+        self.assertEqual([name for name in os.listdir(self.dir) if name.startswith('.tmp-')], [])
+        self.assertEqual(self.reopen().get_answer(card.id), "a2")
+
+    def test_index_ignored_after_rewrite(self):
+        CardStore(self.path).add_many([("A", "a"), ("B", "b")])
+        CardStore(self.path).load()
+        self.assertTrue(os.path.exists(self.path + '.idx'))
+
+        # Novi fajl (drugi inode), npr. vraćen iz sigurnosne kopije.
+        atomic_write_bytes(self.path, b'{"id": 7, "naslov": "X", "puni_odgovor": "x"}\n')
+        store = CardStore(self.path)
+        self.assertEqual([card.naslov for card in store.load()], ["X"])
+        self.assertEqual(store.get_answer(7), "x")
+
+    def test_index_ignored_when_log_shrinks(self):
+        store = CardStore(self.path)
+        store.add_many([("A", "a"), ("B", "b")])
+        CardStore(self.path).load()
+        first_line = self.read_log().split(b'\n')[0] + b'\n'
+
+        # Isti inode, ali kraći log nego što indeks pokriva.
+        with open(self.path, 'r+b') as f:
+            f.truncate(len(first_line))
+        store = CardStore(self.path)
+        self.assertEqual([card.naslov for card in store.load()], ["A"])
+        self.assertEqual(store.add("C", "c").id, 2)
+
+    def test_json_deck_migration(self):
+        json_path = os.path.join(self.dir, 'biologija.json')
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump([{"naslov": "Mitoza", "puni_odgovor": "Dioba."}, {"naslov": "Gen"}], f)
+        manifest = os.path.join(self.dir, '.catalog.json')
+        with open(manifest, 'w', encoding='utf-8') as f:
+            f.write('{}')
+
+        migrate_json_decks(self.dir)
+
+        self.assertFalse(os.path.exists(json_path))
+        self.assertTrue(os.path.exists(json_path + '.bak'))
+        self.assertTrue(os.path.exists(manifest))
+        store = CardStore(self.path)
+        self.assertEqual([card.naslov for card in store.load()], ["Mitoza", "Gen"])
+        self.assertEqual(store.get_answer(1), "Dioba.")
+        self.assertEqual(store.get_answer(2), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
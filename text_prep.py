@@ -0,0 +1,140 @@
+"""Priprema teksta iz PDF-a prije slanja AI-u, da se ne troše tokeni na smeće.
+
+Uklanja zaglavlja i podnožja koja se ponavljaju na stranicama, brojeve
+stranica, prelome riječi na kraju reda (crtica) i višak razmaka. Ako je tekst
+i dalje veći od budžeta tokena, svaka stranica se skraćuje proporcionalno,
+pa kviz i dalje pokriva cijeli raspon stranica.
+"""
+import os
+import re
+from collections import Counter
+
+# Gruba procjena za latinični tekst; dovoljna za budžet i dijeljenje na komade.
+CHARS_PER_TOKEN = 4
+TOKEN_BUDGET = int(os.getenv("QUIZ_TOKEN_BUDGET", "60000"))
+
+# Zaglavlja i podnožja se traže samo među prvih/zadnjih EDGE_LINES redova stranice.
+EDGE_LINES = 3
+# Red je "ponavljajući" ako se (do na brojeve) javlja na barem ovolikom dijelu stranica.
+REPEAT_SHARE = 0.5
+MIN_PAGES_FOR_REPEATS = 3
+
+_PAGE_NUMBER_RE = re.compile(r'^\W*(str\.?|strana|stranica|page|p\.)?\s*\d+(\s*(/|od|of)\s*\d+)?\W*$', re.IGNORECASE)
+_DIGITS_RE = re.compile(r'\d+')
+_SPACES_RE = re.compile(r'[ \t\u00a0]+')
+_HYPHEN_BREAK_RE = re.compile(r'(\w)-\n(?=[a-zčćžšđ])')
+_BLANK_LINES_RE = re.compile(r'\n{3,}')
+
+
+def estimate_tokens(text):
+    """Procjenjuje broj tokena u tekstu."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _line_key(line):
+    """Ključ za poređenje redova: bez razlike u velikim slovima, brojevima i razmacima."""
+    return _SPACES_RE.sub(' ', _DIGITS_RE.sub('#', line.lower())).strip()
+
+
+def _edge_indices(lines):
+    """Indeksi prvih i zadnjih EDGE_LINES nepraznih redova (kratka stranica: samo prvi i zadnji)."""
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    edge = EDGE_LINES if len(filled) > 2 * EDGE_LINES else 1
+    return set(filled[:edge] + filled[-edge:])
+
+
+def find_repeated_lines(pages):
+    """Vraća ključeve redova koji se na rubovima stranica ponavljaju (zaglavlja, podnožja)."""
+    if len(pages) < MIN_PAGES_FOR_REPEATS:
+        return set()
+    counts = Counter()
+    for lines in pages:
+        counts.update({_line_key(lines[i]) for i in _edge_indices(lines)})
+    threshold = max(2, len(pages) * REPEAT_SHARE)
+    return {key for key, count in counts.items() if count >= threshold and key}
+
+
+def clean_page(lines, repeated):
+    """Uklanja ponavljajuće redove i brojeve stranica s rubova i normalizira razmake."""
+    edges = _edge_indices(lines)
+    drop = {i for i in edges if _line_key(lines[i]) in repeated or _PAGE_NUMBER_RE.match(lines[i].strip())}
+    if len(drop) == len(edges) and len(edges) == sum(1 for line in lines if line.strip()):
+        # Stranica bi ostala prazna; to nisu zaglavlja nego sadržaj (npr. kratki slajdovi).
+        drop = {i for i in drop if _PAGE_NUMBER_RE.match(lines[i].strip())}
+    kept = [_SPACES_RE.sub(' ', line).strip() for i, line in enumerate(lines) if i not in drop]
+    removed = len(drop)
+    text = '\n'.join(kept)
+    text = _HYPHEN_BREAK_RE.sub(r'\1', text)
+    return _BLANK_LINES_RE.sub('\n\n', text).strip(), removed
+
+
+def _trim(text, max_chars):
+    """Skraćuje tekst na max_chars, po mogućnosti na kraju reda ili rečenice."""
+    if len(text) <= max_chars:
+        return text
+    cut = max(text.rfind('\n', 0, max_chars), text.rfind('. ', 0, max_chars) + 1)
+    if cut < max_chars // 2:
+        cut = text.rfind(' ', 0, max_chars)
+    return text[:cut if cut > 0 else max_chars].rstrip()
+
+
+def fit_to_budget(pages, budget_tokens):
+    """Skraćuje svaku stranicu proporcionalno dok ukupan tekst ne stane u budžet."""
+    max_chars = budget_tokens * CHARS_PER_TOKEN
+    total = sum(len(page) for page in pages)
+    if total <= max_chars:
+        return pages
+    ratio = max_chars / total
+    return [_trim(page, int(len(page) * ratio)) for page in pages]
+
+
+class PreparedText:
+    """Rezultat pripreme: tekst (i očišćene stranice) i koliko je tokena ušteđeno."""
+
+    def __init__(self, text, tokens_before, removed_lines, trimmed, pages=()):
+        self.text = text
+        self.pages = list(pages)
+        self.tokens_before = tokens_before
+        self.tokens_after = estimate_tokens(text) if text else 0
+        self.removed_lines = removed_lines
+        self.trimmed = trimmed
+
+    @property
+    def tokens_saved(self):
+        return max(0, self.tokens_before - self.tokens_after)
+
+    def summary(self):
+        """Kratak opis za korisnika (npr. u prozoru napretka ili u konzoli)."""
+        share = self.tokens_saved / self.tokens_before if self.tokens_before else 0
+        message = (f"Tekst pripremljen: ~{self.tokens_after} tokena, ušteđeno ~{self.tokens_saved} "
+                   f"({share:.0%}; uklonjeno {self.removed_lines} redova zaglavlja/podnožja)")
+        if self.trimmed:
+            message += ", skraćeno na budžet"
+        return message
+
+
+def prepare_text(pages, budget_tokens=TOKEN_BUDGET):
+    """Čisti tekstove stranica i spaja ih u jedan tekst za prompt.
+
+    budget_tokens=0 (ili None) isključuje skraćivanje.
+    """
+    raw_text = "\n".join(pages)
+    split_pages = [page.splitlines() for page in pages]
+    repeated = find_repeated_lines(split_pages)
+
+    cleaned = []
+    removed_lines = 0
+    for lines in split_pages:
+        text, removed = clean_page(lines, repeated)
+        removed_lines += removed
+        if text:
+            cleaned.append(text)
+
+    trimmed = False
+    if budget_tokens:
+        fitted = fit_to_budget(cleaned, budget_tokens)
+        trimmed = fitted is not cleaned
+        cleaned = fitted
+
+    return PreparedText("\n\n".join(cleaned), estimate_tokens(raw_text) if raw_text else 0,
+                        removed_lines, trimmed, cleaned)
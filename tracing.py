@@ -0,0 +1,182 @@
+"""Lagano mjerenje trajanja operacija (spanovi) s izvozom u trace fajl.
+
+Kada je isključeno (zadano), span() vraća jedan dijeljeni prazan context
+manager, pa mjerenje košta samo jedan poziv funkcije. Uključuje se varijablom
+STUDY_TRACE (putanja trace fajla; "1" znači samo u memoriji) ili pozivom
+enable(). STUDY_TRACE_FORMAT=chrome piše Chrome trace format (otvara se u
+chrome://tracing ili Perfetto), inače se piše JSONL (jedan span po liniji).
+
+Primjer:
+    with tracing.span("pdf.extract", pages=40):
+        ...
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+RECENT_SPANS = 200
+# Koliko zadnjih trajanja po nazivu se čuva za percentile.
+SAMPLES_PER_NAME = 500
+
+_tracer = None
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    __slots__ = ('tracer', 'name', 'attrs', 'start', 'duration')
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.start = 0.0
+        self.duration = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.tracer.record(self)
+        return False
+
+    def set(self, **attrs):
+        """Dodaje atribute poznate tek tokom operacije (npr. broj pitanja)."""
+        self.attrs.update(attrs)
+
+
+class Tracer:
+    """Skuplja završene spanove u memoriji i (opcionalno) ih dopisuje u trace fajl."""
+
+    def __init__(self, path=None, fmt='jsonl'):
+        self.path = path
+        self.fmt = fmt
+        self.recent = deque(maxlen=RECENT_SPANS)
+        self._samples = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._file = None
+        if path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self._file = open(path, 'a', encoding='utf-8', buffering=1)
+            if fmt == 'chrome' and self._file.tell() == 0:
+                # Chrome prihvata niz bez zatvarajuće zagrade, pa se fajl može samo dopisivati.
+                self._file.write('[\n')
+
+    def record(self, span):
+        start_us = (span.start - self._origin) * 1e6
+        with self._lock:
+            self.recent.append((span.name, span.duration, span.attrs))
+            samples = self._samples.get(span.name)
+            if samples is None:
+                samples = self._samples[span.name] = [0, deque(maxlen=SAMPLES_PER_NAME)]
+            samples[0] += 1
+            samples[1].append(span.duration)
+            if self._file is not None:
+                if self.fmt == 'chrome':
+                    event = {"name": span.name, "ph": "X", "ts": round(start_us, 1),
+                             "dur": round(span.duration * 1e6, 1), "pid": os.getpid(),
+                             "tid": threading.get_ident(), "args": span.attrs}
+                    self._file.write(json.dumps(event, ensure_ascii=False, default=str) + ',\n')
+                else:
+                    record = {"name": span.name, "start_ms": round(start_us / 1000, 3),
+                              "duration_ms": round(span.duration * 1000, 3),
+                              "thread": threading.current_thread().name, **span.attrs}
+                    self._file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+    def stats(self):
+        """Vraća {naziv: {count, avg, p50, p95, max}} (trajanja u sekundama)."""
+        with self._lock:
+            items = [(name, count, sorted(durations)) for name, (count, durations) in self._samples.items()]
+        result = {}
+        for name, count, durations in items:
+            n = len(durations)
+            result[name] = {
+                "count": count,
+                "avg": sum(durations) / n,
+                "p50": durations[n // 2],
+                "p95": durations[min(n - 1, int(n * 0.95))],
+                "max": durations[-1],
+            }
+        return result
+
+    def recent_spans(self, limit=50):
+        """Zadnji završeni spanovi, najnoviji prvi: (naziv, trajanje, atributi)."""
+        with self._lock:
+            return list(self.recent)[-limit:][::-1]
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def span(name, **attrs):
+    """Context manager koji mjeri blok koda; bez uključenog mjerenja ne radi ništa."""
+    tracer = _tracer
+    if tracer is None:
+        return _NOOP
+    return Span(tracer, name, attrs)
+
+
+def traced(name):
+    """Dekorator: mjeri svaki poziv funkcije kao span s datim nazivom."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return fn(*args, **kwargs)
+            with Span(tracer, name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def enable(path=None, fmt='jsonl'):
+    """Uključuje mjerenje; path=None čuva spanove samo u memoriji (za prozor dijagnostike)."""
+    global _tracer
+    disable()
+    _tracer = Tracer(path, fmt)
+    return _tracer
+
+
+def disable():
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.close()
+
+
+def get_tracer():
+    """Vraća aktivni Tracer ili None."""
+    return _tracer
+
+
+def _enable_from_env():
+    target = os.getenv("STUDY_TRACE")
+    if target:
+        enable(None if target == '1' else target, os.getenv("STUDY_TRACE_FORMAT", 'jsonl'))
+
+
+_enable_from_env()
@@ -0,0 +1,141 @@
+import tkinter as tk
+from tkinter import font as tkfont
+
+
+class VirtualList(tk.Frame):
+    """Lista koja crta samo vidljive redove (plus malu rezervu) iz velikog skupa stavki.
+
+    Stavke su stabilni id-ovi (npr. id kartica); tekst reda daje get_label(id).
+    Listbox u svakom trenutku sadrži samo prozor od `visible + 2 * OVERSCAN`
+    redova, a vlastiti scrollbar predstavlja cijeli skup. Pomjeranje unutar
+    rezerve ne zahtijeva ponovno crtanje. Odabir se prati po id-u, pa preživi
+    pomjeranje i novu pretragu.
+    """
+
+    OVERSCAN = 10
+
+    def __init__(self, master, get_label, on_select=None, **listbox_options):
+        super().__init__(master)
+        self.get_label = get_label
+        self.on_select = on_select
+        self.items = []
+        self.selected_id = None
+        self._selected_index = None
+        self.top = 0
+        self.visible = 20
+        self._window = (0, 0)
+
+        self.listbox = tk.Listbox(self, selectmode=tk.SINGLE, exportselection=False, **listbox_options)
+        self.listbox.pack(side="left", fill="both", expand=True)
+        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self._row_height = tkfont.Font(font=self.listbox['font']).metrics('linespace') + 1
+
+        self.listbox.bind("<Configure>", self._on_resize)
+        self.listbox.bind("<<ListboxSelect>>", self._on_listbox_select)
+        self.listbox.bind("<MouseWheel>", self._on_mousewheel)
+        self.listbox.bind("<Button-4>", lambda e: self._scroll_by(-3))
+        self.listbox.bind("<Button-5>", lambda e: self._scroll_by(3))
+        self.listbox.bind("<Up>", lambda e: self._move_selection(-1))
+        self.listbox.bind("<Down>", lambda e: self._move_selection(1))
+        self.listbox.bind("<Prior>", lambda e: self._scroll_by(-self.visible))
+        self.listbox.bind("<Next>", lambda e: self._scroll_by(self.visible))
+
+    def set_items(self, items, keep_position=False):
+        """Postavlja novi skup id-ova (npr. rezultat pretrage) i vraća prikaz na vrh.
+
+        Uz keep_position=True prikaz ostaje na istom mjestu (npr. pri osvježavanju istog popisa).
+        """
+        self.items = items
+        if not keep_position:
+            self.top = 0
+        self._window = (0, 0)
+        self._render()
+
+    def _max_top(self):
+        return max(0, len(self.items) - self.visible)
+
+    def _render(self):
+        """Osvježava sadržaj Listboxa samo ako vidljivi dio izađe iz nacrtanog prozora."""
+        count = len(self.items)
+        self.top = min(max(0, self.top), self._max_top())
+        start, end = self._window
+
+        if self.top < start or min(self.top + self.visible, count) > end or end > count:
+            start = max(0, self.top - self.OVERSCAN)
+            end = min(count, self.top + self.visible + self.OVERSCAN)
+            self.listbox.delete(0, tk.END)
+            if end > start:
+                self.listbox.insert(tk.END, *(self.get_label(item) for item in self.items[start:end]))
+            self._window = (start, end)
+
+        self.listbox.yview(self.top - start)
+        self.listbox.selection_clear(0, tk.END)
+        if self.selected_id is not None:
+            for row, item in enumerate(self.items[start:end]):
+                if item == self.selected_id:
+                    self.listbox.selection_set(row)
+                    break
+
+        if count:
+            self.scrollbar.set(self.top / count, min(1.0, (self.top + self.visible) / count))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def yview(self, *args):
+        """Prima naredbe scrollbara ('moveto' / 'scroll') za cijeli skup stavki."""
+        if args[0] == 'moveto':
+            self.top = int(float(args[1]) * len(self.items))
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            self.top += step * self.visible if args[2] == 'pages' else step
+        self._render()
+
+    def _scroll_by(self, rows):
+        self.top += rows
+        self._render()
+        return "break"
+
+    def _on_mousewheel(self, event):
+        return self._scroll_by(-3 if event.delta > 0 else 3)
+
+    def _on_resize(self, event):
+        self.visible = max(1, event.height // self._row_height)
+        self._window = (0, 0)
+        self._render()
+
+    def _on_listbox_select(self, event):
+        selection = self.listbox.curselection()
+        if not selection:
+            return
+        index = self._window[0] + selection[0]
+        if index < len(self.items):
+            self.select(self.items[index], index)
+
+    def select(self, item, index=None):
+        """Označava stavku po id-u i javlja on_select."""
+        self.selected_id = item
+        self._selected_index = index
+        if self.on_select:
+            self.on_select(item)
+
+    def _move_selection(self, step):
+        """Strelice gore/dolje pomjeraju odabir i po potrebi pomjeraju prikaz."""
+        if not self.items:
+            return "break"
+        index = self._selected_index
+        if index is None or index >= len(self.items) or self.items[index] != self.selected_id:
+            try:
+                index = self.items.index(self.selected_id)
+            except ValueError:
+                index = self.top - step
+        index += step
+        index = min(max(0, index), len(self.items) - 1)
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.visible:
+            self.top = index - self.visible + 1
+        self.select(self.items[index], index)
+        self._render()
+        return "break"